@@ -1,119 +1,345 @@
 # agent_core.py
-import sqlite3
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from langchain_google_vertexai import ChatVertexAI
-from crewai import Agent, Task, Crew, Process
-from tools import db_tool, news_search_tool
-from config import DATABASE_NAME, VERTEX_AI_PROJECT, VERTEX_AI_LOCATION
-
-# Initialize the LLM
-llm = ChatVertexAI(
-    model_name="gemini-1.5-pro-preview-0409",
-    project=VERTEX_AI_PROJECT,
-    location=VERTEX_AI_LOCATION,
+import pandas as pd
+from crewai import Agent, Task
+import telemetry
+from tools import db_tool, memory_tool, news_search_tool
+from dag import Node, run_dag
+from db import query_all, transaction
+from jobs import report_progress, stage
+from llm_cache import build_llm
+from memory import store_briefings
+from point_in_time import Snapshots
+from vector_index import sync_news_index
+from config import (
+    ANALYSIS_MAX_WORKERS,
+    ANALYSIS_WATCHLIST,
+    ANALYSIS_MACRO_INDICATORS,
+    BACKFILL_MAX_WORKERS,
+    BACKFILL_WRITE_BATCH,
 )
 
 # --- AGENT DEFINITIONS ---
-macro_strategist = Agent(
-    role='Lead Macroeconomic Strategist',
-    goal='Analyze Singaporean economic indicators from the database to forecast market trends.',
-    backstory='A seasoned economist from GIC, you translate raw economic data into actionable market sentiment.',
-    tools=[db_tool],
-    llm=llm,
-    verbose=True
-)
+_agents = None
+_agents_lock = threading.Lock()
 
-alpha_hunter = Agent(
-    role='Senior SGX Equity Analyst',
-    goal='Identify promising SGX-listed stocks by correlating macroeconomic trends with company performance.',
-    backstory='A sharp analyst from a top hedge fund, you find undervalued stocks and growth opportunities before the market does.',
-    tools=[db_tool, news_search_tool],
-    llm=llm,
-    verbose=True
-)
 
-risk_sentinel = Agent(
-    role='Investment Risk Manager',
-    goal='Assess and highlight the potential risks associated with the identified investment opportunities.',
-    backstory='With a background in financial regulation at MAS, you have a keen eye for hidden risks and market volatility.',
-    tools=[news_search_tool, db_tool],
-    llm=llm,
-    verbose=True
-)
+def _build_agents():
+    # Initialize the LLM (behind the response cache; LLM_CACHE_MODE=fake or replay runs offline)
+    llm = build_llm()
+
+    macro_strategist = Agent(
+        role='Lead Macroeconomic Strategist',
+        goal='Analyze Singaporean economic indicators from the database to forecast market trends.',
+        backstory='A seasoned economist from GIC, you translate raw economic data into actionable market sentiment.',
+        tools=[db_tool, memory_tool],
+        llm=llm,
+        verbose=True
+    )
+
+    alpha_hunter = Agent(
+        role='Senior SGX Equity Analyst',
+        goal='Identify promising SGX-listed stocks by correlating macroeconomic trends with company performance.',
+        backstory='A sharp analyst from a top hedge fund, you find undervalued stocks and growth opportunities before the market does.',
+        tools=[db_tool, news_search_tool, memory_tool],
+        llm=llm,
+        verbose=True
+    )
+
+    risk_sentinel = Agent(
+        role='Investment Risk Manager',
+        goal='Assess and highlight the potential risks associated with the identified investment opportunities.',
+        backstory='With a background in financial regulation at MAS, you have a keen eye for hidden risks and market volatility.',
+        tools=[news_search_tool, db_tool, memory_tool],
+        llm=llm,
+        verbose=True
+    )
+
+    portfolio_architect = Agent(
+        role='Chief Investment Officer',
+        goal='Synthesize all analyses into a coherent, actionable daily investment briefing for clients.',
+        backstory='You are a decisive leader, responsible for the final investment strategy. Your word is trusted and respected.',
+        llm=llm,
+        verbose=True
+    )
+
+    return {
+        "macro_strategist": macro_strategist,
+        "alpha_hunter": alpha_hunter,
+        "risk_sentinel": risk_sentinel,
+        "portfolio_architect": portfolio_architect,
+    }
+
+
+def get_agents():
+    """
+    Builds the LLM client and the four agents on first use and reuses them
+    afterwards, so importing this module stays cheap and a long-running app
+    pays the construction cost once per process.
+    """
+    global _agents
+    with _agents_lock:
+        if _agents is None:
+            _agents = _build_agents()
+        return _agents
 
-portfolio_architect = Agent(
-    role='Chief Investment Officer',
-    goal='Synthesize all analyses into a coherent, actionable daily investment briefing for clients.',
-    backstory='You are a decisive leader, responsible for the final investment strategy. Your word is trusted and respected.',
-    llm=llm,
-    verbose=True
-)
 
 # --- TASK DEFINITIONS ---
-# Get today's date for queries
-today = datetime.now().strftime('%Y-%m-%d')
-
-# Task 1: Macroeconomic Analysis
-macro_analysis_task = Task(
-    description=f"""
-    Conduct a forward-looking macroeconomic analysis for today, {today}.
-    1. First, query the 'indicator_forecasts' table to get the ML-generated predictions for the next quarter for key indicators like 'GDP_Quarterly' and 'CPI_All_Items'.
-    2. Next, query the 'singstat_data' table to analyze the historical trends of these same indicators.
-    3. Synthesize both the historical data and the future forecasts to form a comprehensive economic outlook.
-    4. Conclude with a forward-looking summary that explicitly mentions whether the forecasts suggest an acceleration, deceleration, or continuation of current trends.
-    """,
-    expected_output="An insightful economic outlook that integrates both historical trends and ML-based forecasts. The report must contain a 'Future Outlook' section that discusses the predicted trajectory of the economy.",
-    agent=macro_strategist
-)
+def build_tasks(today, agents=None):
+    """Creates the briefing tasks for `today`; built per run so the date never goes stale."""
+    agents = agents or get_agents()
 
-# Task 2: Stock Opportunity Identification
-stock_picking_task = Task(
-    description="""
-    Based on the macroeconomic outlook, use the tools to analyze the performance and recent news of SGX stocks like 'C6L.SI' (SIA) and 'D05.SI' (DBS).
-    Identify one 'Top Opportunity' stock and provide a clear, data-backed rationale for your choice.
-    """,
-    expected_output="A section titled 'Top Opportunity' with a specific stock ticker and a 2-3 sentence justification.",
-    agent=alpha_hunter,
-    context=[macro_analysis_task]
-)
+    # Task 1: Macroeconomic Analysis
+    macro_analysis_task = Task(
+        description=f"""
+        Conduct a forward-looking macroeconomic analysis for today, {today}.
+        1. Start from the ML-generated predictions in the 'indicator_forecasts' table for key indicators like 'GDP_Quarterly' and 'CPI_All_Items'; they are pre-fetched in the context below.
+        2. Analyze the historical trends of these same indicators from the 'singstat_data' table, also pre-fetched below. Query the database only for anything the context does not cover.
+        3. Synthesize both the historical data and the future forecasts to form a comprehensive economic outlook. Your recent conclusions are in the 'past_conclusions' context; say whether the outlook has changed since them.
+        4. Conclude with a forward-looking summary that explicitly mentions whether the forecasts suggest an acceleration, deceleration, or continuation of current trends.
+        """,
+        expected_output="An insightful economic outlook that integrates both historical trends and ML-based forecasts. The report must contain a 'Future Outlook' section that discusses the predicted trajectory of the economy.",
+        agent=agents['macro_strategist']
+    )
 
-# Task 3: Risk Assessment
-risk_assessment_task = Task(
-    description="""
-    Review the 'Top Opportunity' stock identified.
-    Use the news search tool to look for any potential negative news or market headwinds related to that company or its sector.
-    Summarize the key risk associated with this investment.
-    """,
-    expected_output="A section titled 'Key Risk Assessment' with a concise 1-2 sentence risk summary.",
-    agent=risk_sentinel,
-    context=[stock_picking_task]
-)
+    # Task 2: Stock Opportunity Identification
+    stock_picking_task = Task(
+        description="""
+        Based on the macroeconomic outlook, analyze the performance and recent news of the candidate SGX stocks, such as 'C6L.SI' (SIA) and 'D05.SI' (DBS).
+        Their rows from the precomputed 'stock_latest_metrics' table (trailing returns, volatility, moving averages, drawdowns) and 'stock_indicator_correlations' (sensitivity to each economic indicator), plus recent news, are pre-fetched in the context below; use the tools only for anything else.
+        Identify one 'Top Opportunity' stock and provide a clear, data-backed rationale for your choice. Your recent picks are in the 'past_conclusions' context; if you change the pick, say why.
+        """,
+        expected_output="A section titled 'Top Opportunity' with a specific stock ticker and a 2-3 sentence justification.",
+        agent=agents['alpha_hunter']
+    )
 
-# Task 4: Final Briefing Generation
-briefing_creation_task = Task(
-    description=f"Compile all the analyses (Macro Outlook, Top Opportunity, Risk Assessment) into a single, well-formatted investment briefing for {today}.",
-    expected_output="A final, client-ready markdown document with clear headings for each section.",
-    agent=portfolio_architect,
-    context=[macro_analysis_task, stock_picking_task, risk_assessment_task]
-)
+    # Task 3: Risk Assessment
+    risk_assessment_task = Task(
+        description="""
+        Review the 'Top Opportunity' stock identified.
+        Check its volatility_20d, drawdown and max_drawdown from 'stock_latest_metrics' and its strongest indicator correlations from 'stock_indicator_correlations'; both are pre-fetched in the context below.
+        Look through the recent news for any potential negative news or market headwinds related to that company or its sector; use the news search tool if you need more.
+        Summarize the key risk associated with this investment.
+        """,
+        expected_output="A section titled 'Key Risk Assessment' with a concise 1-2 sentence risk summary.",
+        agent=agents['risk_sentinel'],
+        context=[stock_picking_task]
+    )
 
-# --- CREW DEFINITION ---
-investment_crew = Crew(
-    agents=[macro_strategist, alpha_hunter, risk_sentinel, portfolio_architect],
-    tasks=[macro_analysis_task, stock_picking_task, risk_assessment_task, briefing_creation_task],
-    process=Process.sequential,
-    verbose=2
-)
+    # Task 4: Final Briefing Generation
+    briefing_creation_task = Task(
+        description=f"Compile all the analyses (Macro Outlook, Top Opportunity, Risk Assessment) into a single, well-formatted investment briefing for {today}. In the risk section, report the key risk of the Top Opportunity stock.",
+        expected_output="A final, client-ready markdown document with clear headings for each section.",
+        agent=agents['portfolio_architect']
+    )
+
+    return {
+        "macro_analysis": macro_analysis_task,
+        "stock_picking": stock_picking_task,
+        "risk_assessment": risk_assessment_task,
+        "briefing": briefing_creation_task,
+    }
+
+
+# --- PIPELINE DEFINITION ---
+def _sql_list(values):
+    return ", ".join("'" + value.replace("'", "''") + "'" for value in values)
+
+
+def _query_step(sql):
+    return lambda inputs: db_tool._run(sql)
+
+
+def _news_step(ticker):
+    return lambda inputs: news_search_tool._run(topic=f"{ticker} company news, outlook and risks")
+
+
+def _memory_step(before):
+    return lambda inputs: memory_tool._run(before=before)
+
+
+def _task_step(task):
+    """Runs one agent task with the outputs of its dependencies as context."""
+    def step(inputs):
+        context = "\n\n".join(f"### {name}\n{output}" for name, output in inputs.items())
+        return str(task.execute_sync(context=context))
+    return step
+
+
+def build_pipeline(today=None, watchlist=None, indicators=None, agents=None):
+    """
+    The briefing as a dependency graph. Database, news and memory lookups
+    have no dependencies and start immediately, alongside the macro analysis
+    once its own data is in; the stock pick waits for the macro outlook, the
+    risk review for the pick it assesses, and the final briefing for the
+    three analyses.
+    """
+    today = today or datetime.now().strftime('%Y-%m-%d')
+    tasks = build_tasks(today, agents)
+    watchlist = watchlist or ANALYSIS_WATCHLIST
+    indicators = indicators or ANALYSIS_MACRO_INDICATORS
+    news_nodes = [f"news_{ticker}" for ticker in watchlist]
+    stock_data = ["stock_metrics", "stock_correlations"] + news_nodes
+    return [
+        Node("macro_forecasts", _query_step(
+            f"SELECT indicator_name, forecast_date, predicted_value FROM indicator_forecasts "
+            f"WHERE indicator_name IN ({_sql_list(indicators)}) ORDER BY indicator_name, forecast_date"
+        )),
+        Node("macro_history", _query_step(
+            f"SELECT indicator_name, record_date, value FROM singstat_data "
+            f"WHERE indicator_name IN ({_sql_list(indicators)}) ORDER BY indicator_name, record_date"
+        )),
+        Node("stock_metrics", _query_step(
+            f"SELECT * FROM stock_latest_metrics WHERE ticker IN ({_sql_list(watchlist)})"
+        )),
+        Node("stock_correlations", _query_step(
+            f"SELECT ticker, indicator_name, correlation, observations FROM stock_indicator_correlations "
+            f"WHERE ticker IN ({_sql_list(watchlist)}) ORDER BY ticker, abs(correlation) DESC"
+        )),
+        *(Node(name, _news_step(ticker)) for name, ticker in zip(news_nodes, watchlist)),
+        # Compact conclusions of earlier briefings, not the briefings themselves
+        Node("past_conclusions", _memory_step(today)),
+        Node("macro_analysis", _task_step(tasks['macro_analysis']),
+             deps=["macro_forecasts", "macro_history", "past_conclusions"]),
+        Node("stock_picking", _task_step(tasks['stock_picking']),
+             deps=["macro_analysis", "past_conclusions"] + stock_data),
+        Node("risk_assessment", _task_step(tasks['risk_assessment']), deps=["stock_picking"] + stock_data),
+        Node("briefing", _task_step(tasks['briefing']),
+             deps=["macro_analysis", "stock_picking", "risk_assessment"]),
+    ]
+
+
+def _traced(node):
+    """The node with its step recorded as a telemetry span, so its tool and LLM calls nest under it."""
+    def step(inputs):
+        with telemetry.span(node.name, "pipeline_step"):
+            return node.fn(inputs)
+    return Node(node.name, step, node.deps)
+
+
+@telemetry.run("analysis")
+def run_analysis(max_workers=None):
+    """
+    Runs the briefing pipeline, printing per-step timings, and returns the
+    final briefing. Independent steps run concurrently, so the run takes
+    about as long as the longest chain of dependent steps.
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    with stage("agents"):
+        pipeline = [_traced(node) for node in build_pipeline(today)]
+    with stage("pipeline"):
+        run = run_dag(
+            pipeline,
+            max_workers=max_workers or ANALYSIS_MAX_WORKERS,
+            on_node_done=lambda name, finished, total: report_progress(0.95 * finished / total, f"finished {name}")
+        )
+    print(run.report())
+    result = _briefing(run)
 
-def run_analysis():
-    """Kicks off the crew analysis and returns the final briefing."""
-    result = investment_crew.kickoff()
-    
     # Save the result to the database
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR REPLACE INTO briefings (briefing_date, content) VALUES (?, ?)", (today, result))
-    conn.commit()
-    conn.close()
+    _store_briefings([(today, str(result))])
     
     return result
+
+
+def _briefing(run):
+    if "briefing" not in run.results:
+        failed = ", ".join(f"{name}: {error}" for name, error in run.errors.items())
+        raise RuntimeError(f"Analysis did not complete ({failed}).")
+    return run.results["briefing"]
+
+
+def _store_briefings(rows):
+    """
+    Writes (briefing_date, content) rows, compressed and with their memory
+    records, in one transaction, replacing any briefing for the same date.
+    """
+    with transaction() as conn:
+        store_briefings(conn, rows)
+
+
+# --- Historical backfill ---
+@telemetry.run("backfill")
+def backfill_briefings(start_date, end_date, max_workers=None, step_workers=None, resume=True, forecast_backend=None):
+    """
+    Generates the briefing of every business day from `start_date` to
+    `end_date` (inclusive) as it would have been written at the end of that
+    day: each date runs the normal pipeline against a point-in-time snapshot
+    (see point_in_time.py), so prices, indicators, news, analytics and
+    forecasts only reflect data dated on or before it.
+
+    Dates run concurrently on `max_workers` threads (BACKFILL_MAX_WORKERS),
+    each with its own agents and `step_workers` pipeline threads, and
+    finished briefings are written BACKFILL_WRITE_BATCH at a time. With
+    `resume`, dates that already have a briefing are skipped, so an
+    interrupted backfill picks up where it stopped.
+
+    Returns a dict with the written dates, the skipped dates and a mapping
+    of date -> error message for dates that failed.
+    """
+    dates = [day.strftime('%Y-%m-%d') for day in pd.bdate_range(start_date, end_date)]
+    existing = {row[0] for row in query_all(
+        "SELECT briefing_date FROM briefing_dates WHERE briefing_date >= ? AND briefing_date <= ?", (dates[0], dates[-1])
+    )} if resume and dates else set()
+    skipped = [day for day in dates if day in existing]
+    pending_dates = [day for day in dates if day not in existing]
+    print(f"Backfilling {len(pending_dates)} briefings ({len(skipped)} dates already have one).")
+    if not pending_dates:
+        return {"written": [], "skipped": skipped, "errors": {}}
+
+    # Index every article now: inside a snapshot the news table looks truncated
+    sync_news_index()
+    with stage("snapshots"):
+        snapshots = Snapshots(pending_dates, forecast_backend)
+
+    local = threading.local()
+
+    def generate(day):
+        # Agents keep per-task state, so concurrent dates must not share them
+        if not hasattr(local, "agents"):
+            local.agents = _build_agents()
+        with telemetry.span("backfill_date", "backfill", briefing_date=day), snapshots.as_of(day):
+            pipeline = [_traced(node) for node in build_pipeline(day, agents=local.agents)]
+            run = run_dag(pipeline, max_workers=step_workers or ANALYSIS_MAX_WORKERS)
+        return str(_briefing(run))
+
+    written, errors, batch = [], {}, []
+
+    def flush():
+        if batch:
+            _store_briefings(batch)
+            written.extend(day for day, _ in batch)
+            batch.clear()
+
+    with stage("briefings"), ThreadPoolExecutor(max_workers=max_workers or BACKFILL_MAX_WORKERS) as executor:
+        futures = {executor.submit(contextvars.copy_context().run, generate, day): day for day in pending_dates}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                day = futures[future]
+                try:
+                    batch.append((day, future.result()))
+                except Exception as e:
+                    errors[day] = str(e)
+                    print(f"    - Briefing for {day} failed: {e}")
+                if len(batch) >= BACKFILL_WRITE_BATCH:
+                    flush()
+                report_progress(done / len(pending_dates), f"briefed {day}")
+        finally:
+            # Keep what finished even when the backfill is cancelled or fails
+            for future in futures:
+                future.cancel()
+            flush()
+
+    print(f"Backfilled {len(written)} briefings; {len(errors)} failed.")
+    return {"written": sorted(written), "skipped": skipped, "errors": errors}
+
+
+if __name__ == '__main__':
+    import sys
+    if sys.argv[1:2] == ['backfill'] and len(sys.argv) == 4:
+        backfill_briefings(sys.argv[2], sys.argv[3])
+    else:
+        run_analysis()
@@ -0,0 +1,332 @@
+# analytics.py
+import hashlib
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from db import bump_table_versions, get_table_versions, query_all, query_df, transaction
+from config import ANALYTICS_MIN_CORRELATION_PERIODS
+
+TRADING_DAYS_PER_YEAR = 252
+MOVING_AVERAGE_WINDOWS = (20, 50, 200)
+VOLATILITY_WINDOW = 20
+# Trailing returns reported in stock_latest_metrics, in trading days
+TRAILING_RETURN_WINDOWS = {"return_1m": 21, "return_3m": 63, "return_1y": 252}
+PERIODS = {"W": "W", "M": "ME", "Q": "QE", "Y": "YE"}
+
+ANALYTICS_TABLES = (
+    "stock_features_daily",
+    "stock_returns_periodic",
+    "stock_latest_metrics",
+    "stock_indicator_correlations",
+)
+LATEST_METRIC_COLUMNS = (
+    'ticker', 'as_of', 'close_price', 'return_1m', 'return_3m', 'return_1y', f'volatility_{VOLATILITY_WINDOW}d',
+    'ma_20', 'ma_50', 'ma_200', 'drawdown', 'max_drawdown',
+)
+CORRELATION_COLUMNS = ('ticker', 'indicator_name', 'correlation', 'observations', 'window_start', 'window_end')
+# Tables the analytics are computed from; their versions are stored with the results
+SOURCE_TABLES = ("sgx_stocks_daily", "singstat_data")
+
+
+def load_prices():
+    """
+    Closing prices as a (date x ticker) frame, plus the record_date strings
+    as stored, indexed by parsed date, so results join back onto sgx_stocks_daily.
+    """
+    df = query_df("SELECT ticker, record_date, close_price FROM sgx_stocks_daily")
+    if df.empty:
+        return pd.DataFrame(), pd.Series(dtype=object)
+    prices = df.pivot_table(index='record_date', columns='ticker', values='close_price', aggfunc='last')
+    prices.index = pd.to_datetime(prices.index)
+    prices = prices.sort_index()
+    stamps = df['record_date'].drop_duplicates()
+    date_strings = pd.Series(stamps.to_numpy(), index=pd.to_datetime(stamps))
+    return prices, date_strings
+
+
+def compute_daily_features(prices):
+    """
+    Per-ticker daily features, computed column-wise on the whole price matrix:
+    simple and log returns, annualized rolling volatility, moving averages and
+    drawdown from the running peak.
+    """
+    returns = prices.pct_change(fill_method=None)
+    features = {
+        'close_price': prices,
+        'daily_return': returns,
+        'log_return': np.log(prices).diff(),
+        f'volatility_{VOLATILITY_WINDOW}d': returns.rolling(VOLATILITY_WINDOW, min_periods=VOLATILITY_WINDOW).std()
+        * np.sqrt(TRADING_DAYS_PER_YEAR),
+        'drawdown': prices / prices.cummax() - 1,
+    }
+    for window in MOVING_AVERAGE_WINDOWS:
+        features[f'ma_{window}'] = prices.rolling(window, min_periods=window).mean()
+    # (date x ticker) per feature -> long rows keyed by (ticker, date)
+    long = pd.concat({name: frame.stack() for name, frame in features.items()}, axis=1)
+    long.index.names = ['date', 'ticker']
+    return long.reset_index()
+
+
+def compute_periodic_returns(prices):
+    """Week/month/quarter/year returns per ticker, from each period's last close."""
+    frames = []
+    for period, rule in PERIODS.items():
+        closes = prices.resample(rule).last()
+        returns = closes.pct_change(fill_method=None).stack().rename('period_return').reset_index()
+        returns.columns = ['period_end', 'ticker', 'period_return']
+        returns['period'] = period
+        frames.append(returns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def compute_latest_metrics(prices, features):
+    """One row per ticker with the latest close, trailing returns, volatility, MAs and max drawdown."""
+    latest = features.sort_values('date').groupby('ticker').last()
+    metrics = pd.DataFrame(index=latest.index)
+    metrics['as_of'] = latest['date']
+    for column in ['close_price', f'volatility_{VOLATILITY_WINDOW}d', 'drawdown'] + [f'ma_{w}' for w in MOVING_AVERAGE_WINDOWS]:
+        metrics[column] = latest[column]
+    for name, window in TRAILING_RETURN_WINDOWS.items():
+        # Last valid close vs. the close `window` observations earlier, per ticker
+        metrics[name] = prices.apply(lambda s: s.dropna().iloc[-1] / s.dropna().iloc[-window - 1] - 1
+                                     if s.notna().sum() > window else np.nan)
+    metrics['max_drawdown'] = features.groupby('ticker')['drawdown'].min()
+    return metrics.reset_index()
+
+
+def load_indicators():
+    return query_df("SELECT indicator_name, record_date, value FROM singstat_data", parse_dates=['record_date'])
+
+
+def indicator_frequency(record_dates):
+    """'M', 'Q' or 'Y': the reference period of an indicator's values, from the typical gap between them."""
+    gaps = pd.Series(pd.to_datetime(record_dates)).sort_values().diff().dt.days.dropna()
+    gap = gaps.median() if not gaps.empty else 31
+    return 'M' if gap <= 45 else 'Q' if gap <= 135 else 'Y'
+
+
+def _period_changes(indicators, freq):
+    """% change of each indicator from one `freq` period to the next, as a (period x indicator) frame."""
+    values = indicators.assign(period=indicators['record_date'].dt.to_period(freq)).pivot_table(
+        index='period', columns='indicator_name', values='value', aggfunc='last'
+    ).sort_index()
+    # A missing period leaves a gap rather than a change measured across two periods
+    values = values.reindex(pd.period_range(values.index.min(), values.index.max(), freq=freq))
+    return values.pct_change(fill_method=None)
+
+
+def _pairwise_correlations(stock_returns, indicator_changes, min_periods):
+    """Pairwise-complete Pearson correlation of every (ticker, indicator) pair of two aligned frames, as long rows."""
+    x = stock_returns.to_numpy(dtype=float)
+    y = indicator_changes.to_numpy(dtype=float)
+    mx, my = ~np.isnan(x), ~np.isnan(y)
+    x0, y0 = np.nan_to_num(x), np.nan_to_num(y)
+    n = mx.T.astype(float) @ my.astype(float)
+    sum_x = x0.T @ my
+    sum_y = mx.T @ y0
+    sum_xx = (x0 ** 2).T @ my
+    sum_yy = mx.T @ (y0 ** 2)
+    sum_xy = x0.T @ y0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sum_xy - sum_x * sum_y / n
+        var_x = sum_xx - sum_x ** 2 / n
+        var_y = sum_yy - sum_y ** 2 / n
+        corr = cov / np.sqrt(var_x * var_y)
+    corr[(n < min_periods) | ~np.isfinite(corr)] = np.nan
+
+    result = pd.DataFrame({
+        'ticker': np.repeat(stock_returns.columns.to_numpy(), len(indicator_changes.columns)),
+        'indicator_name': np.tile(indicator_changes.columns.to_numpy(), len(stock_returns.columns)),
+        'correlation': corr.ravel(),
+        'observations': n.ravel().astype(int),
+    }).dropna(subset=['correlation'])
+    result['window_start'] = str(stock_returns.index.min())
+    result['window_end'] = str(stock_returns.index.max())
+    return result
+
+
+def compute_correlations(prices, min_periods=None, indicators=None):
+    """
+    Correlations between stock returns and % changes of each SingStat
+    indicator, measured over the indicator's own period: month on month for
+    monthly indicators, quarter on quarter for quarterly ones (see
+    indicator_frequency), with stock returns over the same calendar periods.
+    Returns long rows with the number of overlapping periods behind each
+    coefficient. `indicators` defaults to all of singstat_data.
+    """
+    min_periods = min_periods or ANALYTICS_MIN_CORRELATION_PERIODS
+    indicators = load_indicators() if indicators is None else indicators
+    if indicators.empty or prices.empty:
+        return pd.DataFrame(columns=list(CORRELATION_COLUMNS))
+
+    frequencies = indicators.groupby('indicator_name')['record_date'].agg(indicator_frequency)
+    results = []
+    for freq, names in frequencies.groupby(frequencies):
+        stock_returns = prices.resample(PERIODS[freq]).last().pct_change(fill_method=None)
+        stock_returns.index = stock_returns.index.to_period(freq)
+        changes = _period_changes(indicators[indicators['indicator_name'].isin(names.index)], freq)
+        stock_returns, changes = stock_returns.align(changes, join='inner', axis=0)
+        if not stock_returns.empty:
+            results.append(_pairwise_correlations(stock_returns, changes, min_periods))
+    if not results:
+        return pd.DataFrame(columns=list(CORRELATION_COLUMNS))
+    return pd.concat(results, ignore_index=True)
+
+
+def latest_metric_rows(latest, date_strings):
+    """compute_latest_metrics output as stock_latest_metrics rows, with as_of in the stored date format."""
+    return latest.assign(as_of=latest['as_of'].map(date_strings))[list(LATEST_METRIC_COLUMNS)].itertuples(
+        index=False, name=None
+    )
+
+
+def insert_rows(conn, table, columns, rows):
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+    )
+
+
+def _series_hashes(frame):
+    """{column: content hash} of a (date x series) frame, over the column's values and the dates they fall on."""
+    return {
+        name: hashlib.sha256(pd.util.hash_pandas_object(frame[name], index=True).to_numpy().tobytes()).hexdigest()
+        for name in frame.columns
+    }
+
+
+def _indicator_hashes(indicators):
+    """{indicator: content hash} of each indicator's own (record_date, value) rows."""
+    return {
+        name: hashlib.sha256(pd.util.hash_pandas_object(
+            group.sort_values('record_date')[['record_date', 'value']], index=False
+        ).to_numpy().tobytes()).hexdigest()
+        for name, group in indicators.groupby('indicator_name', sort=False)
+    }
+
+
+def _changed(hashes, stored):
+    """(series whose hash is new or different, stored series that are gone)."""
+    return {name for name, digest in hashes.items() if stored.get(name) != digest}, set(stored) - set(hashes)
+
+
+def _delete_series(conn, table, column, names):
+    names = sorted(names)
+    for i in range(0, len(names), 500):
+        chunk = names[i:i + 500]
+        conn.execute(f"DELETE FROM {table} WHERE {column} IN ({', '.join('?' * len(chunk))})", chunk)
+
+
+def compute_analytics(full_refresh=False):
+    """
+    Brings the analytics tables up to date with sgx_stocks_daily and
+    singstat_data in one transaction. Meant to run once per ingest, so
+    agents can look features up instead of scanning raw history.
+
+    Runs incrementally. Nothing is recomputed when neither source table's
+    version moved since the last run. Otherwise each ticker's prices and each
+    indicator's values are hashed and compared to the hashes stored with the
+    results: only changed tickers get new features, returns and metrics, and
+    only correlations involving a changed ticker or indicator are
+    recomputed. `full_refresh=True` rebuilds every table from scratch.
+    """
+    started = time.perf_counter()
+    versions = get_table_versions()
+    source_versions = {table: versions.get(table, 0) for table in SOURCE_TABLES}
+    if not full_refresh and dict(query_all("SELECT table_name, version FROM analytics_sources")) == source_versions:
+        print("Analytics are up to date.")
+        return {"features": 0, "periodic": 0, "tickers": 0, "correlations": 0, "unchanged": True}
+
+    prices, date_strings = load_prices()
+    if prices.empty:
+        print("No stock data to analyse.")
+        return {}
+    indicators = load_indicators()
+    hashes = {"sgx_stocks_daily": _series_hashes(prices), "singstat_data": _indicator_hashes(indicators)}
+    stored = {table: {} for table in SOURCE_TABLES}
+    if not full_refresh:
+        for table, series, digest in query_all("SELECT source_table, series, content_hash FROM analytics_fingerprints"):
+            stored.setdefault(table, {})[series] = digest
+    tickers, removed_tickers = _changed(hashes["sgx_stocks_daily"], stored["sgx_stocks_daily"])
+    changed_indicators, removed_indicators = _changed(hashes["singstat_data"], stored["singstat_data"])
+
+    counts = {"features": 0, "periodic": 0, "tickers": len(tickers), "correlations": 0}
+    feature_rows, periodic_rows, latest_rows, correlations = [], [], [], []
+    if tickers:
+        changed = prices[sorted(tickers)]
+        features = compute_daily_features(changed)
+        periodic = compute_periodic_returns(changed)
+        latest = compute_latest_metrics(changed, features)
+        counts.update(features=len(features), periodic=len(periodic))
+        # SQLite stores NaN as NULL, so the frames can be bound as they are
+        vol = f'volatility_{VOLATILITY_WINDOW}d'
+        feature_rows = features.assign(date=features['date'].map(date_strings))[
+            ['ticker', 'date', 'close_price', 'daily_return', 'log_return', vol, 'ma_20', 'ma_50', 'ma_200', 'drawdown']
+        ].itertuples(index=False, name=None)
+        periodic_rows = periodic.assign(period_end=periodic['period_end'].dt.strftime('%Y-%m-%d'))[
+            ['ticker', 'period', 'period_end', 'period_return']
+        ].itertuples(index=False, name=None)
+        latest_rows = latest_metric_rows(latest, date_strings)
+        # Changed tickers against every indicator
+        correlations.append(compute_correlations(changed, indicators=indicators))
+    # The other tickers against the changed indicators
+    unchanged = prices.drop(columns=sorted(tickers))
+    if changed_indicators and not unchanged.empty:
+        correlations.append(compute_correlations(
+            unchanged, indicators=indicators[indicators['indicator_name'].isin(changed_indicators)]
+        ))
+    counts["correlations"] = sum(len(frame) for frame in correlations)
+    correlation_rows = [
+        row for frame in correlations for row in frame[list(CORRELATION_COLUMNS)].itertuples(index=False, name=None)
+    ]
+
+    replaced_tickers = tickers | removed_tickers
+    replaced_indicators = changed_indicators | removed_indicators
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with transaction() as conn:
+        if full_refresh:
+            for table in ANALYTICS_TABLES:
+                conn.execute(f"DELETE FROM {table};")
+            conn.execute("DELETE FROM analytics_fingerprints")
+        else:
+            for table in ANALYTICS_TABLES:
+                _delete_series(conn, table, "ticker", replaced_tickers)
+            _delete_series(conn, "stock_indicator_correlations", "indicator_name", replaced_indicators)
+        conn.executemany(
+            """INSERT INTO stock_features_daily
+                   (ticker, record_date, close_price, daily_return, log_return, volatility_20d, ma_20, ma_50, ma_200,
+                    drawdown)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            feature_rows
+        )
+        conn.executemany(
+            "INSERT INTO stock_returns_periodic (ticker, period, period_end, period_return) VALUES (?, ?, ?, ?)",
+            periodic_rows
+        )
+        insert_rows(conn, "stock_latest_metrics", LATEST_METRIC_COLUMNS, latest_rows)
+        insert_rows(conn, "stock_indicator_correlations", CORRELATION_COLUMNS, correlation_rows)
+
+        for table, names in (("sgx_stocks_daily", removed_tickers), ("singstat_data", removed_indicators)):
+            conn.executemany(
+                "DELETE FROM analytics_fingerprints WHERE source_table = ? AND series = ?", [(table, n) for n in names]
+            )
+        conn.executemany(
+            "INSERT OR REPLACE INTO analytics_fingerprints (source_table, series, content_hash) VALUES (?, ?, ?)",
+            [(table, name, hashes[table][name]) for table, names in
+             (("sgx_stocks_daily", tickers), ("singstat_data", changed_indicators)) for name in names]
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO analytics_sources (table_name, version, computed_at) VALUES (?, ?, ?)",
+            [(table, version, now) for table, version in source_versions.items()]
+        )
+        if full_refresh or replaced_tickers:
+            bump_table_versions(conn, *ANALYTICS_TABLES)
+        elif replaced_indicators:
+            bump_table_versions(conn, "stock_indicator_correlations")
+
+    print(f"Computed analytics in {time.perf_counter() - started:.1f}s: {counts}")
+    return counts
+
+
+if __name__ == '__main__':
+    compute_analytics()
@@ -0,0 +1,328 @@
+# backtesting.py
+"""
+Walk-forward evaluation of the indicator forecasts and of the stock picks
+stored in briefings:
+
+    python backtesting.py forecasts --backends holt_winters prophet --cutoffs 36
+    python backtesting.py picks
+"""
+import argparse
+import hashlib
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import telemetry
+from analytics import load_prices
+from disk_cache import DiskCache
+from jobs import stage
+from memory import top_picks
+from predictive_models import get_forecaster, load_histories
+from config import (
+    BACKTEST_CACHE_DIR,
+    BACKTEST_CACHE_MAX_BYTES,
+    BACKTEST_CUTOFFS,
+    BACKTEST_CUTOFF_FREQ,
+    BACKTEST_PICK_HORIZONS,
+    FORECAST_HORIZON_DAYS,
+    FORECAST_MAX_WORKERS,
+    FORECAST_MIN_HISTORY,
+)
+
+_cache = None
+
+
+def get_cache():
+    """Returns the process-wide cache of prefix forecasts, creating its directory on first use."""
+    global _cache
+    if _cache is None:
+        _cache = DiskCache(BACKTEST_CACHE_DIR, max_bytes=BACKTEST_CACHE_MAX_BYTES, suffix=".json")
+    return _cache
+
+
+# --- Prefix forecasts ---
+def _row_hashes(history):
+    # The same per-row hashes predictive_models.history_fingerprint hashes
+    return pd.util.hash_pandas_object(history[['ds', 'y']], index=False).to_numpy()
+
+
+def _load_entry(cache_key):
+    """{prefix digest: [forecast dates as epoch seconds, values]} stored for one indicator, backend and horizon."""
+    data = get_cache().get(cache_key)
+    if data is None:
+        return {}
+    try:
+        return json.loads(data)
+    except ValueError:
+        return {}
+
+
+def _fit_chunk(backend, histories, horizon_days):
+    """Forecasts a chunk of prefixes with a NumPy backend; runs in a worker process."""
+    return [(key, df, error) for key, df, error, _ in get_forecaster(backend).forecast(histories, horizon_days)]
+
+
+def _fit(backend, histories, horizon_days, max_workers):
+    """
+    Yields (key, forecast frame or None, error) for every {key: history}.
+    NumPy backends fit each chunk of prefixes as one stacked array and the
+    chunks run across `max_workers` processes; Prophet already fits across
+    its own process pool.
+    """
+    forecaster = get_forecaster(backend, max_workers=max_workers, use_store=False)
+    workers = min(max_workers, len(histories))
+    if forecaster.name == "prophet" or workers <= 1:
+        for key, df, error, _ in forecaster.forecast(histories, horizon_days):
+            yield key, df, error
+        return
+    keys = list(histories)
+    chunks = [{key: histories[key] for key in keys[i::workers]} for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for results in executor.map(_fit_chunk, [backend] * workers, chunks, [horizon_days] * workers):
+            yield from results
+
+
+def prefix_forecasts(prefixes, backend=None, horizon_days=FORECAST_HORIZON_DAYS, max_workers=None, use_cache=True):
+    """
+    Forecasts made from the first rows of each indicator's history, i.e. as
+    they would have been made at past dates.
+
+    `prefixes` maps indicator -> (history, lengths), where history has the
+    (ds, y) columns sorted by ds. Returns one frame of every forecast, with
+    the indicator_forecasts columns plus the prefix `length` it was made
+    from; failed fits are reported and left out. Each distinct prefix is
+    fitted at most once: results are cached on disk by backend, horizon and
+    a hash of the prefix's rows, so repeating an evaluation (or extending it
+    with new cutoffs) only fits the prefixes it has not seen.
+    """
+    max_workers = max_workers or FORECAST_MAX_WORKERS
+    forecaster = get_forecaster(backend)
+    # (indicator, length, dates as epoch seconds, values) per prefix, joined into one frame at the end
+    results, missing, entries = [], {}, {}
+    for indicator, (history, lengths) in prefixes.items():
+        cache_key = f"{forecaster.model_key}|{horizon_days}|{indicator}"
+        entries[indicator] = (cache_key, _load_entry(cache_key) if use_cache else {})
+        hashes = _row_hashes(history)
+        for length in sorted({int(length) for length in lengths}):
+            digest = hashlib.sha256(hashes[:length].tobytes()).hexdigest()[:32]
+            cached = entries[indicator][1].get(digest)
+            if cached is not None:
+                results.append((indicator, length, *cached))
+            else:
+                missing[f"{indicator}@{length}"] = (indicator, length, digest)
+
+    if missing:
+        histories = {
+            key: prefixes[indicator][0].iloc[:length].reset_index(drop=True)
+            for key, (indicator, length, digest) in missing.items()
+        }
+        print(f"  - Fitting {len(missing)} history prefixes with {forecaster.name} "
+              f"({len(results)} cached)...")
+        updated = set()
+        for key, forecast_df, error in _fit(forecaster.name, histories, horizon_days, max_workers):
+            indicator, length, digest = missing[key]
+            if error is not None:
+                print(f"    - Could not forecast {indicator} from its first {length} points: {error}")
+                continue
+            cached = [
+                forecast_df['forecast_date'].to_numpy().astype('datetime64[s]').astype(np.int64).tolist(),
+                forecast_df['predicted_value'].astype(float).tolist(),
+            ]
+            results.append((indicator, length, *cached))
+            entries[indicator][1][digest] = cached
+            updated.add(indicator)
+        if use_cache:
+            # One write per indicator rather than per prefix
+            for indicator in updated:
+                cache_key, entry = entries[indicator]
+                get_cache().put(cache_key, json.dumps(entry).encode("utf-8"))
+
+    sizes = [len(dates) for _, _, dates, _ in results]
+    return pd.DataFrame({
+        'indicator_name': np.repeat([indicator for indicator, _, _, _ in results], sizes).astype(object),
+        'length': np.repeat([length for _, length, _, _ in results], sizes).astype(int),
+        'forecast_date': pd.to_datetime(
+            np.fromiter((date for _, _, dates, _ in results for date in dates), dtype=np.int64, count=sum(sizes)),
+            unit='s'
+        ),
+        'predicted_value': np.fromiter(
+            (value for _, _, _, values in results for value in values), dtype=float, count=sum(sizes)
+        ),
+    })
+
+
+# --- Walk-forward forecast evaluation ---
+def _cutoff_dates(histories, cutoffs=None, periods=None, freq=None):
+    if cutoffs is not None:
+        return pd.DatetimeIndex(pd.to_datetime(list(cutoffs))).normalize()
+    latest = max(df['ds'].max() for df in histories.values())
+    return pd.date_range(end=latest.normalize(), periods=periods or BACKTEST_CUTOFFS, freq=freq or BACKTEST_CUTOFF_FREQ)
+
+
+def _score(predicted, histories):
+    """
+    Matches every prefix forecast with the actual values released after its
+    cutoff. Horizon h is the h-th observation after the cutoff.
+    """
+    actual = pd.concat(
+        [df.assign(indicator_name=name, position=np.arange(len(df))) for name, df in histories.items()],
+        ignore_index=True
+    ).rename(columns={'ds': 'forecast_date', 'y': 'actual'})
+    predicted = predicted.assign(forecast_date=predicted['forecast_date'].astype(actual['forecast_date'].dtype))
+    matched = predicted.merge(actual, on=['indicator_name', 'forecast_date'])
+    matched['horizon'] = matched['position'] - matched['length'] + 1
+    return matched[matched['horizon'] >= 1]
+
+
+def _accuracy(matched):
+    errors = matched['predicted_value'] - matched['actual']
+    nonzero = matched['actual'] != 0
+    return pd.Series({
+        'points': len(matched),
+        'series': matched['indicator_name'].nunique(),
+        'mape': float((errors[nonzero].abs() / matched.loc[nonzero, 'actual'].abs()).mean() * 100),
+        'rmse': float(np.sqrt((errors ** 2).mean())),
+        'mae': float(errors.abs().mean()),
+    })
+
+
+@telemetry.run("backtest")
+def walk_forward(backends=None, cutoffs=None, periods=None, freq=None, horizon_days=FORECAST_HORIZON_DAYS,
+                 max_workers=None, use_cache=True):
+    """
+    Re-forecasts every indicator from its history as of each cutoff date and
+    scores the forecasts against the values released afterwards.
+
+    `cutoffs` are dates; by default `periods` (BACKTEST_CUTOFFS) steps of
+    `freq` (BACKTEST_CUTOFF_FREQ) ending at the latest data. Cutoffs that leave an
+    indicator with the same history share one fit, and prefixes are fitted
+    through prefix_forecasts, so cached fits are reused across runs.
+
+    Returns one row per (backend, horizon) with the number of points and
+    series scored, MAPE (%), RMSE and MAE, where horizon h is the h-th
+    observation after the cutoff.
+    """
+    backends = backends or [get_forecaster().name]
+    with stage("load"):
+        histories = load_histories()
+        if not histories:
+            print("No indicator history to backtest.")
+            return pd.DataFrame()
+        cutoff_dates = _cutoff_dates(histories, cutoffs, periods, freq)
+        next_days = (cutoff_dates + pd.Timedelta(days=1)).to_numpy()
+        prefixes = {}
+        for name, history in histories.items():
+            ds = history['ds'].to_numpy()
+            lengths = np.searchsorted(ds, next_days.astype(ds.dtype), side='left')
+            # Enough history to fit, and at least one later value to score against
+            lengths = np.unique(lengths[(lengths >= FORECAST_MIN_HISTORY) & (lengths < len(history))])
+            if len(lengths):
+                prefixes[name] = (history, lengths)
+    if not prefixes:
+        print("Not enough history before the cutoffs to backtest.")
+        return pd.DataFrame()
+    print(f"Walk-forward backtest over {len(cutoff_dates)} cutoffs, {len(prefixes)} indicators, "
+          f"{sum(len(lengths) for _, lengths in prefixes.values())} distinct history prefixes.")
+
+    reports = []
+    for backend in backends:
+        started = time.perf_counter()
+        with stage(f"fit.{backend}"):
+            forecasts = prefix_forecasts(prefixes, backend, horizon_days, max_workers, use_cache)
+        with stage(f"score.{backend}"):
+            matched = _score(forecasts, histories) if not forecasts.empty else pd.DataFrame()
+        if matched.empty:
+            print(f"  - {backend}: no forecast matched a later actual value.")
+            continue
+        report = matched.groupby('horizon').apply(_accuracy, include_groups=False).reset_index()
+        report.insert(0, 'backend', backend)
+        report['seconds'] = time.perf_counter() - started
+        reports.append(report)
+
+    report = pd.concat(reports, ignore_index=True) if reports else pd.DataFrame()
+    if not report.empty:
+        report[['points', 'series']] = report[['points', 'series']].astype(int)
+        print(report.to_string(index=False))
+    return report
+
+
+# --- Briefing pick evaluation ---
+@telemetry.run("backtest")
+def score_picks(horizons=None, start_date=None, end_date=None):
+    """
+    Scores the 'Top Opportunity' pick of every stored briefing by its return
+    over the following `horizons` trading days (BACKTEST_PICK_HORIZONS),
+    bought at the last close on or before the briefing date. Excess return
+    is measured against the equal-weighted average of every ticker over the
+    same days.
+
+    Returns (summary, picks): one summary row per horizon with the picks
+    scored, mean and median return, mean excess return, and the share of
+    picks that rose (hit_rate) and that beat the average (beat_rate); and
+    one row per briefing with its pick and returns.
+    """
+    horizons = horizons or BACKTEST_PICK_HORIZONS
+    with stage("load"):
+        # Picks were extracted when each briefing was stored (see memory.py)
+        picks = top_picks(start_date, end_date)
+        prices, _ = load_prices()
+    print(f"Found a pick in {picks['ticker'].notna().sum()} of {len(picks)} briefings.")
+
+    summary = []
+    if not picks.empty and not prices.empty:
+        with stage("score"):
+            # Briefings are written after the close, so entry is the close on or before the briefing date
+            next_days = pd.to_datetime(picks['briefing_date']).dt.normalize() + pd.Timedelta(days=1)
+            rows = prices.index.searchsorted(next_days, side='left') - 1
+            columns = prices.columns.get_indexer(picks['ticker'])
+            valid = (rows >= 0) & (columns >= 0)
+            for horizon in horizons:
+                forward = prices.shift(-horizon) / prices - 1
+                market = forward.mean(axis=1).to_numpy()
+                returns = np.full(len(picks), np.nan)
+                excess = np.full(len(picks), np.nan)
+                returns[valid] = forward.to_numpy()[rows[valid], columns[valid]]
+                excess[valid] = returns[valid] - market[rows[valid]]
+                picks[f'return_{horizon}d'] = returns
+                picks[f'excess_{horizon}d'] = excess
+                scored = ~np.isnan(returns)
+                summary.append({
+                    'horizon_days': horizon,
+                    'picks': int(scored.sum()),
+                    'mean_return': float(np.mean(returns[scored])) if scored.any() else np.nan,
+                    'median_return': float(np.median(returns[scored])) if scored.any() else np.nan,
+                    'mean_excess': float(np.mean(excess[scored])) if scored.any() else np.nan,
+                    'hit_rate': float(np.mean(returns[scored] > 0)) if scored.any() else np.nan,
+                    'beat_rate': float(np.mean(excess[scored] > 0)) if scored.any() else np.nan,
+                })
+    summary = pd.DataFrame(summary)
+    if not summary.empty:
+        print(summary.to_string(index=False))
+    return summary, picks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward backtests of forecasts and briefing picks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    forecasts = commands.add_parser("forecasts", help="Re-forecast at rolling cutoffs and report accuracy per horizon")
+    forecasts.add_argument("--backends", nargs="+", help="Forecasting backends (default: FORECAST_BACKEND)")
+    forecasts.add_argument("--cutoffs", type=int, help="Number of cutoffs (default: BACKTEST_CUTOFFS)")
+    forecasts.add_argument("--freq", help="Spacing of the cutoffs as a pandas frequency (default: BACKTEST_CUTOFF_FREQ)")
+    forecasts.add_argument("--no-cache", action="store_true", help="Refit every prefix instead of reusing cached fits")
+    picks = commands.add_parser("picks", help="Score the Top Opportunity picks of stored briefings")
+    picks.add_argument("--horizons", type=int, nargs="+", help="Holding periods in trading days")
+    picks.add_argument("--start-date")
+    picks.add_argument("--end-date")
+    args = parser.parse_args(argv)
+
+    if args.command == "forecasts":
+        walk_forward(args.backends, periods=args.cutoffs, freq=args.freq, use_cache=not args.no_cache)
+    else:
+        score_picks(args.horizons, args.start_date, args.end_date)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
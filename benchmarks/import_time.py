@@ -0,0 +1,118 @@
+# benchmarks/import_time.py
+"""
+Cold-start import benchmark.
+
+Imports each module in a fresh interpreter, several times, and reports the
+median wall time plus the slowest dependencies from `python -X importtime`.
+Run from the repository root:
+
+    python -m benchmarks.import_time [--repeat 5] [--output results.json] [--baseline old.json]
+
+With --baseline, exits non-zero when any module got slower than the
+baseline by more than --tolerance (default 25%).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from benchmarks import results
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a Streamlit session pays at start-up first, then the lazily loaded pipelines
+MODULES = [
+    "config",
+    "db",
+    "streamlit",
+    "streamlit_app",
+    "data_ingestion",
+    "predictive_models",
+    "agent_core",
+]
+
+
+def _run_import(module):
+    """Imports `module` in a new interpreter; returns (seconds, importtime stderr, error)."""
+    code = f"import {module}"
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        lines = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        return elapsed, proc.stderr, (lines[-1] if lines else f"exit code {proc.returncode}")
+    return elapsed, proc.stderr, None
+
+
+def _slowest_imports(importtime_output, module, top=5):
+    """The direct imports of `module` with the largest cumulative import time, in milliseconds."""
+    children, totals = [], {}
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            cumulative_us = int(cumulative)
+        except ValueError:
+            continue
+        # importtime indents each nesting level by two spaces and lists
+        # children before their parent
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((name.strip().split(".")[0], cumulative_us))
+        elif depth == 0:
+            if name.strip() == module:
+                for package, us in children:
+                    totals[package] = totals.get(package, 0) + us
+            children = []
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {package: round(us / 1000, 1) for package, us in ranked}
+
+
+def benchmark(modules=None, repeat=5):
+    entries = {}
+    for module in modules or MODULES:
+        # One warm-up run so .pyc compilation is not counted
+        _run_import(module)
+        timings, importtime, error = [], "", None
+        for _ in range(repeat):
+            elapsed, importtime, error = _run_import(module)
+            if error:
+                break
+            timings.append(elapsed)
+        if error:
+            entries[module] = {"error": error}
+            print(f"{module:<20} failed: {error}")
+            continue
+        entries[module] = {
+            "median_seconds": round(statistics.median(timings), 4),
+            "min_seconds": round(min(timings), 4),
+            "slowest_imports_ms": _slowest_imports(importtime, module),
+        }
+        print(f"{module:<20} {entries[module]['median_seconds']:>8.3f}s  {entries[module]['slowest_imports_ms']}")
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", help=f"Modules to import (default: {', '.join(MODULES)})")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    entries = benchmark(args.modules, args.repeat)
+    if args.output:
+        results.write(results.report("import_time", entries), args.output)
+    if args.baseline:
+        return 1 if results.compare(entries, args.baseline, args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+# benchmarks/results.py
+"""Machine-readable benchmark results and regression checks shared by the benchmark scripts."""
+import json
+import platform
+import statistics
+import sys
+import time
+
+
+def timed(fn, repeat=3, setup=None):
+    """
+    Calls fn() `repeat` times (running setup() untimed before each call) and
+    returns a result entry with median/min seconds and the last return
+    value's details, when fn returns a dict.
+    """
+    timings, details = [], None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        value = fn()
+        timings.append(time.perf_counter() - started)
+        details = value if isinstance(value, dict) else details
+    entry = {
+        "median_seconds": round(statistics.median(timings), 6),
+        "min_seconds": round(min(timings), 6),
+        "repeat": repeat,
+    }
+    if details:
+        entry["details"] = details
+    return entry
+
+
+def report(name, entries, **meta):
+    return {
+        "benchmark": name,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **meta,
+        "results": entries,
+    }
+
+
+def write(report_data, path):
+    with open(path, "w") as f:
+        json.dump(report_data, f, indent=2, default=str)
+
+
+def compare(entries, baseline_path, tolerance):
+    """Returns {name: {baseline_seconds, seconds}} for entries slower than the baseline by more than `tolerance`."""
+    with open(baseline_path) as f:
+        baseline = json.load(f).get("results", {})
+    regressions = {}
+    for name, entry in entries.items():
+        before = baseline.get(name, {}).get("median_seconds")
+        after = entry.get("median_seconds")
+        if before and after and after > before * (1 + tolerance):
+            regressions[name] = {"baseline_seconds": before, "seconds": after}
+    for name, change in regressions.items():
+        print(f"REGRESSION {name}: {change['baseline_seconds']:.3f}s -> {change['seconds']:.3f}s")
+    return regressions
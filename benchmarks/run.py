@@ -0,0 +1,361 @@
+# benchmarks/run.py
+"""
+End-to-end benchmark suite.
+
+Builds a synthetic database at the chosen scale in a scratch directory, then
+times ingestion, forecasting, the agent tools and the dashboard queries
+against it. Network sources are replaced by local stubs and the LLM by the
+offline fake model, so it runs with no network access. Run from the
+repository root:
+
+    python -m benchmarks.run --scale small [--output results.json] [--baseline old.json]
+
+With --baseline, exits non-zero when a benchmark got slower than the
+baseline by more than --tolerance (default 25%). With --columnar, the
+history is also served from the columnar store (needs pyarrow), so two runs
+compare the SQLite and columnar read paths.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from benchmarks import results
+from benchmarks.stubs import SingStatStub
+from benchmarks.synthetic import SCALES, indicator_names, ticker_names
+
+# The local SingStat API every run talks to, started with the environment
+_singstat_stub = None
+
+
+def _configure_environment(workdir, columnar=False):
+    """
+    Points every store at `workdir` and makes the run offline: SingStat is
+    served by a local stub server and the LLM by the fake model. Must run
+    before config is imported.
+    """
+    global _singstat_stub
+    os.makedirs(workdir, exist_ok=True)
+    if _singstat_stub is None:
+        _singstat_stub = SingStatStub().start()
+    os.environ.update({
+        "BACKTEST_CACHE_DIR": os.path.join(workdir, "backtest_cache"),
+        "COLUMNAR_STORE_ENABLED": "1" if columnar else "0",
+        "COLUMNAR_STORE_DIR": os.path.join(workdir, "columnar_store"),
+        "DATABASE_NAME": os.path.join(workdir, "benchmark.db"),
+        "MODEL_STORE_DIR": os.path.join(workdir, "model_store"),
+        "VECTOR_INDEX_DIR": os.path.join(workdir, "vector_index"),
+        "LLM_CACHE_DIR": os.path.join(workdir, "llm_cache"),
+        "LLM_CACHE_MODE": "fake",
+        # crewAI's telemetry export would otherwise wait on the network at every task
+        "CREWAI_DISABLE_TELEMETRY": "true",
+        "OTEL_SDK_DISABLED": "true",
+        "SINGSTAT_API_KEY": "benchmark",
+        "SINGSTAT_API_URL": _singstat_stub.url,
+        "SINGSTAT_REQUESTS_PER_SECOND": "0",
+        "YFINANCE_REQUESTS_PER_SECOND": "0",
+    })
+    if "config" in sys.modules:
+        raise RuntimeError("config was imported before the benchmark environment was set up.")
+
+
+# --- Benchmarks ---
+# Each takes the scale parameters and returns {name: result entry}.
+
+def bench_store_sgx_data(params, repeat):
+    """Cold fetch-and-upsert of a year of prices for new tickers, then an incremental re-run with nothing new."""
+    from benchmarks.stubs import SyntheticPriceProvider
+    from data_ingestion import store_sgx_data
+    from db import bump_table_versions, transaction
+
+    # Tickers outside the generated set, so every cold run fetches a full year
+    tickers = [f"N{i:04d}.SI" for i in range(min(params["tickers"], 100))]
+    provider = SyntheticPriceProvider()
+
+    def clear():
+        placeholders = ", ".join("?" * len(tickers))
+        with transaction() as conn:
+            conn.execute(f"DELETE FROM sgx_stocks_daily WHERE ticker IN ({placeholders})", tickers)
+            conn.execute(f"DELETE FROM ingestion_watermarks WHERE source = 'sgx' AND series IN ({placeholders})", tickers)
+            bump_table_versions(conn, "sgx_stocks_daily", "ingestion_watermarks")
+
+    def run():
+        return {"tickers": len(tickers), "rows": store_sgx_data(tickers, provider=provider)}
+
+    return {
+        "store_sgx_data_cold": results.timed(run, repeat, setup=clear),
+        "store_sgx_data_incremental": results.timed(run, repeat),
+    }
+
+
+def bench_run_ingestion(params, repeat):
+    """
+    A cold full ingestion of new SingStat series (from the stub server) and
+    new tickers, then an incremental re-run that only refetches the latest periods.
+    """
+    from benchmarks.stubs import SyntheticPriceProvider
+    from data_ingestion import run_ingestion
+    from db import bump_table_versions, transaction
+
+    # Series outside the generated set, so every cold run fetches them in full
+    indicators = {f"Stub_Indicator_{i:03d}": f"M9{i:05d}" for i in range(min(params["indicators"], 50))}
+    tickers = [f"I{i:04d}.SI" for i in range(min(params["tickers"], 100))]
+    provider = SyntheticPriceProvider()
+
+    def clear():
+        with transaction() as conn:
+            for table, column, series in (("singstat_data", "indicator_name", list(indicators)),
+                                          ("sgx_stocks_daily", "ticker", tickers)):
+                placeholders = ", ".join("?" * len(series))
+                conn.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", series)
+                conn.execute(f"DELETE FROM ingestion_watermarks WHERE series IN ({placeholders})", series)
+            bump_table_versions(conn, "singstat_data", "sgx_stocks_daily", "ingestion_watermarks")
+
+    def run():
+        counts = run_ingestion(indicators, tickers, price_provider=provider)
+        return {
+            "indicators": len(indicators),
+            "tickers": len(tickers),
+            "singstat_rows": counts["singstat_data"],
+            "price_rows": counts["sgx_stocks_daily"],
+            "failures": len(counts["failures"]),
+        }
+
+    return {
+        "run_ingestion_cold": results.timed(run, repeat, setup=clear),
+        "run_ingestion_incremental": results.timed(run, repeat),
+    }
+
+
+def bench_columnar_store(params, repeat):
+    """Building the columnar store from SQLite, then full-history reads from it against the same reads from SQLite."""
+    import columnar_store
+    from db import query_df
+
+    if not columnar_store.enabled():
+        return {"columnar_store_rebuild": {"skipped": "run with --columnar (needs pyarrow)"}}
+
+    entries = {"columnar_store_rebuild": results.timed(lambda: columnar_store.rebuild(), 1)}
+    for table, (key_column, value_columns) in columnar_store.DATASETS.items():
+        sql = f"SELECT {key_column}, record_date, {', '.join(value_columns)} FROM {table} ORDER BY {key_column}, record_date"
+        entries[f"read_{table}_sqlite"] = results.timed(
+            lambda: {"rows": len(query_df(sql, parse_dates=['record_date']))}, repeat
+        )
+        entries[f"read_{table}_columnar"] = results.timed(
+            lambda: {"rows": sum(len(df) for df in columnar_store.read_table(table).values())}, repeat
+        )
+    return entries
+
+
+def bench_analytics(params, repeat):
+    """A full rebuild, a run with no source changes, and a run after one ticker's latest close is revised."""
+    from analytics import compute_analytics
+    from db import bump_table_versions, transaction
+
+    def revise():
+        with transaction() as conn:
+            conn.execute(
+                """UPDATE sgx_stocks_daily SET close_price = close_price * 1.001
+                   WHERE id = (SELECT id FROM sgx_stocks_daily ORDER BY ticker, record_date DESC LIMIT 1)"""
+            )
+            bump_table_versions(conn, "sgx_stocks_daily")
+
+    return {
+        "compute_analytics_full": results.timed(lambda: compute_analytics(full_refresh=True), repeat),
+        "compute_analytics_unchanged": results.timed(compute_analytics, repeat),
+        "compute_analytics_one_ticker": results.timed(compute_analytics, repeat, setup=revise),
+    }
+
+
+def bench_generate_forecasts(params, repeat, backends):
+    from predictive_models import generate_forecasts
+
+    entries = {}
+    for backend in backends:
+        def full():
+            outcome = generate_forecasts(backend=backend, full_refresh=True)
+            return {"stored": outcome["stored"], "errors": len(outcome["errors"])}
+
+        def incremental():
+            outcome = generate_forecasts(backend=backend)
+            return {"stored": outcome["stored"], "unchanged": len(outcome["unchanged"])}
+
+        try:
+            entries[f"generate_forecasts_{backend}_full"] = results.timed(full, repeat)
+            entries[f"generate_forecasts_{backend}_incremental"] = results.timed(incremental, repeat)
+        except ImportError as e:
+            entries[f"generate_forecasts_{backend}_full"] = {"skipped": str(e)}
+    return entries
+
+
+def bench_walk_forward(params, repeat):
+    """Weekly walk-forward cutoffs over the whole history with a NumPy backend: every prefix fitted (cold), then all cached."""
+    from backtesting import walk_forward
+
+    periods = params["years"] * 52
+
+    def run(use_cache):
+        report = walk_forward(["holt_winters"], periods=periods, freq="W", use_cache=use_cache)
+        return {"cutoffs": periods, "points": int(report["points"].sum()) if not report.empty else 0}
+
+    entries = {"walk_forward_cold": results.timed(lambda: run(False), repeat)}
+    run(True)
+    entries["walk_forward_cached"] = results.timed(lambda: run(True), repeat)
+    return entries
+
+
+def bench_database_tool(params, repeat):
+    """Representative agent queries, with the query cache cleared (cold) and warm (cached)."""
+    from query_cache import query_cache
+    from tools import db_tool
+
+    tickers = ticker_names(params["tickers"])
+    queries = [
+        f"SELECT * FROM stock_latest_metrics WHERE ticker IN ('{tickers[0]}', '{tickers[-1]}')",
+        f"SELECT record_date, close_price FROM sgx_stocks_daily WHERE ticker = '{tickers[0]}' ORDER BY record_date",
+        "SELECT ticker, AVG(close_price) AS avg_close, COUNT(*) AS days FROM sgx_stocks_daily GROUP BY ticker",
+        f"SELECT indicator_name, record_date, value FROM singstat_data WHERE indicator_name = '{indicator_names(1)[0]}'",
+        "SELECT * FROM stock_indicator_correlations ORDER BY abs(correlation) DESC LIMIT 20",
+    ]
+
+    def run_all():
+        return {"queries": len(queries), "output_chars": sum(len(db_tool._run(q)) for q in queries)}
+
+    return {
+        "database_tool_cold": results.timed(run_all, repeat, setup=query_cache.clear),
+        "database_tool_cached": results.timed(run_all, repeat),
+    }
+
+
+def bench_semantic_search(params, repeat):
+    from tools import news_search_tool
+    from vector_index import get_index, sync_news_index
+
+    # run_ingestion has already indexed the news, so each timed sync starts from an empty index
+    entries = {"news_index_sync": results.timed(lambda: {"added": sync_news_index()}, repeat, setup=get_index().reset)}
+    topics = [
+        "bank earnings and interest rates", "airline demand and tourist arrivals", "REIT dividends",
+        f"{ticker_names(1)[0]} outlook and risks", "inflation and MAS policy",
+    ]
+
+    def run_all():
+        return {"topics": len(topics), "output_chars": sum(len(news_search_tool._run(t, top_k=5)) for t in topics)}
+
+    # The most recent half year, which always overlaps the generated news
+    end = datetime.now().date()
+    start = (end - timedelta(days=182)).isoformat()
+
+    def run_filtered():
+        return {"output_chars": sum(
+            len(news_search_tool._run(t, top_k=5, start_date=start, end_date=end.isoformat())) for t in topics
+        )}
+
+    entries["semantic_search"] = results.timed(run_all, repeat)
+    entries["semantic_search_date_filtered"] = results.timed(run_filtered, repeat)
+    return entries
+
+
+def bench_eda(params, repeat):
+    """The dashboard's EDA loaders, uncached (what each cache miss costs)."""
+    import dashboard_data
+    from config import EDA_MAX_POINTS
+
+    indicator, ticker = indicator_names(1)[0], ticker_names(1)[0]
+    return {
+        "eda_list_series": results.timed(
+            lambda: {"indicators": len(dashboard_data.list_indicators()), "tickers": len(dashboard_data.list_tickers())},
+            repeat
+        ),
+        "eda_indicator_history": results.timed(
+            lambda: {"rows": len(dashboard_data.load_indicator_history(indicator))}, repeat
+        ),
+        "eda_stock_history": results.timed(lambda: {"rows": len(dashboard_data.load_stock_history(ticker))}, repeat),
+        "eda_stock_history_downsampled": results.timed(
+            lambda: {"rows": len(dashboard_data.load_stock_history(ticker, max_points=EDA_MAX_POINTS))}, repeat
+        ),
+    }
+
+
+def bench_run_analysis(params, repeat):
+    """The full briefing pipeline with the offline fake LLM: measures everything except model latency."""
+    try:
+        from agent_core import run_analysis
+    except ImportError as e:
+        return {"run_analysis_fake_llm": {"skipped": str(e)}}
+    return {"run_analysis_fake_llm": results.timed(lambda: {"chars": len(str(run_analysis()))}, repeat)}
+
+
+BENCHMARKS = {
+    "columnar_store": bench_columnar_store,
+    "store_sgx_data": bench_store_sgx_data,
+    "run_ingestion": bench_run_ingestion,
+    "analytics": bench_analytics,
+    "generate_forecasts": bench_generate_forecasts,
+    "walk_forward": bench_walk_forward,
+    "database_tool": bench_database_tool,
+    "semantic_search": bench_semantic_search,
+    "eda": bench_eda,
+    "run_analysis": bench_run_analysis,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    for name in ("indicators", "tickers", "years", "news"):
+        parser.add_argument(f"--{name}", type=int, help=f"Override the scale's number of {name}")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--forecast-backends", default="holt_winters,linear_seasonal,seasonal_naive",
+                        help="Comma-separated forecasting backends to time (add 'prophet' for the full model)")
+    parser.add_argument("--columnar", action="store_true", help="Serve history from the columnar store")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Scratch directory for the database and stores (default: a temp dir)")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    params = dict(SCALES[args.scale])
+    params.update({name: getattr(args, name) for name in params if getattr(args, name) is not None})
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ai_analyst_bench_")
+    _configure_environment(workdir, args.columnar)
+    print(f"Benchmarking at {params} in {workdir}")
+
+    from benchmarks.synthetic import generate
+
+    started = time.perf_counter()
+    setup = {"generate": generate(seed=args.seed, **params)}
+    setup["generate"]["total"] = time.perf_counter() - started
+    print(f"Generated synthetic data in {setup['generate']['total']:.1f}s")
+
+    entries = {}
+    for name in args.only or BENCHMARKS:
+        bench = BENCHMARKS[name]
+        print(f"\n=== {name} ===")
+        if name == "generate_forecasts":
+            found = bench(params, args.repeat, [b.strip() for b in args.forecast_backends.split(",") if b.strip()])
+        else:
+            found = bench(params, args.repeat)
+        entries.update(found)
+
+    print("\n" + f"{'benchmark':<48}{'median':>10}{'min':>10}")
+    for name, entry in entries.items():
+        if "skipped" in entry:
+            print(f"{name:<48}{'skipped':>10}  {entry['skipped']}")
+        else:
+            print(f"{name:<48}{entry['median_seconds']:>10.4f}{entry['min_seconds']:>10.4f}")
+
+    if args.output:
+        results.write(
+            results.report("suite", entries, scale=args.scale, params=params, columnar=args.columnar, setup=setup),
+            args.output
+        )
+    if args.baseline:
+        return 1 if results.compare(entries, args.baseline, args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
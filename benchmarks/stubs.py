@@ -0,0 +1,145 @@
+# benchmarks/stubs.py
+"""Offline stand-ins for the network sources used by the benchmarks and tests."""
+import json
+import threading
+import time
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+from benchmarks.synthetic import price_matrix
+
+
+class SyntheticPriceProvider:
+    """
+    Implements YFinanceProvider's download(tickers, start, end) with random-walk
+    prices in yf.download's (field, ticker) layout. `latency_seconds` is slept
+    per call to stand in for a network round trip, and the first `failures`
+    calls raise ConnectionError as a throttled or flaky source would.
+    The monotonic time of every call is kept in `call_times`.
+    """
+
+    def __init__(self, seed=0, latency_seconds=0.0, failures=0):
+        self.seed = seed
+        self.latency_seconds = latency_seconds
+        self.failures = failures
+        self.calls = 0
+        self.call_times = []
+        self._lock = threading.Lock()
+
+    def download(self, tickers, start, end):
+        with self._lock:
+            self.calls += 1
+            self.call_times.append(time.monotonic())
+            failing = self.calls <= self.failures
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if failing:
+            raise ConnectionError("synthetic provider unavailable")
+        tickers = list(tickers)
+        # yfinance's end date is exclusive
+        dates = pd.bdate_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize() - pd.Timedelta(days=1))
+        seed = zlib.crc32(",".join(tickers).encode("utf-8")) ^ self.seed
+        closes, volumes = price_matrix(tickers, dates, seed)
+        return pd.concat(
+            {
+                "Close": pd.DataFrame(closes, index=dates, columns=tickers),
+                "Volume": pd.DataFrame(volumes, index=dates, columns=tickers),
+            },
+            axis=1
+        )
+
+
+def singstat_payload(resource_id, time_from, time_to):
+    """A SingStat tabledata response with one deterministic monthly value per period in [time_from, time_to] (YYYYMM)."""
+    periods = pd.period_range(datetime.strptime(time_from, "%Y%m"), datetime.strptime(time_to, "%Y%m"), freq="M")
+    base = 50 + zlib.crc32(resource_id.encode("utf-8")) % 100
+    rows = [
+        {"key": period.strftime("%Y %b"), "columns": [{"key": "value", "value": f"{base + i * 0.5:.1f}"}]}
+        for i, period in enumerate(periods)
+    ]
+    return {"Data": {"resourceId": resource_id, "row": rows}, "StatusCode": 200}
+
+
+class SingStatStub:
+    """
+    A local SingStat tabledata API on a threaded http.server, for running
+    ingestion offline. Point SINGSTAT_API_URL at `url`; every POST is
+    answered with singstat_payload() for the requested resource and window.
+
+    `fail(resource_id, *statuses)` queues error responses (e.g. 429, 503)
+    that the resource's next requests get before it succeeds again; with
+    resource_id None they apply to whichever resources ask first. Each
+    request is kept in `requests` as (resource_id, monotonic time, status).
+    Use as a context manager, or call start() / stop().
+    """
+
+    def __init__(self, latency_seconds=0.0):
+        self.latency_seconds = latency_seconds
+        self.requests = []
+        self._failures = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def fail(self, resource_id, *statuses):
+        with self._lock:
+            self._failures.setdefault(resource_id, []).extend(statuses)
+
+    def requests_for(self, resource_id):
+        """[(monotonic time, status)] of the requests made for one resource."""
+        with self._lock:
+            return [(at, status) for rid, at, status in self.requests if rid == resource_id]
+
+    def _respond(self, body):
+        resource_id = body.get("resourceId", "")
+        with self._lock:
+            queued = self._failures.get(resource_id) or self._failures.get(None)
+            status = queued.pop(0) if queued else 200
+            self.requests.append((resource_id, time.monotonic(), status))
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if status != 200:
+            return status, {"StatusCode": status, "Message": "stubbed failure"}
+        criteria = body.get("searchCriteria", {})
+        return status, singstat_payload(resource_id, criteria["timeFrom"], criteria["timeTo"])
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/table/tabledata"
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                status, payload = stub._respond(json.loads(self.rfile.read(length) or b"{}"))
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="singstat-stub", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,134 @@
+# benchmarks/synthetic.py
+"""
+Synthetic data for benchmarks: fills the configured database with N
+indicators, M tickers with Y years of daily prices and K news articles.
+Everything is derived from a seed, so every run at a scale sees the same data.
+"""
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+SCALES = {
+    "small": {"indicators": 10, "tickers": 20, "years": 2, "news": 1_000},
+    "medium": {"indicators": 50, "tickers": 200, "years": 5, "news": 20_000},
+    "large": {"indicators": 200, "tickers": 800, "years": 10, "news": 200_000},
+}
+
+# Series the agent pipeline asks for by name (config.ANALYSIS_MACRO_INDICATORS / ANALYSIS_WATCHLIST)
+_NAMED_INDICATORS = ["GDP_Quarterly", "CPI_All_Items"]
+_NAMED_TICKERS = ["C6L.SI", "D05.SI"]
+
+_SECTORS = ["banking", "aviation", "telecommunications", "property", "REIT", "manufacturing", "shipping", "retail"]
+_EVENTS = [
+    "reported quarterly earnings above expectations", "cut its full-year guidance", "announced a share buyback",
+    "faces rising funding costs", "expanded into regional markets", "was downgraded by analysts",
+    "benefits from lower interest rates", "warned of weaker demand", "raised its dividend",
+    "is exposed to a slowdown in China", "won a major government contract", "saw margins squeezed by wages",
+]
+_MACRO = [
+    "inflation eased", "GDP growth slowed", "exports rebounded", "the Singapore dollar strengthened",
+    "MAS kept policy unchanged", "retail sales fell", "manufacturing output expanded", "tourist arrivals climbed",
+]
+
+
+def indicator_names(count):
+    return (_NAMED_INDICATORS + [f"Indicator_{i:03d}" for i in range(count)])[:count]
+
+
+def ticker_names(count, prefix="S"):
+    return (_NAMED_TICKERS + [f"{prefix}{i:04d}.SI" for i in range(count)])[:count]
+
+
+def price_matrix(tickers, dates, seed=0):
+    """Geometric random-walk closes and lognormal volumes, as (len(dates), len(tickers)) arrays."""
+    rng = np.random.default_rng(seed)
+    drift = rng.normal(0.0002, 0.0003, len(tickers))
+    vol = rng.uniform(0.008, 0.025, len(tickers))
+    returns = rng.normal(drift, vol, (len(dates), len(tickers)))
+    closes = rng.uniform(1, 50, len(tickers)) * np.exp(np.cumsum(returns, axis=0))
+    volumes = rng.lognormal(13, 1, (len(dates), len(tickers))).astype(np.int64)
+    return closes, volumes
+
+
+def _indicator_rows(names, years, end, rng):
+    months = pd.date_range(end=end, periods=max(years * 12, 24), freq='MS')
+    for i, name in enumerate(names):
+        trend = rng.normal(0.002, 0.003)
+        season = rng.uniform(0, 0.03) * np.sin(2 * np.pi * np.arange(len(months)) / 12)
+        noise = rng.normal(0, 0.01, len(months))
+        values = 100 * np.exp(np.cumsum(trend + noise) + season)
+        yield from zip([name] * len(months), months.strftime('%Y-%m-%d'), values.tolist())
+
+
+def _price_rows(tickers, years, end, seed):
+    dates = pd.bdate_range(end=end, periods=years * 252)
+    closes, volumes = price_matrix(tickers, dates, seed)
+    date_strings = dates.strftime('%Y-%m-%d %H:%M:%S')
+    # Ticker by ticker, so rows arrive in index order
+    for j, ticker in enumerate(tickers):
+        yield from zip([ticker] * len(dates), date_strings, closes[:, j].tolist(), volumes[:, j].tolist())
+
+
+def _news_rows(count, tickers, years, end, rng):
+    days = pd.date_range(end=end, periods=years * 365, freq='D').strftime('%Y-%m-%d')
+    for _ in range(count):
+        ticker = tickers[rng.integers(len(tickers))]
+        sentences = [
+            f"{ticker} ({_SECTORS[rng.integers(len(_SECTORS))]}) {_EVENTS[rng.integers(len(_EVENTS))]}.",
+            f"Meanwhile {_MACRO[rng.integers(len(_MACRO))]} and {_MACRO[rng.integers(len(_MACRO))]}.",
+            f"Peers in {_SECTORS[rng.integers(len(_SECTORS))]} {_EVENTS[rng.integers(len(_EVENTS))]}.",
+        ]
+        yield "Synthetic Wire", days[rng.integers(len(days))], " ".join(sentences)
+
+
+def generate(indicators, tickers, years, news, seed=0, end=None):
+    """
+    Replaces the contents of the configured database with synthetic data and
+    returns seconds spent per table. Ingestion watermarks and table versions
+    are updated the way ingestion would, so incremental code paths see a
+    consistent database.
+    """
+    from db import bump_table_versions, transaction
+
+    end = pd.Timestamp(end or datetime.now().date()) - pd.Timedelta(days=1)
+    rng = np.random.default_rng(seed)
+    timings = {}
+    with transaction() as conn:
+        for table in ("singstat_data", "sgx_stocks_daily", "unstructured_news", "ingestion_watermarks"):
+            conn.execute(f"DELETE FROM {table};")
+
+        started = time.perf_counter()
+        conn.executemany(
+            "INSERT INTO singstat_data (indicator_name, record_date, value) VALUES (?, ?, ?)",
+            _indicator_rows(indicator_names(indicators), years, end, rng)
+        )
+        timings["singstat_data"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        conn.executemany(
+            "INSERT INTO sgx_stocks_daily (ticker, record_date, close_price, volume) VALUES (?, ?, ?, ?)",
+            _price_rows(ticker_names(tickers), years, end, seed)
+        )
+        timings["sgx_stocks_daily"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        conn.executemany(
+            "INSERT INTO unstructured_news (source, published_date, content) VALUES (?, ?, ?)",
+            _news_rows(news, ticker_names(tickers), years, end, rng)
+        )
+        timings["unstructured_news"] = time.perf_counter() - started
+
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn.execute(
+            """INSERT INTO ingestion_watermarks (source, series, high_water_mark, updated_at)
+               SELECT 'singstat', indicator_name, substr(MAX(record_date), 1, 10), ? FROM singstat_data GROUP BY indicator_name""",
+            (now,)
+        )
+        conn.execute(
+            """INSERT INTO ingestion_watermarks (source, series, high_water_mark, updated_at)
+               SELECT 'sgx', ticker, substr(MAX(record_date), 1, 10), ? FROM sgx_stocks_daily GROUP BY ticker""",
+            (now,)
+        )
+        bump_table_versions(conn, "singstat_data", "sgx_stocks_daily", "unstructured_news", "ingestion_watermarks")
+    return timings
@@ -0,0 +1,302 @@
+# columnar_store.py
+import os
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+from db import bump_table_versions, query_all, transaction
+from config import COLUMNAR_STORE_ENABLED, COLUMNAR_STORE_DIR, COLUMNAR_STORE_MAX_PARTS
+
+# History tables mirrored into the store: table -> (series column, value columns)
+DATASETS = {
+    "sgx_stocks_daily": ("ticker", ("close_price", "volume")),
+    "singstat_data": ("indicator_name", ("value",)),
+}
+
+# The resolution pandas parses date strings to (ns before pandas 3, us since), so
+# frames read from here hash and compare equal to the ones parsed from SQLite
+_DATE_DTYPE = pd.to_datetime(pd.Series(["2000-01-01"])).dtype
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def enabled():
+    """True when the store is switched on (COLUMNAR_STORE_ENABLED) and pyarrow is installed."""
+    if not COLUMNAR_STORE_ENABLED:
+        return False
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _schema(table):
+    import pyarrow as pa
+
+    _, value_columns = DATASETS[table]
+    unit, _ = np.datetime_data(_DATE_DTYPE)
+    return pa.schema([("record_date", pa.timestamp(unit))] + [(column, pa.float64()) for column in value_columns])
+
+
+def _write_part(table, series, frame):
+    """
+    Writes one series' rows (record_date + value columns) as a new Arrow IPC
+    file and returns its path relative to the store. Files are uncompressed
+    so readers can memory-map them.
+    """
+    import pyarrow as pa
+
+    relative = os.path.join(table, quote(series, safe=""), f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.arrow")
+    path = os.path.join(COLUMNAR_STORE_DIR, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    schema = _schema(table)
+    arrays = [pa.array(frame[field.name].to_numpy(), type=field.type, from_pandas=True) for field in schema]
+    tmp = f"{path}.tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    os.replace(tmp, path)
+    return relative
+
+
+def _to_frame(table, rows):
+    """(series, date, *values) tuples -> a frame with the series column, parsed record_date and float values."""
+    key_column, value_columns = DATASETS[table]
+    frame = pd.DataFrame(rows, columns=[key_column, "record_date", *value_columns])
+    frame["record_date"] = pd.to_datetime(frame["record_date"], format="ISO8601").astype(_DATE_DTYPE)
+    for column in value_columns:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce").astype(float)
+    return frame
+
+
+def _catalog_rows(table, frame):
+    """Writes one part per series of `frame` and returns their catalog rows."""
+    key_column, _ = DATASETS[table]
+    created_at = _now()
+    catalog = []
+    for series, group in frame.groupby(key_column, sort=False):
+        group = group.sort_values("record_date", kind="stable")
+        relative = _write_part(table, series, group)
+        catalog.append((
+            table, series, relative, len(group),
+            group["record_date"].iloc[0].strftime('%Y-%m-%d'), group["record_date"].iloc[-1].strftime('%Y-%m-%d'),
+            created_at,
+        ))
+    return catalog
+
+
+def _insert_catalog(conn, catalog):
+    conn.executemany(
+        """INSERT INTO columnar_partitions (table_name, series, path, row_count, min_date, max_date, created_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        catalog
+    )
+
+
+def append(conn, table, rows):
+    """
+    Appends freshly upserted rows of `table` as new partition files, inside
+    the caller's write transaction and after it has bumped the table's
+    version. Only a store that was in sync before this write is extended;
+    one that fell behind stays stale (and unused) until rebuild().
+    Revised values simply land in a newer file, since reads keep the
+    newest value per date.
+    """
+    if not rows or not enabled():
+        return 0
+    synced = conn.execute("SELECT source_version FROM columnar_datasets WHERE table_name = ?", (table,)).fetchone()
+    version = conn.execute("SELECT version FROM table_versions WHERE table_name = ?", (table,)).fetchone()
+    if synced is None or version is None or synced[0] != version[0] - 1:
+        return 0
+    _insert_catalog(conn, _catalog_rows(table, _to_frame(table, rows)))
+    conn.execute(
+        "UPDATE columnar_datasets SET source_version = ?, synced_at = ? WHERE table_name = ?",
+        (version[0], _now(), table)
+    )
+    bump_table_versions(conn, "columnar_partitions", "columnar_datasets")
+    return len(rows)
+
+
+def _delete_files(paths):
+    for relative in paths:
+        try:
+            os.remove(os.path.join(COLUMNAR_STORE_DIR, relative))
+        except FileNotFoundError:
+            pass
+
+
+def compact(table, max_parts=None):
+    """
+    Merges the partition files of every series of `table` that has more than
+    `max_parts` (COLUMNAR_STORE_MAX_PARTS) of them into one, so repeated
+    incremental appends do not leave reads opening many small files.
+    """
+    if not enabled():
+        return 0
+    max_parts = max_parts or COLUMNAR_STORE_MAX_PARTS
+    obsolete = []
+    with transaction() as conn:
+        crowded = [row[0] for row in conn.execute(
+            "SELECT series FROM columnar_partitions WHERE table_name = ? GROUP BY series HAVING COUNT(*) > ?",
+            (table, max_parts)
+        ).fetchall()]
+        key_column, _ = DATASETS[table]
+        for series in crowded:
+            paths = _series_paths(conn, table, series)
+            merged = _read_parts(paths, table).assign(**{key_column: series})
+            catalog = _catalog_rows(table, merged)
+            conn.execute("DELETE FROM columnar_partitions WHERE table_name = ? AND series = ?", (table, series))
+            _insert_catalog(conn, catalog)
+            obsolete.extend(paths)
+        if crowded:
+            bump_table_versions(conn, "columnar_partitions")
+    # Only once the catalog no longer points at them
+    _delete_files(obsolete)
+    return len(crowded)
+
+
+def rebuild(tables=None):
+    """
+    Rewrites the store from SQLite: one file per series, replacing any
+    existing partitions, and marks each dataset as in sync with its table's
+    current version. Holds the write lock while it runs, so no upsert can
+    slip in between the export and the catalog update.
+    """
+    if not enabled():
+        print("Columnar store is disabled (set COLUMNAR_STORE_ENABLED=1 and install pyarrow).")
+        return {}
+    counts, obsolete = {}, []
+    for table in tables or DATASETS:
+        key_column, value_columns = DATASETS[table]
+        started = time.perf_counter()
+        with transaction() as conn:
+            rows = conn.execute(
+                f"SELECT {key_column}, record_date, {', '.join(value_columns)} FROM {table} "
+                f"ORDER BY {key_column}, record_date"
+            ).fetchall()
+            obsolete.extend(row[0] for row in conn.execute(
+                "SELECT path FROM columnar_partitions WHERE table_name = ?", (table,)
+            ).fetchall())
+            conn.execute("DELETE FROM columnar_partitions WHERE table_name = ?", (table,))
+            if rows:
+                _insert_catalog(conn, _catalog_rows(table, _to_frame(table, rows)))
+            version = conn.execute("SELECT version FROM table_versions WHERE table_name = ?", (table,)).fetchone()
+            conn.execute(
+                """INSERT INTO columnar_datasets (table_name, source_version, synced_at) VALUES (?, ?, ?)
+                   ON CONFLICT (table_name) DO UPDATE SET source_version = excluded.source_version,
+                       synced_at = excluded.synced_at""",
+                (table, version[0] if version else 0, _now())
+            )
+            bump_table_versions(conn, "columnar_partitions", "columnar_datasets")
+        counts[table] = len(rows)
+        print(f"Rebuilt columnar {table}: {len(rows)} rows in {time.perf_counter() - started:.1f}s.")
+    _delete_files(obsolete)
+    return counts
+
+
+def is_current(table):
+    """True when the store holds exactly what `table` holds, i.e. no write bypassed it since the last sync."""
+    rows = query_all(
+        """SELECT c.source_version, COALESCE(v.version, 0) FROM columnar_datasets c
+           LEFT JOIN table_versions v ON v.table_name = c.table_name WHERE c.table_name = ?""",
+        (table,)
+    )
+    return bool(rows) and rows[0][0] == rows[0][1]
+
+
+def _series_paths(conn, table, series):
+    return [row[0] for row in conn.execute(
+        "SELECT path FROM columnar_partitions WHERE table_name = ? AND series = ? ORDER BY path",
+        (table, series)
+    ).fetchall()]
+
+
+def _map_parts(paths):
+    """Memory-maps Arrow files into tables whose buffers point into the mapped pages."""
+    import pyarrow as pa
+
+    tables = []
+    for relative in paths:
+        with pa.memory_map(os.path.join(COLUMNAR_STORE_DIR, relative), "r") as source:
+            tables.append(pa.ipc.open_file(source).read_all())
+    return tables
+
+
+def _to_pandas(tables, table, columns=None):
+    import pyarrow as pa
+
+    if not tables:
+        return pd.DataFrame({field.name: pd.Series(dtype=field.type.to_pandas_dtype()) for field in _schema(table)})
+    data = pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+    if columns is not None:
+        data = data.select(["record_date", *columns])
+    frame = data.to_pandas()
+    if frame["record_date"].dtype != _DATE_DTYPE:
+        # Files written under another pandas version
+        frame["record_date"] = frame["record_date"].astype(_DATE_DTYPE)
+    return frame
+
+
+def _ordered(frame):
+    """
+    Sorts one series by record_date, keeping the newest value for a date
+    written twice. A single, already ordered file is returned as it is.
+    """
+    dates = frame["record_date"].to_numpy()
+    if len(dates) > 1 and not (dates[1:] > dates[:-1]).all():
+        # Stable sort keeps later files after earlier ones for equal dates
+        frame = frame.iloc[np.argsort(dates, kind="stable")]
+        frame = frame.drop_duplicates("record_date", keep="last")
+    return frame.reset_index(drop=True)
+
+
+def _read_parts(paths, table, columns=None):
+    """One series' files (oldest first) as a single frame sorted by record_date."""
+    return _ordered(_to_pandas(_map_parts(paths), table, columns))
+
+
+def read_series(table, series, columns=None):
+    """
+    One series' history as a frame of record_date plus `columns` (default:
+    all value columns), or None when the store cannot serve `table` (disabled
+    or out of sync), in which case callers read SQLite instead.
+    """
+    if not (enabled() and is_current(table)):
+        return None
+    try:
+        paths = query_all(
+            "SELECT path FROM columnar_partitions WHERE table_name = ? AND series = ? ORDER BY path",
+            (table, series)
+        )
+        return _read_parts([row[0] for row in paths], table, columns)
+    except (OSError, ValueError) as e:
+        # e.g. a file removed by a concurrent compaction
+        print(f"Columnar read of {table}/{series} failed, falling back to SQLite: {e}")
+        return None
+
+
+def read_table(table, columns=None):
+    """Every series of `table` as {series: frame}, sorted by series; None when the store cannot serve it."""
+    if not (enabled() and is_current(table)):
+        return None
+    catalog = query_all(
+        "SELECT series, path FROM columnar_partitions WHERE table_name = ? ORDER BY series, path", (table,)
+    )
+    try:
+        # One conversion for the whole table, then a slice per series
+        tables = _map_parts([path for _, path in catalog])
+        frame = _to_pandas(tables, table, columns)
+    except (OSError, ValueError) as e:
+        print(f"Columnar read of {table} failed, falling back to SQLite: {e}")
+        return None
+    series = np.repeat([name for name, _ in catalog], [t.num_rows for t in tables])
+    names, starts = np.unique(series, return_index=True)
+    ends = np.append(starts[1:], len(series))
+    return {name: _ordered(frame.iloc[start:end]) for name, start, end in zip(names, starts, ends)}
+
+if __name__ == '__main__':
+    rebuild()
@@ -10,7 +10,156 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 VERTEX_AI_PROJECT = os.getenv("VERTEX_AI_PROJECT")
 VERTEX_AI_LOCATION = os.getenv("VERTEX_AI_LOCATION")
 SINGSTAT_API_KEY = os.getenv("SINGSTAT_API_KEY")
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-1.5-pro-preview-0409")
+# 'cache' (default), 'off', 'record', 'replay' or 'fake'; see llm_cache.build_llm
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "cache")
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "llm_cache")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 100 * 1024 * 1024))
+# Responses captured in 'record' mode and served in 'replay' mode
+LLM_RECORDINGS_DIR = os.getenv("LLM_RECORDINGS_DIR", "llm_recordings")
 
 
 # --- Database Configuration ---
-DATABASE_NAME = "investment_analysis.db"
+DATABASE_NAME = os.getenv("DATABASE_NAME", "investment_analysis.db")
+# Connections kept per process by db.ConnectionPool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+# How long a writer waits on another writer's lock before giving up
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "30000"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", 64 * 1024))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", 256 * 1024 * 1024))
+
+
+# --- Ingestion Configuration ---
+# Overridable so ingestion can run against a local stub server
+SINGSTAT_API_URL = os.getenv("SINGSTAT_API_URL", "https://tablebuilder.singstat.gov.sg/api/table/tabledata")
+INGESTION_MAX_WORKERS = int(os.getenv("INGESTION_MAX_WORKERS", "8"))
+INGESTION_MAX_RETRIES = int(os.getenv("INGESTION_MAX_RETRIES", "4"))
+# First retry delay; doubles on every further attempt
+INGESTION_BACKOFF_SECONDS = float(os.getenv("INGESTION_BACKOFF_SECONDS", "0.5"))
+INGESTION_HTTP_TIMEOUT_SECONDS = float(os.getenv("INGESTION_HTTP_TIMEOUT_SECONDS", "30"))
+SINGSTAT_REQUESTS_PER_SECOND = float(os.getenv("SINGSTAT_REQUESTS_PER_SECOND", "5"))
+YFINANCE_REQUESTS_PER_SECOND = float(os.getenv("YFINANCE_REQUESTS_PER_SECOND", "2"))
+# Tickers per multi-ticker yfinance download
+SGX_DOWNLOAD_CHUNK_SIZE = int(os.getenv("SGX_DOWNLOAD_CHUNK_SIZE", "100"))
+# Rows per write transaction; also the most rows held as Python tuples at once
+INGESTION_WRITE_BATCH_ROWS = int(os.getenv("INGESTION_WRITE_BATCH_ROWS", "50000"))
+
+
+# --- Forecasting Configuration ---
+FORECAST_HORIZON_DAYS = 90
+FORECAST_MIN_HISTORY = 12
+# 'prophet', or a NumPy-only model: 'holt_winters', 'linear_seasonal', 'seasonal_naive'
+FORECAST_BACKEND = os.getenv("FORECAST_BACKEND", "prophet")
+# Number of worker processes used to fit models; 1 runs everything in-process.
+FORECAST_MAX_WORKERS = int(os.getenv("FORECAST_MAX_WORKERS", os.cpu_count() or 1))
+# Wall-clock limit for a single indicator's fit + predict.
+FORECAST_TIMEOUT_SECONDS = float(os.getenv("FORECAST_TIMEOUT_SECONDS", "300"))
+
+# --- Backtesting Configuration ---
+# Forecasts of past history prefixes (see backtesting.py), kept so repeated evaluations only fit new ones
+BACKTEST_CACHE_DIR = os.getenv("BACKTEST_CACHE_DIR", "backtest_cache")
+BACKTEST_CACHE_MAX_BYTES = int(os.getenv("BACKTEST_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+# Default walk-forward cutoffs: this many dates, one per pandas frequency step, ending at the latest data
+BACKTEST_CUTOFFS = int(os.getenv("BACKTEST_CUTOFFS", "24"))
+BACKTEST_CUTOFF_FREQ = os.getenv("BACKTEST_CUTOFF_FREQ", "ME")
+# Holding periods, in trading days, over which briefing picks are scored
+BACKTEST_PICK_HORIZONS = [int(h) for h in os.getenv("BACKTEST_PICK_HORIZONS", "5,21,63").split(",") if h.strip()]
+
+# --- Analytics Configuration ---
+# Minimum overlapping periods (months, or quarters for quarterly indicators) before a stock/indicator correlation is stored
+ANALYTICS_MIN_CORRELATION_PERIODS = int(os.getenv("ANALYTICS_MIN_CORRELATION_PERIODS", "12"))
+
+# --- Columnar Store Configuration ---
+# Optional Arrow copy of the price and indicator history (see columnar_store.py);
+# needs pyarrow and a one-off `python columnar_store.py` to build it
+COLUMNAR_STORE_ENABLED = os.getenv("COLUMNAR_STORE_ENABLED", "0").lower() in ("1", "true", "yes")
+COLUMNAR_STORE_DIR = os.getenv("COLUMNAR_STORE_DIR", "columnar_store")
+# Files per series before they are merged into one
+COLUMNAR_STORE_MAX_PARTS = int(os.getenv("COLUMNAR_STORE_MAX_PARTS", "8"))
+
+# --- Model Store Configuration ---
+# Fitted Prophet models, serialized to JSON and evicted least-recently-used first.
+MODEL_STORE_DIR = os.getenv("MODEL_STORE_DIR", "model_store")
+MODEL_STORE_MAX_BYTES = int(os.getenv("MODEL_STORE_MAX_BYTES", 200 * 1024 * 1024))
+MODEL_STORE_MAX_ENTRIES = int(os.getenv("MODEL_STORE_MAX_ENTRIES", "500"))
+
+# --- News Vector Index Configuration ---
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "vector_index")
+# Width of the hashed embeddings; changing it rebuilds the index.
+VECTOR_INDEX_DIM = int(os.getenv("VECTOR_INDEX_DIM", "256"))
+
+# --- Dashboard Configuration ---
+# Rows per series plotted in the EDA tab when downsampling is on
+EDA_MAX_POINTS = int(os.getenv("EDA_MAX_POINTS", "1500"))
+
+# --- Analysis Pipeline Configuration ---
+# Threads running independent briefing steps (data pulls and agent tasks) concurrently
+ANALYSIS_MAX_WORKERS = int(os.getenv("ANALYSIS_MAX_WORKERS", "6"))
+# Candidate stocks the briefing screens, as comma-separated tickers
+ANALYSIS_WATCHLIST = [t.strip() for t in os.getenv("ANALYSIS_WATCHLIST", "C6L.SI,D05.SI").split(",") if t.strip()]
+# Indicators the macro analysis is built around
+ANALYSIS_MACRO_INDICATORS = [
+    i.strip() for i in os.getenv("ANALYSIS_MACRO_INDICATORS", "GDP_Quarterly,CPI_All_Items").split(",") if i.strip()
+]
+# Days from the end of an indicator's reference period until its value is published, so
+# backfill snapshots hide a value until then; "name:days" pairs, other indicators use the default
+INDICATOR_RELEASE_LAG_DAYS = {
+    name.strip(): int(days)
+    for name, days in (
+        pair.split(":") for pair in os.getenv("INDICATOR_RELEASE_LAG_DAYS", "CPI_All_Items:23,GDP_Quarterly:55").split(",")
+        if pair.strip()
+    )
+}
+INDICATOR_DEFAULT_RELEASE_LAG_DAYS = int(os.getenv("INDICATOR_DEFAULT_RELEASE_LAG_DAYS", "30"))
+# Past dates a briefing backfill generates at the same time (each runs its own step threads)
+BACKFILL_MAX_WORKERS = int(os.getenv("BACKFILL_MAX_WORKERS", "2"))
+# Finished backfill briefings written per transaction
+BACKFILL_WRITE_BATCH = int(os.getenv("BACKFILL_WRITE_BATCH", "10"))
+
+# --- Briefing Memory Configuration ---
+# zlib level (0-9) of the stored briefing markdown (see memory.py)
+BRIEFING_COMPRESSION_LEVEL = int(os.getenv("BRIEFING_COMPRESSION_LEVEL", "9"))
+# Longest one-line conclusion and per-ticker risk kept per briefing
+MEMORY_SUMMARY_CHARS = int(os.getenv("MEMORY_SUMMARY_CHARS", "400"))
+MEMORY_RISK_CHARS = int(os.getenv("MEMORY_RISK_CHARS", "200"))
+# Past conclusions the memory tool returns by default, and the token budget they must fit
+MEMORY_RECALL_LAST_N = int(os.getenv("MEMORY_RECALL_LAST_N", "5"))
+MEMORY_RECALL_MAX_TOKENS = int(os.getenv("MEMORY_RECALL_MAX_TOKENS", "400"))
+# Rough characters per LLM token, used to estimate how much text fits a token budget
+MEMORY_CHARS_PER_TOKEN = int(os.getenv("MEMORY_CHARS_PER_TOKEN", "4"))
+
+# --- Background Job Configuration ---
+# Jobs (ingestion, forecasting, analysis) run at the same time per process
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "2"))
+# Minimum gap between progress writes to the jobs table
+JOB_PROGRESS_INTERVAL_SECONDS = float(os.getenv("JOB_PROGRESS_INTERVAL_SECONDS", "0.5"))
+# How often the dashboard re-reads the job list while it is open
+JOB_STATUS_REFRESH_SECONDS = float(os.getenv("JOB_STATUS_REFRESH_SECONDS", "2"))
+
+# --- Telemetry Configuration ---
+# Per-run timing spans and counters stored in the run_metrics table (see telemetry.py)
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1").lower() not in ("0", "false", "no")
+# Runs older than this are deleted when a new run is stored
+TELEMETRY_RETENTION_DAYS = float(os.getenv("TELEMETRY_RETENTION_DAYS", "30"))
+# Longer attribute strings (e.g. SQL text) are truncated
+TELEMETRY_MAX_ATTRIBUTE_CHARS = int(os.getenv("TELEMETRY_MAX_ATTRIBUTE_CHARS", "500"))
+
+# --- Agent Tool Configuration ---
+# Rendered DatabaseTool results kept in memory (LRU)
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "256"))
+# Budgets for tool output placed in LLM prompts; larger results are summarized
+TOOL_MAX_ROWS = int(os.getenv("TOOL_MAX_ROWS", "50"))
+TOOL_MAX_CHARS = int(os.getenv("TOOL_MAX_CHARS", "4000"))
+# 'csv' or 'markdown'
+TOOL_RESULT_FORMAT = os.getenv("TOOL_RESULT_FORMAT", "csv")
+# Characters of each news article's content returned by the search tool
+TOOL_NEWS_SNIPPET_CHARS = int(os.getenv("TOOL_NEWS_SNIPPET_CHARS", "400"))
+# Rows the database tool reads from SQLite at a time; results over TOOL_MAX_ROWS are summarized chunk by chunk
+TOOL_QUERY_CHUNK_ROWS = int(os.getenv("TOOL_QUERY_CHUNK_ROWS", "20000"))
+
+# --- Export Configuration ---
+# Where export_data.py writes table exports, and the rows it reads and writes at a time
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
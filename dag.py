@@ -0,0 +1,124 @@
+# dag.py
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Node:
+    """
+    One step of a pipeline. `fn` is called with a dict of the results of the
+    nodes named in `deps`, and its return value becomes this node's result.
+    """
+
+    def __init__(self, name, fn, deps=()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+
+class DagRun:
+    """Results, errors and per-node timings of one run_dag call."""
+
+    def __init__(self, nodes):
+        self.nodes = {node.name: node for node in nodes}
+        self.results = {}
+        self.errors = {}
+        self.skipped = []
+        # name -> (start, end), as perf_counter offsets from the start of the run
+        self.timings = {}
+        self.wall_seconds = 0.0
+
+    def seconds(self, name):
+        start, end = self.timings.get(name, (0.0, 0.0))
+        return end - start
+
+    def critical_path(self):
+        """The chain of dependent nodes with the largest total run time, and that total."""
+        best = {}
+
+        def longest(name):
+            if name not in best:
+                chains = [longest(dep) for dep in self.nodes[name].deps]
+                path, secs = max(chains, key=lambda chain: chain[1], default=([], 0.0))
+                best[name] = (path + [name], secs + self.seconds(name))
+            return best[name]
+
+        return max((longest(name) for name in self.nodes), key=lambda chain: chain[1], default=([], 0.0))
+
+    def report(self):
+        """A per-node timing table plus wall time against the critical path and the serial sum."""
+        lines = [f"{'node':<28}{'start':>8}{'secs':>8}  status"]
+        for name, (start, end) in sorted(self.timings.items(), key=lambda item: item[1][0]):
+            status = "error" if name in self.errors else "ok"
+            lines.append(f"{name:<28}{start:>8.2f}{end - start:>8.2f}  {status}")
+        for name in self.skipped:
+            lines.append(f"{name:<28}{'-':>8}{'-':>8}  skipped")
+        path, path_secs = self.critical_path()
+        serial = sum(end - start for start, end in self.timings.values())
+        lines.append(
+            f"Wall {self.wall_seconds:.2f}s | critical path {path_secs:.2f}s ({' -> '.join(path)}) | "
+            f"sum of nodes {serial:.2f}s"
+        )
+        return "\n".join(lines)
+
+
+def run_dag(nodes, max_workers=None, on_node_done=None):
+    """
+    Runs `nodes` on a thread pool, starting each one as soon as all of its
+    dependencies have finished, so independent branches overlap and the run
+    takes roughly as long as its critical path. A failing node is recorded in
+    `errors` and every node downstream of it is skipped; the rest still run.
+    `on_node_done(name, finished, total)` is called on the calling thread
+    after each node completes. Nodes see the caller's context variables.
+    """
+    run = DagRun(nodes)
+    for node in nodes:
+        missing = [dep for dep in node.deps if dep not in run.nodes]
+        if missing:
+            raise ValueError(f"Node '{node.name}' depends on unknown nodes: {missing}")
+    pending = dict(run.nodes)
+    started = time.perf_counter()
+
+    def call(node, inputs):
+        begin = time.perf_counter() - started
+        try:
+            return node.fn(inputs)
+        finally:
+            run.timings[node.name] = (begin, time.perf_counter() - started)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        running = {}
+        while pending or running:
+            for name, node in list(pending.items()):
+                if any(dep in run.errors or dep in run.skipped for dep in node.deps):
+                    run.skipped.append(name)
+                    del pending[name]
+                elif all(dep in run.results for dep in node.deps):
+                    inputs = {dep: run.results[dep] for dep in node.deps}
+                    # Each node runs in a copy of the caller's context, so job
+                    # progress and telemetry spans reach the worker threads
+                    running[executor.submit(contextvars.copy_context().run, call, node, inputs)] = name
+                    del pending[name]
+            if not running:
+                if pending:
+                    # Whatever is left waits on a cycle
+                    raise ValueError(f"Dependency cycle among nodes: {sorted(pending)}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    run.results[name] = future.result()
+                except Exception as e:
+                    run.errors[name] = e
+                    print(f"Pipeline step '{name}' failed: {e}")
+                if on_node_done:
+                    on_node_done(name, len(run.results) + len(run.errors), len(run.nodes))
+    except BaseException:
+        # e.g. a cancelled job: drop the steps that have not started yet
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    run.wall_seconds = time.perf_counter() - started
+    return run
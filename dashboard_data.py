@@ -0,0 +1,117 @@
+# dashboard_data.py
+import numpy as np
+import pandas as pd
+import columnar_store
+from db import get_table_versions, query_df
+
+# Tables each loader reads, for change tokens
+INDICATOR_TABLES = ("singstat_data", "indicator_forecasts")
+STOCK_TABLES = ("sgx_stocks_daily",)
+
+# Distinct values of an indexed column by jumping from one value to the next
+# through the index (one seek per value) instead of scanning every row.
+_DISTINCT_SQL = """
+    WITH RECURSIVE names(name) AS (
+        SELECT MIN({column}) FROM {table}
+        UNION ALL
+        SELECT (SELECT MIN({column}) FROM {table} WHERE {column} > names.name) FROM names WHERE names.name IS NOT NULL
+    )
+    SELECT name AS {column} FROM names WHERE name IS NOT NULL
+"""
+
+# One series, optionally restricted to a date range and thinned to about
+# max_points rows by keeping every n-th row (plus the latest) in SQLite, so
+# long histories never reach pandas in full.
+_SERIES_SQL = """
+    SELECT {date_column}, {value_column} FROM (
+        SELECT {date_column}, {value_column},
+               ROW_NUMBER() OVER (ORDER BY {date_column}) AS rn,
+               COUNT(*) OVER () AS n
+        FROM {table}
+        WHERE {key_column} = ? AND {date_column} >= ? AND {date_column} < ?
+    )
+    WHERE ? IS NULL OR (rn - 1) % MAX(1, (n + ? - 1) / ?) = 0 OR rn = n
+    ORDER BY {date_column}
+"""
+
+
+def change_token(tables):
+    """
+    The write versions of `tables` (see db.bump_table_versions), as a
+    hashable tuple. It changes whenever ingestion or forecasting writes to
+    them, so it can key a cache that must invalidate on new data.
+    """
+    versions = get_table_versions()
+    return tuple(versions.get(table, 0) for table in tables)
+
+
+def _distinct(table, column):
+    return query_df(_DISTINCT_SQL.format(table=table, column=column))[column].tolist()
+
+
+def _thin(df, max_points):
+    """Every n-th row plus the last, leaving about max_points rows; the same rule as _SERIES_SQL."""
+    if not max_points or len(df) <= max_points:
+        return df
+    stride = -(-len(df) // max_points)
+    keep = np.arange(len(df)) % stride == 0
+    keep[-1] = True
+    return df[keep].reset_index(drop=True)
+
+
+def _columnar_series(table, date_column, value_column, key, start, end, max_points):
+    """The same result as _SERIES_SQL, read from the columnar store; None when it cannot serve `table`."""
+    df = columnar_store.read_series(table, key, columns=[value_column])
+    if df is None:
+        return None
+    dates = df['record_date']
+    in_range = np.ones(len(df), dtype=bool)
+    if start:
+        in_range &= (dates >= pd.Timestamp(start)).to_numpy()
+    if end:
+        in_range &= (dates < pd.Timestamp(end) + pd.Timedelta(days=1)).to_numpy()
+    df = df[in_range] if not in_range.all() else df
+    return _thin(df.rename(columns={'record_date': date_column}).reset_index(drop=True), max_points)
+
+
+def _series(table, key_column, date_column, value_column, key, start=None, end=None, max_points=None):
+    if table in columnar_store.DATASETS:
+        df = _columnar_series(table, date_column, value_column, key, start, end, max_points)
+        if df is not None:
+            return df
+    sql = _SERIES_SQL.format(table=table, key_column=key_column, date_column=date_column, value_column=value_column)
+    # Dates may be stored with a time part, so the end bound is the start of the next day
+    end = (pd.Timestamp(end) + pd.Timedelta(days=1)).strftime('%Y-%m-%d') if end else "9999-12-31"
+    # The date columns have NUMERIC affinity, so the open bounds must not look
+    # like numbers (a bare "9999" would be compared as an integer)
+    params = (key, start or "0000-01-01", end, max_points, max_points, max_points)
+    return query_df(sql, params=params, parse_dates=[date_column])
+
+
+def list_indicators():
+    return _distinct("singstat_data", "indicator_name")
+
+
+def list_tickers():
+    return _distinct("sgx_stocks_daily", "ticker")
+
+
+def load_indicator_history(indicator, start=None, end=None, max_points=None):
+    """
+    Historical values and forecasts of one indicator, outer-joined on date
+    into 'Historical' and 'Forecast' columns and indexed by record_date.
+    `start` / `end` are inclusive 'YYYY-MM-DD' bounds; `max_points` thins each series.
+    """
+    history = _series("singstat_data", "indicator_name", "record_date", "value", indicator, start, end, max_points)
+    history.rename(columns={'value': 'Historical'}, inplace=True)
+    forecast = _series(
+        "indicator_forecasts", "indicator_name", "forecast_date", "predicted_value", indicator, start, end, max_points
+    )
+    forecast.rename(columns={'predicted_value': 'Forecast', 'forecast_date': 'record_date'}, inplace=True)
+    return pd.merge(history, forecast, on='record_date', how='outer').set_index('record_date').sort_index()
+
+
+def load_stock_history(ticker, start=None, end=None, max_points=None):
+    """Closing prices of one ticker indexed by record_date; see load_indicator_history for the arguments."""
+    df = _series("sgx_stocks_daily", "ticker", "record_date", "close_price", ticker, start, end, max_points)
+    return df.set_index('record_date')
@@ -1,48 +1,399 @@
 # data_ingestion.py
-import sqlite3
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain, islice
 import yfinance as yf
 import requests
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from config import DATABASE_NAME, SINGSTAT_API_KEY
+from requests.adapters import HTTPAdapter
+from config import (
+    SINGSTAT_API_KEY,
+    SINGSTAT_API_URL,
+    INGESTION_MAX_WORKERS,
+    INGESTION_MAX_RETRIES,
+    INGESTION_BACKOFF_SECONDS,
+    INGESTION_HTTP_TIMEOUT_SECONDS,
+    SINGSTAT_REQUESTS_PER_SECOND,
+    YFINANCE_REQUESTS_PER_SECOND,
+    SGX_DOWNLOAD_CHUNK_SIZE,
+    INGESTION_WRITE_BATCH_ROWS,
+)
+import columnar_store
+import telemetry
+from db import bump_table_versions, connection, transaction
+from vector_index import sync_news_index
+from analytics import compute_analytics
+from jobs import report_progress, stage
 
-def fetch_and_store_singstat_data(indicator_name, resource_id):
-    """Fetches a specific time series from SingStat API and stores it."""
-    # This function remains the same as before
-    if not SINGSTAT_API_KEY:
-        print(f"Skipping {indicator_name}: SINGSTAT_API_KEY not found in .env file.")
+# --- Expanded List of SingStat Indicators ---
+# NOTE: These resource IDs are examples. You should verify them on the SingStat website.
+SINGSTAT_INDICATORS = {
+    # Economy & Prices
+    "CPI_All_Items": "M212881",
+    "GDP_Quarterly": "M015651", # Example ID for Gross Domestic Product
+    "Exchange_Rate_USD": "M050111", # Example ID for SGD per USD
+    # Industry Sectorwise
+    "Manufacturing_Output": "M015121",
+    "Retail_Sales_Index": "M615331", # Example ID for Retail Sales
+    "Wholesale_Trade_Index": "M353221", # Example ID for Wholesale Trade
+    # Trade and Investment
+    "International_Trade_Total": "M082121",
+    "Foreign_Direct_Investment": "M085181", # Example ID for FDI
+    "Investment_Commitments_Mfg": "M015091" # Example ID for Investment Commitments
+}
+
+# --- Expanded List of yfinance Tickers ---
+SGX_TICKERS = [
+    "C6L.SI",  # Singapore Airlines (Aviation, Consumer)
+    "D05.SI",  # DBS Bank (Banking, Finance)
+    "O39.SI",  # OCBC Bank (Banking, Finance)
+    "U11.SI",  # UOB Bank (Banking, Finance)
+    "Z74.SI",  # Singtel (Telecommunications)
+    "A17U.SI", # CapitaLand Ascendas REIT (Industrial, REIT)
+    "M44U.SI"  # Mapletree Industrial Trust (Industrial, REIT)
+]
+
+
+class RetryableError(Exception):
+    """A transient failure (throttling, server error) worth retrying."""
+
+
+class RateLimiter:
+    """Spaces calls to one source at least 1/rate seconds apart, across threads."""
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def with_retries(fn, *args, label="request", attempts=None, backoff=None, **kwargs):
+    """
+    Calls fn(*args, **kwargs), retrying transient failures with exponential
+    backoff and jitter. Non-retryable errors propagate immediately.
+    """
+    attempts = attempts or INGESTION_MAX_RETRIES
+    backoff = INGESTION_BACKOFF_SECONDS if backoff is None else backoff
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn(*args, **kwargs)
+        except (RetryableError, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt == attempts:
+                raise
+            delay = backoff * 2 ** (attempt - 1) * (1 + random.random() / 4)
+            telemetry.count("ingestion.retries", category="ingestion")
+            print(f"  - {label} failed ({e}); retrying in {delay:.1f}s (attempt {attempt + 1}/{attempts})")
+            time.sleep(delay)
+
+
+def make_session(pool_size=None):
+    """A requests session whose connection pool is shared by every fetch thread."""
+    pool_size = pool_size or INGESTION_MAX_WORKERS
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class YFinanceProvider:
+    """
+    Daily price source backed by yfinance.
+
+    Any object with the same `download(tickers, start, end)` method can stand
+    in for it (e.g. a local fixture when running offline). It must return a
+    wide DataFrame indexed by date whose columns are a (field, ticker)
+    MultiIndex containing at least the 'Close' and 'Volume' fields, which is
+    yf.download's layout with group_by='column'.
+    """
+
+    def download(self, tickers, start, end):
+        # One multi-ticker request per chunk; yfinance fans it out internally.
+        return yf.download(
+            list(tickers), start=start, end=end, group_by='column', threads=True, progress=False
+        )
+
+
+def batched(rows, size=None):
+    """Splits any iterable of rows into lists of at most `size` (INGESTION_WRITE_BATCH_ROWS) rows."""
+    size = size or INGESTION_WRITE_BATCH_ROWS
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def iter_price_batches(wide, tickers, batch_rows=None):
+    """
+    Turns a wide (field, ticker) price frame into long
+    (ticker, record_date, close_price, volume) rows, dropping missing closes.
+    Rows come in date order, in lists of at most `batch_rows`
+    (INGESTION_WRITE_BATCH_ROWS), and only one list of Python tuples exists at
+    a time; the rest stays in NumPy arrays.
+    """
+    if wide is None or wide.empty:
         return
+    if not isinstance(wide.columns, pd.MultiIndex):
+        # Older yfinance returns flat columns for a single ticker
+        wide = pd.concat({tickers[0]: wide}, axis=1).swaplevel(0, 1, axis=1)
+    close = wide['Close'].reindex(columns=list(tickers))
+    volume = wide['Volume'].reindex(columns=list(tickers))
+
+    dates = pd.DatetimeIndex(wide.index)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    date_strings = dates.normalize().strftime('%Y-%m-%d %H:%M:%S').to_numpy()
+
+    # Flatten row-major: every ticker for the first date, then the next date...
+    n_dates, n_tickers = close.shape
+    all_tickers = np.tile(np.asarray(close.columns, dtype=object), n_dates)
+    all_dates = np.repeat(date_strings, n_tickers)
+    closes = close.to_numpy(dtype=float).ravel()
+    volumes = volume.to_numpy(dtype=float).ravel()
+    keep = ~np.isnan(closes)
+    all_tickers, all_dates, closes, volumes = all_tickers[keep], all_dates[keep], closes[keep], volumes[keep]
+    batch_rows = batch_rows or INGESTION_WRITE_BATCH_ROWS
+    for start in range(0, len(closes), batch_rows):
+        end = start + batch_rows
+        batch_volumes = volumes[start:end]
+        batch_volumes = np.where(np.isnan(batch_volumes), None, batch_volumes.round()).astype(object)
+        yield list(zip(
+            all_tickers[start:end].tolist(),
+            all_dates[start:end].tolist(),
+            closes[start:end].tolist(),
+            [None if v is None else int(v) for v in batch_volumes],
+        ))
+
+
+def reshape_prices(wide, tickers):
+    """All rows of iter_price_batches as one list."""
+    return list(chain.from_iterable(iter_price_batches(wide, tickers)))
+
+
+def iter_singstat_rows(indicator_name, payload):
+    """Parses a SingStat tabledata response row by row into (indicator, date, value) tuples, skipping non-numeric values."""
+    for row in payload['Data']['row']:
+        value = row['columns'][0]['value']
+        if value.replace('.', '', 1).isdigit():
+            record_date = datetime.strptime(row['key'], "%Y %b").date()
+            yield indicator_name, record_date.isoformat(), float(value)
+
 
+def fetch_singstat_series(indicator_name, resource_id, session=None, limiter=None, since=None):
+    """
+    Fetches one SingStat time series and returns its rows as (indicator, date, value) tuples.
+
+    With `since` (a date), only periods from that month onwards are requested;
+    otherwise the last 36 months are.
+    """
     print(f"Fetching {indicator_name} from SingStat...")
-    api_url = "https://tablebuilder.singstat.gov.sg/api/table/tabledata"
-    
+    session = session or requests
     to_date = datetime.now()
-    from_date = to_date - timedelta(days=36*30)
-    
+    from_date = since or to_date - timedelta(days=36*30)
+
     payload = { "resourceId": resource_id, "searchCriteria": { "timeFrom": from_date.strftime('%Y%m'), "timeTo": to_date.strftime('%Y%m') } }
     headers = {"Content-Type": "application/json", "api-key": SINGSTAT_API_KEY}
 
-    try:
-        response = requests.post(api_url, json=payload, headers=headers)
+    def post():
+        if limiter:
+            limiter.wait()
+        response = session.post(SINGSTAT_API_URL, json=payload, headers=headers, timeout=INGESTION_HTTP_TIMEOUT_SECONDS)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RetryableError(f"HTTP {response.status_code}")
         response.raise_for_status()
-        
-        records = []
-        for row in response.json()['Data']['row']:
-            date_str = row['key']
-            value = row['columns'][0]['value']
-            record_date = datetime.strptime(date_str, "%Y %b").date()
-            if value.replace('.', '', 1).isdigit():
-                 records.append({ "indicator_name": indicator_name, "record_date": record_date, "value": float(value) })
+        return response.json()
+
+    with telemetry.span("singstat.fetch", "ingestion", series=indicator_name) as attributes:
+        data = with_retries(post, label=f"SingStat {indicator_name}")
+        records = list(iter_singstat_rows(indicator_name, data))
+        attributes["rows"] = len(records)
+    return records
+
+
+def iter_sgx_prices(windows, end_date, provider=None, limiter=None, chunk_size=None, failures=None):
+    """
+    Fetches daily prices for many tickers with as few requests as possible,
+    yielding (ticker, date, close, volume) rows in batches as each download
+    arrives, so only one download is held in memory at a time.
+
+    `windows` maps ticker -> start date. Tickers sharing a start date are
+    downloaded together, `chunk_size` (SGX_DOWNLOAD_CHUNK_SIZE) at a time.
+    Tickers of chunks that kept failing are added to `failures` (ticker -> error).
+    """
+    provider = provider or YFinanceProvider()
+    chunk_size = chunk_size or SGX_DOWNLOAD_CHUNK_SIZE
+    failures = {} if failures is None else failures
+    by_start = {}
+    for ticker, start_date in windows.items():
+        by_start.setdefault(start_date, []).append(ticker)
+
+    for start_date, tickers in by_start.items():
+        for i in range(0, len(tickers), chunk_size):
+            chunk = tickers[i:i + chunk_size]
+
+            def download():
+                if limiter:
+                    limiter.wait()
+                try:
+                    return provider.download(chunk, start_date, end_date)
+                except Exception as e:
+                    # yfinance surfaces throttling and network trouble as assorted exceptions
+                    raise RetryableError(str(e)) from e
+
+            with telemetry.span("yfinance.download", "ingestion", tickers=len(chunk), start=start_date) as attributes:
+                try:
+                    wide = with_retries(download, label=f"yfinance {len(chunk)} tickers")
+                except Exception as e:
+                    failures.update({ticker: str(e) for ticker in chunk})
+                    attributes["failed"] = str(e)
+                    continue
+                attributes["days"] = len(wide)
+            fetched = 0
+            for batch in iter_price_batches(wide, chunk):
+                fetched += len(batch)
+                yield batch
+            del wide
+            print(f"Fetched {fetched} price rows for {len(chunk)} tickers.")
 
+
+def fetch_sgx_prices(windows, end_date, provider=None, limiter=None, chunk_size=None):
+    """
+    iter_sgx_prices collected into one list. Returns (rows, failures) where
+    failures maps ticker -> error for chunks that kept failing.
+    """
+    failures = {}
+    rows = list(chain.from_iterable(iter_sgx_prices(windows, end_date, provider, limiter, chunk_size, failures)))
+    return rows, failures
+
+
+def _upsert_singstat(conn, rows):
+    conn.executemany(
+        """INSERT INTO singstat_data (indicator_name, record_date, value) VALUES (?, ?, ?)
+           ON CONFLICT (indicator_name, record_date) DO UPDATE SET value = excluded.value
+           WHERE value IS NOT excluded.value""",
+        rows
+    )
+
+
+def _upsert_sgx(conn, rows):
+    conn.executemany(
+        """INSERT INTO sgx_stocks_daily (ticker, record_date, close_price, volume) VALUES (?, ?, ?, ?)
+           ON CONFLICT (ticker, record_date) DO UPDATE SET close_price = excluded.close_price, volume = excluded.volume
+           WHERE close_price IS NOT excluded.close_price OR volume IS NOT excluded.volume""",
+        rows
+    )
+
+
+# Latest stored date per series, for bootstrapping watermarks from existing data
+_LATEST_RECORD_SQL = {
+    "singstat": "SELECT indicator_name, MAX(record_date) FROM singstat_data GROUP BY indicator_name",
+    "sgx": "SELECT ticker, MAX(record_date) FROM sgx_stocks_daily GROUP BY ticker",
+}
+
+
+def load_watermarks(source):
+    """
+    Returns {series: latest ingested date} for a source. Series ingested before
+    watermarks were tracked fall back to the latest record_date in their table.
+    """
+    with connection() as conn:
+        marks = dict(conn.execute(_LATEST_RECORD_SQL[source]).fetchall())
+        marks.update(conn.execute(
+            "SELECT series, high_water_mark FROM ingestion_watermarks WHERE source = ?", (source,)
+        ).fetchall())
+    return {series: datetime.strptime(mark[:10], '%Y-%m-%d') for series, mark in marks.items()}
+
+
+def _advance_watermarks(conn, source, rows):
+    """Moves each series' watermark up to the newest date among `rows` (series, date, ...)."""
+    latest = {}
+    for row in rows:
+        if row[1] > latest.get(row[0], ''):
+            latest[row[0]] = row[1]
+    if not latest:
+        return
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    conn.executemany(
+        """INSERT INTO ingestion_watermarks (source, series, high_water_mark, updated_at) VALUES (?, ?, ?, ?)
+           ON CONFLICT (source, series) DO UPDATE SET
+               high_water_mark = MAX(high_water_mark, excluded.high_water_mark),
+               updated_at = excluded.updated_at""",
+        [(source, series, mark[:10], now) for series, mark in latest.items()]
+    )
+    bump_table_versions(conn, "ingestion_watermarks")
+
+
+def _sgx_fetch_windows(tickers, marks, end_date):
+    """
+    Returns {ticker: start date} for tickers with anything new to fetch. yfinance's
+    end date is exclusive, so a ticker already current as of yesterday is skipped.
+    """
+    default_start = end_date - timedelta(days=365)
+    windows = {}
+    for ticker in tickers:
+        mark = marks.get(ticker)
+        if mark is None:
+            windows[ticker] = default_start
+        elif mark.date() < end_date.date() - timedelta(days=1):
+            windows[ticker] = mark
+    if len(windows) < len(tickers):
+        print(f"{len(tickers) - len(windows)} tickers already up to date.")
+    return windows
+
+
+def _store_source(source, rows):
+    """
+    Upserts one source's rows (any iterable, e.g. a stream of downloads) in
+    batches of INGESTION_WRITE_BATCH_ROWS. Each batch is written in its own
+    transaction together with its watermarks and, with the columnar store
+    on, its columnar append, so memory and write-lock time are bounded by
+    one batch and an interrupted backfill resumes after the last stored
+    batch. Returns the number of rows stored.
+    """
+    upsert, table = (_upsert_singstat, "singstat_data") if source == "singstat" else (_upsert_sgx, "sgx_stocks_daily")
+    stored = 0
+    with telemetry.span(f"store.{source}", "ingestion") as attributes:
+        for batch in batched(rows):
+            with transaction() as conn:
+                changes_before = conn.total_changes
+                upsert(conn, batch)
+                if conn.total_changes != changes_before:
+                    # Only a real change invalidates cached query results
+                    bump_table_versions(conn, table)
+                    columnar_store.append(conn, table, batch)
+                _advance_watermarks(conn, source, batch)
+            stored += len(batch)
+        attributes["rows"] = stored
+    if stored:
+        columnar_store.compact(table)
+    return stored
+
+
+def fetch_and_store_singstat_data(indicator_name, resource_id):
+    """Fetches a specific time series from SingStat API and stores it."""
+    if not SINGSTAT_API_KEY:
+        print(f"Skipping {indicator_name}: SINGSTAT_API_KEY not found in .env file.")
+        return
+
+    try:
+        records = fetch_singstat_series(indicator_name, resource_id, since=load_watermarks("singstat").get(indicator_name))
         if not records:
             print(f"No data found for {indicator_name}.")
             return
-
-        df = pd.DataFrame(records)
-        conn = sqlite3.connect(DATABASE_NAME)
-        df.to_sql('singstat_data', conn, if_exists='append', index=False)
-        conn.close()
-        print(f"Successfully stored {len(df)} records for {indicator_name}.")
+        _store_source("singstat", records)
+        print(f"Successfully stored {len(records)} records for {indicator_name}.")
 
     except requests.exceptions.HTTPError as e:
         print(f"Error fetching data for {indicator_name}: {e.response.text}")
@@ -50,78 +401,123 @@ def fetch_and_store_singstat_data(indicator_name, resource_id):
         print(f"An unexpected error occurred for {indicator_name}: {e}")
 
 
-def store_sgx_data(tickers):
-    # This function remains the same as before, but we'll call it with more tickers.
+def store_sgx_data(tickers, provider=None, chunk_size=None):
+    """
+    Fetches daily prices for `tickers` in batched downloads, from each ticker's
+    watermark onwards, upserting each download as it arrives.
+    """
     print(f"Fetching SGX stock data for: {tickers}")
-    conn = sqlite3.connect(DATABASE_NAME)
     end_date = datetime.now()
-    start_date = end_date - timedelta(days=365)
-    
-    for ticker in tickers:
-        try:
-            stock_data = yf.download(ticker, start=start_date, end=end_date)
-            if not stock_data.empty:
-                stock_data = stock_data.reset_index()
-                stock_data.rename(columns={'Date': 'record_date', 'Close': 'close_price', 'Volume': 'volume'}, inplace=True)
-                stock_data['ticker'] = ticker
-                final_data = stock_data[['ticker', 'record_date', 'close_price', 'volume']]
-                final_data.to_sql('sgx_stocks_daily', conn, if_exists='append', index=False)
-                print(f"Data for {ticker} stored.")
-        except Exception as e:
-            print(f"Could not fetch data for {ticker}: {e}")
-    conn.close()
+    windows = _sgx_fetch_windows(tickers, load_watermarks("sgx"), end_date)
+    failures = {}
+    batches = iter_sgx_prices(
+        windows, end_date, provider, RateLimiter(YFINANCE_REQUESTS_PER_SECOND), chunk_size, failures
+    )
+    stored = _store_source("sgx", chain.from_iterable(batches))
+    for ticker, error in failures.items():
+        print(f"Could not fetch data for {ticker}: {error}")
+    return stored
 
 
 def store_mock_news_data():
     # This function remains the same.
     print("Storing mock news data...")
-    conn = sqlite3.connect(DATABASE_NAME)
     # (Code for mock news data is unchanged)
-    conn.close()
-
-def run_ingestion():
-    """Runs all data ingestion functions with the expanded list of indicators."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM sgx_stocks_daily;")
-    cursor.execute("DELETE FROM singstat_data;")
-    cursor.execute("DELETE FROM unstructured_news;")
-    conn.commit()
-    conn.close()
-    
-    # --- Expanded List of SingStat Indicators ---
-    # NOTE: These resource IDs are examples. You should verify them on the SingStat website.
-    singstat_indicators = {
-        # Economy & Prices
-        "CPI_All_Items": "M212881",
-        "GDP_Quarterly": "M015651", # Example ID for Gross Domestic Product
-        "Exchange_Rate_USD": "M050111", # Example ID for SGD per USD
-        # Industry Sectorwise
-        "Manufacturing_Output": "M015121",
-        "Retail_Sales_Index": "M615331", # Example ID for Retail Sales
-        "Wholesale_Trade_Index": "M353221", # Example ID for Wholesale Trade
-        # Trade and Investment
-        "International_Trade_Total": "M082121",
-        "Foreign_Direct_Investment": "M085181", # Example ID for FDI
-        "Investment_Commitments_Mfg": "M015091" # Example ID for Investment Commitments
-    }
-
-    for name, resource_id in singstat_indicators.items():
-        fetch_and_store_singstat_data(name, resource_id)
-        
-    # --- Expanded List of yfinance Tickers ---
-    sgx_tickers = [
-        "C6L.SI",  # Singapore Airlines (Aviation, Consumer)
-        "D05.SI",  # DBS Bank (Banking, Finance)
-        "O39.SI",  # OCBC Bank (Banking, Finance)
-        "U11.SI",  # UOB Bank (Banking, Finance)
-        "Z74.SI",  # Singtel (Telecommunications)
-        "A17U.SI", # CapitaLand Ascendas REIT (Industrial, REIT)
-        "M44U.SI"  # Mapletree Industrial Trust (Industrial, REIT)
-    ]
-    store_sgx_data(sgx_tickers)
-    
-    store_mock_news_data() # This remains the same
-    
+
+@telemetry.run("ingestion")
+def run_ingestion(indicators=None, tickers=None, session=None, price_provider=None, max_workers=None,
+                  full_refresh=False):
+    """
+    Runs all data ingestion functions with the expanded list of indicators.
+
+    Ingestion is incremental: each series' high-water mark (its latest
+    ingested date) decides where fetching resumes, so a daily refresh only
+    downloads the newest periods. The latest known period is fetched again to
+    pick up revisions, and rows are upserted, so overlaps update in place
+    instead of tripping the UNIQUE constraints. `full_refresh=True` ignores the
+    watermarks and re-fetches the full default window. The analytics tables
+    (see analytics.compute_analytics) are brought up to date once the upserts
+    land, recomputing only the tickers and indicators that changed.
+
+    SingStat series are fetched concurrently on a bounded thread pool through
+    one shared HTTP session, while SGX prices arrive in a handful of batched
+    multi-ticker downloads on the same pool. Each source has its own rate
+    limiter, and transient failures are retried with exponential backoff.
+    Every fetch and store is recorded as a telemetry span of the run.
+    Prices are upserted download by download and SingStat rows series by
+    series as they arrive, so a backfill of any length holds one download
+    or series in memory. Both are written in bounded batches, each together
+    with its watermarks (see _store_source). `session` and
+    `price_provider` can be swapped for local stubs.
+
+    Returns a dict with row counts per table and the sources that failed.
+    """
+    indicators = SINGSTAT_INDICATORS if indicators is None else indicators
+    tickers = SGX_TICKERS if tickers is None else tickers
+    own_session = session is None
+    session = session or make_session(max_workers)
+    singstat_limiter = RateLimiter(SINGSTAT_REQUESTS_PER_SECOND)
+    yfinance_limiter = RateLimiter(YFINANCE_REQUESTS_PER_SECOND)
+    end_date = datetime.now()
+    singstat_marks = {} if full_refresh else load_watermarks("singstat")
+    sgx_windows = _sgx_fetch_windows(tickers, {} if full_refresh else load_watermarks("sgx"), end_date)
+
+    if not SINGSTAT_API_KEY:
+        print("Skipping SingStat indicators: SINGSTAT_API_KEY not found in .env file.")
+        indicators = {}
+
+    started = time.perf_counter()
+    singstat_stored, sgx_failures, failures = 0, {}, {}
+    try:
+        with stage("fetch"), ThreadPoolExecutor(max_workers=max_workers or INGESTION_MAX_WORKERS) as executor:
+            singstat_futures = {
+                executor.submit(
+                    contextvars.copy_context().run,
+                    fetch_singstat_series, name, resource_id, session, singstat_limiter, singstat_marks.get(name)
+                ): name
+                for name, resource_id in indicators.items()
+            }
+            # Prices come in a few batched downloads, streamed into the database
+            # alongside the SingStat fetches
+            sgx_batches = iter_sgx_prices(
+                sgx_windows, end_date, price_provider, yfinance_limiter, failures=sgx_failures
+            )
+            sgx_future = executor.submit(
+                contextvars.copy_context().run, _store_source, "sgx", chain.from_iterable(sgx_batches)
+            )
+            # Each series is stored as soon as its fetch completes, while the others are still fetching
+            for done, future in enumerate(as_completed(singstat_futures)):
+                source = singstat_futures[future]
+                try:
+                    result = future.result()
+                except requests.exceptions.HTTPError as e:
+                    failures[source] = e.response.text
+                    print(f"Error fetching data for {source}: {e.response.text}")
+                    result = None
+                except Exception as e:
+                    failures[source] = str(e)
+                    print(f"Could not fetch data for {source}: {e}")
+                    result = None
+                if result:
+                    singstat_stored += _store_source("singstat", result)
+                elif result is not None:
+                    print(f"No new data found for {source}.")
+                report_progress(0.8 * (done + 1) / (len(singstat_futures) + 1), f"fetched {source}")
+            sgx_stored = sgx_future.result()
+            for ticker, error in sgx_failures.items():
+                print(f"Could not fetch data for {ticker}: {error}")
+            failures.update(sgx_failures)
+    finally:
+        if own_session:
+            session.close()
+    print(f"Stored {singstat_stored} SingStat and {sgx_stored} price rows in {time.perf_counter() - started:.1f}s.")
+
+    with stage("analytics"):
+        compute_analytics()
+
+    with stage("news_index"):
+        store_mock_news_data() # This remains the same
+        sync_news_index()
+
     print("\nExpanded data ingestion complete.")
-    
+    return {"singstat_data": singstat_stored, "sgx_stocks_daily": sgx_stored, "failures": failures}
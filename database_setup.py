@@ -1,23 +1,33 @@
 # database_setup.py
 import sqlite3
-from config import DATABASE_NAME
+import memory
+from db import connect
 
 def create_connection():
     """Create a database connection to the SQLite database."""
     conn = None
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
+        conn = connect()
         return conn
     except sqlite3.Error as e:
         print(e)
     return conn
 
-def create_tables():
-    """Create the necessary tables for the application."""
+def _columns(c, table):
+    return {row[1] for row in c.execute(f"PRAGMA table_info({table})")}
+
+def create_tables(verbose=True):
+    """
+    Create the necessary tables for the application, and move data kept in
+    an older layout to the current one. Everything runs in one transaction,
+    so processes opening the same database at once never see a half-migrated
+    schema.
+    """
     conn = create_connection()
     if conn is not None:
         try:
             c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE;")
             
             # For storing structured economic data from SingStat
             c.execute("""
@@ -42,6 +52,30 @@ def create_tables():
                 );
             """)
             
+            # Covering indexes for per-series history reads (dashboard, forecasting):
+            # the value comes straight from the index, with no lookup into the table
+            c.execute("CREATE INDEX IF NOT EXISTS idx_singstat_data_series ON singstat_data (indicator_name, record_date, value);")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_sgx_stocks_daily_series ON sgx_stocks_daily (ticker, record_date, close_price);")
+
+            # Latest record_date ingested per series, so refreshes only fetch newer data
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS ingestion_watermarks (
+                    source TEXT NOT NULL,
+                    series TEXT NOT NULL,
+                    high_water_mark DATE NOT NULL,
+                    updated_at TIMESTAMP NOT NULL,
+                    PRIMARY KEY (source, series)
+                );
+            """)
+
+            # Write counters per table, bumped by ingestion/forecasting so caches can invalidate
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS table_versions (
+                    table_name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                );
+            """)
+
             # For storing unstructured news/reports
             c.execute("""
                 CREATE TABLE IF NOT EXISTS unstructured_news (
@@ -52,23 +86,60 @@ def create_tables():
                 );
             """)
 
-            # For storing the agent's long-term memory
+            # For storing the agent's long-term memory: one compact conclusion per
+            # briefing, its outlook direction, picks and per-ticker risks (see memory.py)
             c.execute("""
                 CREATE TABLE IF NOT EXISTS memory_log (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     log_date DATE UNIQUE NOT NULL,
-                    summary TEXT NOT NULL
+                    summary TEXT NOT NULL,
+                    outlook TEXT
+                );
+            """)
+            if "outlook" not in _columns(c, "memory_log"):
+                c.execute("ALTER TABLE memory_log ADD COLUMN outlook TEXT;")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_memory_log_outlook ON memory_log (outlook, log_date);")
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS memory_picks (
+                    log_date DATE NOT NULL,
+                    ticker TEXT NOT NULL,
+                    pick_rank INTEGER NOT NULL,
+                    PRIMARY KEY (log_date, ticker)
+                );
+            """)
+            c.execute("CREATE INDEX IF NOT EXISTS idx_memory_picks_ticker ON memory_picks (ticker, log_date);")
+            # A risk that names no ticker has a NULL ticker
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS memory_risks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    log_date DATE NOT NULL,
+                    ticker TEXT,
+                    risk TEXT NOT NULL
                 );
             """)
+            c.execute("CREATE INDEX IF NOT EXISTS idx_memory_risks_ticker ON memory_risks (ticker, log_date);")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_memory_risks_date ON memory_risks (log_date);")
 
-            # For storing the final daily briefings
+            # For storing the final daily briefings. The markdown lives once per
+            # distinct content in briefing_contents, zlib-compressed, and the
+            # briefings view reads them back as plain text (see memory.py).
             c.execute("""
-                CREATE TABLE IF NOT EXISTS briefings (
+                CREATE TABLE IF NOT EXISTS briefing_dates (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     briefing_date DATE UNIQUE NOT NULL,
-                    content TEXT NOT NULL
+                    content_hash TEXT NOT NULL
                 );
             """)
+            c.execute("CREATE INDEX IF NOT EXISTS idx_briefing_dates_content ON briefing_dates (content_hash);")
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS briefing_contents (
+                    content_hash TEXT PRIMARY KEY,
+                    content BLOB NOT NULL
+                );
+            """)
+            # A briefings table from an older layout becomes the view; a no-op once it is one
+            migrated = memory.migrate(conn)
+            c.execute(f"CREATE VIEW IF NOT EXISTS briefings AS {memory.BRIEFINGS_VIEW_SELECT};")
 
             # For storing ML model forecasts
             c.execute("""
@@ -80,10 +151,177 @@ def create_tables():
                     UNIQUE(indicator_name, forecast_date)
                 );
             """)
+            c.execute("CREATE INDEX IF NOT EXISTS idx_indicator_forecasts_series ON indicator_forecasts (indicator_name, forecast_date, predicted_value);")
+
+            # Fingerprint of the history each indicator's forecast was fitted on
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS forecast_fingerprints (
+                    indicator_name TEXT PRIMARY KEY,
+                    row_count INTEGER NOT NULL,
+                    max_record_date DATE,
+                    content_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    horizon_days INTEGER NOT NULL,
+                    fitted_at TIMESTAMP NOT NULL
+                );
+            """)
+
+            # Precomputed per-ticker daily features, rebuilt by analytics.compute_analytics after ingestion
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS stock_features_daily (
+                    ticker TEXT NOT NULL,
+                    record_date DATE NOT NULL,
+                    close_price REAL,
+                    daily_return REAL,
+                    log_return REAL,
+                    volatility_20d REAL,
+                    ma_20 REAL,
+                    ma_50 REAL,
+                    ma_200 REAL,
+                    drawdown REAL,
+                    PRIMARY KEY (ticker, record_date)
+                );
+            """)
+            c.execute("CREATE INDEX IF NOT EXISTS idx_stock_features_daily_date ON stock_features_daily (record_date);")
+
+            # Weekly (W), monthly (M), quarterly (Q) and yearly (Y) returns per ticker
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS stock_returns_periodic (
+                    ticker TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    period_end DATE NOT NULL,
+                    period_return REAL,
+                    PRIMARY KEY (ticker, period, period_end)
+                );
+            """)
+            c.execute("CREATE INDEX IF NOT EXISTS idx_stock_returns_periodic_end ON stock_returns_periodic (period, period_end);")
+
+            # One row per ticker with its latest features and trailing returns
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS stock_latest_metrics (
+                    ticker TEXT PRIMARY KEY,
+                    as_of DATE NOT NULL,
+                    close_price REAL,
+                    return_1m REAL,
+                    return_3m REAL,
+                    return_1y REAL,
+                    volatility_20d REAL,
+                    ma_20 REAL,
+                    ma_50 REAL,
+                    ma_200 REAL,
+                    drawdown REAL,
+                    max_drawdown REAL
+                );
+            """)
+
+            # Correlation of stock returns with each SingStat indicator's changes, over the indicator's own period
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS stock_indicator_correlations (
+                    ticker TEXT NOT NULL,
+                    indicator_name TEXT NOT NULL,
+                    correlation REAL NOT NULL,
+                    observations INTEGER NOT NULL,
+                    window_start TEXT,
+                    window_end TEXT,
+                    PRIMARY KEY (ticker, indicator_name)
+                );
+            """)
+            c.execute("CREATE INDEX IF NOT EXISTS idx_stock_indicator_correlations_indicator ON stock_indicator_correlations (indicator_name);")
+
+            # What the analytics tables were computed from: the source tables'
+            # versions, and a content hash per ticker and indicator, so a rebuild
+            # is skipped when nothing changed and otherwise limited to what did
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS analytics_sources (
+                    table_name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    computed_at TIMESTAMP NOT NULL
+                );
+            """)
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS analytics_fingerprints (
+                    source_table TEXT NOT NULL,
+                    series TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    PRIMARY KEY (source_table, series)
+                );
+            """)
+
+            # Background jobs (see jobs.py); the partial unique index lets only one
+            # identical job be queued or running at a time
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    dedup_key TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    stages TEXT NOT NULL DEFAULT '{}',
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    worker_pid INTEGER,
+                    created_at TIMESTAMP NOT NULL,
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP
+                );
+            """)
+            c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active ON jobs (dedup_key) WHERE status IN ('queued', 'running');")
+
+            # Timing spans and counters of pipeline runs (see telemetry.py). Spans
+            # have seconds and start_offset (from the start of the run), counters a
+            # value; category 'run' holds one row per run with its total time.
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS run_metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    run_kind TEXT NOT NULL,
+                    run_started_at TIMESTAMP NOT NULL,
+                    category TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    parent TEXT,
+                    start_offset REAL,
+                    seconds REAL,
+                    value REAL,
+                    status TEXT NOT NULL DEFAULT 'ok',
+                    attributes TEXT NOT NULL DEFAULT '{}'
+                );
+            """)
+            c.execute("CREATE INDEX IF NOT EXISTS idx_run_metrics_run ON run_metrics (run_id, category);")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_run_metrics_category ON run_metrics (category, run_kind, run_started_at);")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_run_metrics_started ON run_metrics (run_started_at);")
+
+            # Catalog of the optional columnar store (see columnar_store.py): its
+            # Arrow files per series, and the table version each dataset mirrors
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS columnar_partitions (
+                    table_name TEXT NOT NULL,
+                    series TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    min_date TEXT,
+                    max_date TEXT,
+                    created_at TIMESTAMP NOT NULL,
+                    PRIMARY KEY (table_name, series, path)
+                );
+            """)
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS columnar_datasets (
+                    table_name TEXT PRIMARY KEY,
+                    source_version INTEGER NOT NULL,
+                    synced_at TIMESTAMP NOT NULL
+                );
+            """)
 
             conn.commit()
-            print("Database and tables created successfully.")
+            if migrated:
+                print(f"Moved {migrated} briefings to compressed storage.")
+            if verbose:
+                print("Database and tables created successfully.")
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"Error creating tables: {e}")
         finally:
             conn.close()
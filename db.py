@@ -0,0 +1,249 @@
+# db.py
+import contextvars
+import os
+import queue
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+import pandas as pd
+from config import (
+    DATABASE_NAME,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE,
+)
+
+
+def _inflate(blob):
+    """SQL inflate(blob): zlib-compressed UTF-8 text (see memory.compress) as text."""
+    return None if blob is None else zlib.decompress(blob).decode("utf-8")
+
+
+def connect(database=None):
+    """
+    Opens a new SQLite connection with the project's pragmas applied and the
+    inflate() function the briefings view needs.
+
+    WAL journaling lets readers (dashboard, agent tools) run alongside a
+    writer (ingestion, forecasting) instead of failing with "database is
+    locked", and busy_timeout makes competing writers wait for each other.
+    """
+    conn = sqlite3.connect(
+        database or DATABASE_NAME,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=256,
+    )
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)};")
+    conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)};")
+    conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)};")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.create_function("inflate", 1, _inflate, deterministic=True)
+    return conn
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of SQLite connections.
+
+    Each connection is used by one thread at a time and keeps its prepared
+    statement cache between checkouts, so repeated parameterized queries skip
+    re-parsing. Connections are created on demand up to `size`; callers beyond
+    that wait up to `timeout` seconds for one to be returned.
+    """
+
+    def __init__(self, database=None, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT_SECONDS):
+        self.database = database or DATABASE_NAME
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return connect(self.database)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection became available within {self.timeout}s.")
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Returns this process's connection pool, creating it (and any missing
+    tables) on first use. A forked child gets a fresh pool, since SQLite
+    connections must not cross process boundaries.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            from database_setup import create_tables
+            create_tables(verbose=False)
+            _pool = ConnectionPool()
+            _pool_pid = os.getpid()
+        return _pool
+
+
+# (connection, lock, as-of date) that reads of the current context go to; see use_snapshot()
+_snapshot = contextvars.ContextVar("snapshot", default=None)
+
+
+@contextmanager
+def _pooled():
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+@contextmanager
+def connection():
+    """
+    Borrows a pooled connection for reads; any open transaction is rolled back
+    on return. Inside use_snapshot() it yields the snapshot's connection instead.
+    """
+    snapshot = _snapshot.get()
+    if snapshot is None:
+        with _pooled() as conn:
+            yield conn
+        return
+    conn, lock, _ = snapshot
+    with lock:
+        yield conn
+
+
+@contextmanager
+def use_snapshot(conn, as_of):
+    """
+    Routes every read of the current context (and of the threads it hands
+    its context to) to `conn`, a connection whose temp views and tables show
+    the database as of `as_of` (see point_in_time.py). The threads take turns
+    on the connection. Writes still go through the pool.
+    """
+    token = _snapshot.set((conn, threading.RLock(), as_of))
+    try:
+        yield conn
+    finally:
+        _snapshot.reset(token)
+
+
+def snapshot_date():
+    """The as-of date of the current context's snapshot, or None when reads see the live database."""
+    snapshot = _snapshot.get()
+    return snapshot[2] if snapshot else None
+
+
+@contextmanager
+def transaction():
+    """
+    Borrows a pooled connection inside a write transaction that commits on
+    success and rolls back on error. BEGIN IMMEDIATE takes the write lock up
+    front, so a read-then-write transaction cannot deadlock with another writer.
+    """
+    with _pooled() as conn:
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+def query_df(sql, params=(), parse_dates=None):
+    """Runs a parameterized SELECT and returns a DataFrame."""
+    with connection() as conn:
+        return pd.read_sql_query(sql, conn, params=params, parse_dates=parse_dates)
+
+
+def query_chunks(sql, params=(), chunksize=10000, parse_dates=None):
+    """
+    Runs a parameterized SELECT and yields DataFrames of at most `chunksize`
+    rows, fetching each from SQLite only when it is asked for. The pooled
+    connection is held until the generator is exhausted or closed.
+    """
+    with connection() as conn:
+        yield from pd.read_sql_query(sql, conn, params=params, parse_dates=parse_dates, chunksize=chunksize)
+
+
+def query_all(sql, params=()):
+    """Runs a parameterized SELECT and returns all rows as tuples."""
+    with connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def query_one(sql, params=()):
+    """Runs a parameterized SELECT and returns the first row, or None."""
+    with connection() as conn:
+        return conn.execute(sql, params).fetchone()
+
+
+def execute(sql, params=()):
+    """Runs one parameterized write statement in its own transaction; returns the row count."""
+    with transaction() as conn:
+        return conn.execute(sql, params).rowcount
+
+
+def executemany(sql, rows):
+    """Runs a parameterized write statement for every row in one transaction; returns the row count."""
+    with transaction() as conn:
+        return conn.executemany(sql, rows).rowcount
+
+
+def bump_table_versions(conn, *tables):
+    """
+    Increments the write counters of `tables`. Call it inside the transaction
+    that modifies them, so readers never see new data with an old version.
+    """
+    conn.executemany(
+        """INSERT INTO table_versions (table_name, version) VALUES (?, 1)
+           ON CONFLICT (table_name) DO UPDATE SET version = version + 1""",
+        [(table,) for table in tables]
+    )
+
+
+def get_table_versions():
+    """Returns {table_name: version} for every table that has been written through bump_table_versions."""
+    return dict(query_all("SELECT table_name, version FROM table_versions"))
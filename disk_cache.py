@@ -0,0 +1,110 @@
+# disk_cache.py
+import hashlib
+import os
+import tempfile
+import time
+
+
+class DiskCache:
+    """
+    A directory of files keyed by string, with LRU, size and TTL eviction.
+
+    Each entry is a single file named after the SHA-256 of its key. The file's
+    mtime records when it was written (used for the TTL) and its atime is
+    bumped on every read (used for LRU ordering). Writes go through a temporary
+    file and os.replace, so concurrent readers in other processes never see a
+    partially written entry.
+    """
+
+    def __init__(self, directory, max_bytes=None, max_entries=None, ttl_seconds=None, suffix=".bin"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.suffix = suffix
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + self.suffix)
+
+    def get(self, key):
+        """Returns the stored bytes for `key`, or None if missing or expired."""
+        path = self.path_for(key)
+        try:
+            stat = os.stat(path)
+            if self.ttl_seconds is not None and time.time() - stat.st_mtime > self.ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, (time.time(), stat.st_mtime))
+            return data
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, data):
+        """Stores `data` (bytes) under `key`, then evicts if over budget."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path_for(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self.path_for(key))
+        except FileNotFoundError:
+            pass
+
+    def entries(self):
+        """Returns (path, size, last_access, written) for every entry."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, max(stat.st_atime, stat.st_mtime), stat.st_mtime))
+        return entries
+
+    def evict(self):
+        """Drops expired entries, then least recently used ones until within budget."""
+        now = time.time()
+        entries = []
+        for entry in self.entries():
+            if self.ttl_seconds is not None and now - entry[3] > self.ttl_seconds:
+                self._remove(entry[0])
+            else:
+                entries.append(entry)
+        if self.max_bytes is None and self.max_entries is None:
+            return
+        entries.sort(key=lambda entry: entry[2])
+        total_bytes = sum(entry[1] for entry in entries)
+        while entries and (
+            (self.max_bytes is not None and total_bytes > self.max_bytes)
+            or (self.max_entries is not None and len(entries) > self.max_entries)
+        ):
+            path, size, _, _ = entries.pop(0)
+            self._remove(path)
+            total_bytes -= size
+
+    def clear(self):
+        for entry in self.entries():
+            self._remove(entry[0])
+
+    @staticmethod
+    def _remove(path):
+        # Another process may have evicted the same entry already
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,101 @@
+# export_data.py
+"""
+Exports database tables to CSV or Parquet, streaming them in chunks so a
+table of any size is written with bounded memory:
+
+    python export_data.py sgx_stocks_daily singstat_data --format parquet
+"""
+import argparse
+import os
+import sys
+import pandas as pd
+from db import query_all, query_chunks
+from config import EXPORT_CHUNK_ROWS, EXPORT_DIR
+
+# SQLite declared types written as numbers; anything else (TEXT, DATE, ...) is written as a string
+_NUMERIC_TYPES = {"INTEGER": "int64", "REAL": "float64"}
+
+
+def list_tables():
+    return [row[0] for row in query_all(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
+
+
+def _parquet_schema(table):
+    """The table's columns as an Arrow schema, from the declared types, so every chunk is written alike."""
+    import pyarrow as pa
+
+    return pa.schema([
+        (name, pa.type_for_alias(_NUMERIC_TYPES.get((declared or "").upper(), "string")))
+        for _, name, declared, *_ in query_all(f'PRAGMA table_info("{table}")')
+    ])
+
+
+def _write_csv(chunks, path):
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=rows == 0)
+            rows += len(chunk)
+    return rows
+
+
+def _write_parquet(chunks, path, schema):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            # SQLite columns are loosely typed: a chunk may hold ints in a TEXT column
+            for field in schema:
+                if pa.types.is_string(field.type):
+                    chunk[field.name] = chunk[field.name].map(lambda value: None if pd.isna(value) else str(value))
+            # One row group per chunk
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    return rows
+
+
+def export_table(table, path=None, fmt="csv", chunksize=None):
+    """
+    Writes every row of `table` to `path` (default: EXPORT_DIR/<table>.<fmt>),
+    reading EXPORT_CHUNK_ROWS rows at a time. Returns (path, rows).
+    """
+    if table not in list_tables():
+        raise ValueError(f"Unknown table: {table}")
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Unsupported export format: {fmt}")
+    path = path or os.path.join(EXPORT_DIR, f"{table}.{fmt}")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    chunks = query_chunks(f'SELECT * FROM "{table}"', chunksize=chunksize or EXPORT_CHUNK_ROWS)
+
+    tmp = f"{path}.tmp"
+    try:
+        if fmt == "csv":
+            rows = _write_csv(chunks, tmp)
+        else:
+            rows = _write_parquet(chunks, tmp, _parquet_schema(table))
+    finally:
+        chunks.close()
+    os.replace(tmp, path)
+    print(f"Exported {rows} rows of {table} to {path}.")
+    return path, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export database tables to CSV or Parquet in chunks.")
+    parser.add_argument("tables", nargs="+", help="Tables to export")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--output-dir", default=EXPORT_DIR)
+    parser.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    for table in args.tables:
+        export_table(table, os.path.join(args.output_dir, f"{table}.{args.format}"), args.format, args.chunk_rows)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
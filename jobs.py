@@ -0,0 +1,261 @@
+# jobs.py
+import contextvars
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+import telemetry
+from db import bump_table_versions, query_df, query_one, transaction
+from config import JOB_MAX_WORKERS, JOB_PROGRESS_INTERVAL_SECONDS
+
+# kind -> (module, function); modules are imported when a job of that kind runs
+JOB_KINDS = {
+    "ingestion": ("data_ingestion", "run_ingestion"),
+    "forecasts": ("predictive_models", "generate_forecasts"),
+    "analysis": ("agent_core", "run_analysis"),
+}
+
+_current_job = contextvars.ContextVar("current_job", default=None)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _update(sql, params=()):
+    """Runs one write to the jobs table in its own transaction, bumping its version; returns the row count."""
+    with transaction() as conn:
+        count = conn.execute(sql, params).rowcount
+        bump_table_versions(conn, "jobs")
+    return count
+
+
+class JobContext:
+    """
+    Progress reporting for the job running on the current thread. Pipelines
+    reach it through the module-level stage() and report_progress(), which
+    do nothing outside a job, so the same code runs unchanged from the CLI.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.stages = {}
+        self._last_write = 0.0
+
+    def check_cancelled(self):
+        row = query_one("SELECT cancel_requested FROM jobs WHERE id = ?", (self.job_id,))
+        if row and row[0]:
+            raise JobCancelled(f"Job {self.job_id} was cancelled.")
+
+    def progress(self, fraction=None, message=None, force=False):
+        # Throttled, so per-item progress from a tight loop does not hammer the database
+        now = time.monotonic()
+        if not force and now - self._last_write < JOB_PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last_write = now
+        _update(
+            """UPDATE jobs SET progress = COALESCE(?, progress), message = COALESCE(?, message), stages = ?
+               WHERE id = ?""",
+            (fraction, message, json.dumps(self.stages), self.job_id)
+        )
+        self.check_cancelled()
+
+    @contextmanager
+    def stage(self, name):
+        self.progress(message=f"{name}...", force=True)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(self.stages.get(name, 0.0) + time.perf_counter() - started, 3)
+        self.progress(message=f"{name} done", force=True)
+
+
+@contextmanager
+def stage(name):
+    """
+    Times a named stage as a telemetry span and, inside a job, in the job's
+    stage timings, checking for cancellation at its edges.
+    """
+    job = _current_job.get()
+    with telemetry.span(name, "stage"):
+        if job is None:
+            yield
+        else:
+            with job.stage(name):
+                yield
+
+
+def report_progress(fraction=None, message=None):
+    """Reports progress (0-1) of the current job and checks for cancellation; a no-op outside a job."""
+    job = _current_job.get()
+    if job is not None:
+        job.progress(fraction, message)
+
+
+def _dedup_key(kind, params):
+    return f"{kind}:{json.dumps(params, sort_keys=True, default=str)}"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobRunner:
+    """
+    Runs ingestion, forecasting and analysis in background threads, with
+    their state kept in the jobs table so any session (or a refreshed
+    browser) can follow them.
+
+    Submitting a job that is identical (same kind and parameters) to one
+    still queued or running returns the existing job instead; a partial
+    unique index enforces this across processes. Cancellation is
+    cooperative: it takes effect at the next stage boundary or progress
+    report of the running pipeline.
+    """
+
+    def __init__(self, max_workers=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or JOB_MAX_WORKERS, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self.recover_interrupted()
+
+    def recover_interrupted(self):
+        """Fails jobs left queued or running by a process that no longer exists."""
+        rows = query_df(
+            "SELECT id, worker_pid FROM jobs WHERE status IN ('queued', 'running')"
+        )
+        dead = [int(job_id) for job_id, pid in zip(rows['id'], rows['worker_pid']) if not _pid_alive(int(pid))]
+        for job_id in dead:
+            _update(
+                """UPDATE jobs SET status = 'failed', error = 'Interrupted: the worker process exited.',
+                   finished_at = ? WHERE id = ? AND status IN ('queued', 'running')""",
+                (_now(), job_id)
+            )
+
+    def submit(self, kind, **params):
+        """Queues a job; returns (job_id, created), where created is False for a duplicate of an active job."""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}'; expected one of {sorted(JOB_KINDS)}.")
+        key = _dedup_key(kind, params)
+        with self._lock:
+            try:
+                with transaction() as conn:
+                    job_id = conn.execute(
+                        """INSERT INTO jobs (kind, params, dedup_key, status, worker_pid, created_at)
+                           VALUES (?, ?, ?, 'queued', ?, ?)""",
+                        (kind, json.dumps(params, default=str), key, os.getpid(), _now())
+                    ).lastrowid
+                    bump_table_versions(conn, "jobs")
+            except sqlite3.IntegrityError:
+                row = query_one(
+                    "SELECT id FROM jobs WHERE dedup_key = ? AND status IN ('queued', 'running')", (key,)
+                )
+                if row:
+                    return row[0], False
+                raise
+        self._executor.submit(self._run, job_id, kind, params)
+        return job_id, True
+
+    def cancel(self, job_id):
+        """Cancels a queued job at once, or asks a running one to stop; returns False if it already finished."""
+        with transaction() as conn:
+            changed = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (_now(), job_id)
+            ).rowcount or conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,)
+            ).rowcount
+            if changed:
+                bump_table_versions(conn, "jobs")
+        return bool(changed)
+
+    def _run(self, job_id, kind, params):
+        # Claim the job; it may have been cancelled while queued
+        with transaction() as conn:
+            claimed = conn.execute(
+                """UPDATE jobs SET status = 'running', started_at = ?, worker_pid = ?
+                   WHERE id = ? AND status = 'queued'""",
+                (_now(), os.getpid(), job_id)
+            ).rowcount
+            bump_table_versions(conn, "jobs")
+        if not claimed:
+            return
+
+        job = JobContext(job_id)
+        token = _current_job.set(job)
+        started = time.perf_counter()
+        status, result, error = "succeeded", None, None
+        try:
+            # The pipeline's own telemetry run joins this one, so the import is measured too
+            with telemetry.run(kind, job_id=job_id):
+                module_name, function_name = JOB_KINDS[kind]
+                with stage("import"):
+                    function = getattr(importlib.import_module(module_name), function_name)
+                result = function(**params)
+        except JobCancelled as e:
+            status, error = "cancelled", str(e)
+        except Exception as e:
+            status, error = "failed", f"{type(e).__name__}: {e}"
+            print(f"Job {job_id} ({kind}) failed: {error}")
+        finally:
+            _current_job.reset(token)
+
+        job.stages["total"] = round(time.perf_counter() - started, 3)
+        _update(
+            """UPDATE jobs SET status = ?, progress = CASE WHEN ? = 'succeeded' THEN 1 ELSE progress END,
+                   message = ?, stages = ?, result = ?, error = ?, finished_at = ?
+               WHERE id = ?""",
+            (status, status, status, json.dumps(job.stages),
+             None if result is None else json.dumps(result, default=str), error, _now(), job_id)
+        )
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def get_job(job_id):
+    """Returns the job's row as a dict (stages and result decoded), or None."""
+    df = query_df("SELECT * FROM jobs WHERE id = ?", params=(job_id,))
+    if df.empty:
+        return None
+    job = df.iloc[0].to_dict()
+    job['stages'] = json.loads(job['stages'] or '{}')
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+def list_jobs(limit=20):
+    """The most recent jobs, newest first."""
+    return query_df(
+        """SELECT id, kind, status, progress, message, stages, error, created_at, started_at, finished_at
+           FROM jobs ORDER BY id DESC LIMIT ?""",
+        params=(limit,)
+    )
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """Returns this process's job runner, starting it on first use."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
@@ -0,0 +1,219 @@
+# llm_cache.py
+import hashlib
+import json
+import threading
+import time
+from typing import Any
+from crewai import BaseLLM
+from crewai.llms.base_llm import call_stop_override
+from pydantic import PrivateAttr
+import telemetry
+from disk_cache import DiskCache
+from config import (
+    VERTEX_AI_PROJECT,
+    VERTEX_AI_LOCATION,
+    LLM_MODEL_NAME,
+    LLM_CACHE_MODE,
+    LLM_CACHE_DIR,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_BYTES,
+    LLM_RECORDINGS_DIR,
+)
+
+MODES = ("off", "cache", "record", "replay", "fake")
+
+
+def _prompt_text(messages):
+    if isinstance(messages, str):
+        return f"user: {messages}"
+    return "\n".join(f"{message.get('role')}: {message.get('content')}" for message in messages)
+
+
+def request_key(model_name, messages, stop=None, **kwargs):
+    """
+    Cache key of one chat request: the model, every message (agents feed
+    tool observations back as messages, so tool output is part of the
+    prompt), stop words and any call parameters.
+    """
+    payload = json.dumps(
+        {"model": model_name, "prompt": _prompt_text(messages), "stop": stop, "params": kwargs},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def fake_response(messages):
+    """
+    The offline model's answer: a final answer in crewAI's ReAct format
+    derived from the prompt's hash, so agent runs terminate and repeat exactly.
+    """
+    digest = hashlib.sha256(_prompt_text(messages).encode("utf-8")).hexdigest()[:12]
+    last = messages if isinstance(messages, str) else (messages[-1].get("content") if messages else "")
+    excerpt = " ".join(str(last).split())[:200]
+    return (
+        "Thought: I now can give a great answer\n"
+        f"Final Answer: Offline response {digest}. Prompt excerpt: {excerpt}"
+    )
+
+
+def _token_usage(llm):
+    """(prompt tokens, completion tokens) the crewAI LLM has reported so far, or Nones."""
+    usage = getattr(llm, "_token_usage", None) or {}
+    return usage.get("prompt_tokens"), usage.get("completion_tokens")
+
+
+class FakeLLM(BaseLLM):
+    """
+    A deterministic, offline stand-in for the Gemini client: every call is
+    answered immediately by fake_response() and never touches the network.
+    """
+
+    model: str = "fake-chat"
+    llm_type: str = "fake"
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None,
+             from_agent=None, response_model=None):
+        started = time.perf_counter()
+        text = fake_response(messages)
+        telemetry.record("chat", time.perf_counter() - started, "llm", model=self.model, cache="fake",
+                         prompt_chars=len(_prompt_text(messages)), response_chars=len(text))
+        return text
+
+    def supports_function_calling(self):
+        # Tools are described in the prompt (ReAct), so every request is plain text
+        return False
+
+
+class CachedLLM(BaseLLM):
+    """
+    Wraps a crewAI LLM with an on-disk response cache. Agents are given this
+    object, so crewAI calls it directly instead of building its own client.
+
+    Modes:
+      off    - always call the model, nothing is stored
+      cache  - serve repeated requests from disk, call the model on a miss
+      record - always call the model and save every response
+      replay - serve only saved responses; a miss is answered by
+               fake_response() instead of the network, so runs work fully offline
+
+    Every call is recorded as an 'llm' telemetry span with its latency,
+    prompt and response sizes, token usage when the model reports it, and
+    the cache outcome.
+    """
+
+    llm_type: str = "cached"
+    mode: str = "cache"
+    _store: Any = PrivateAttr(default=None)
+    _factory: Any = PrivateAttr(default=None)
+    _local: Any = PrivateAttr(default_factory=threading.local)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _stats: dict = PrivateAttr(default_factory=lambda: {"hits": 0, "misses": 0, "calls": 0, "replay_misses": 0})
+
+    def __init__(self, store, factory=None, **kwargs):
+        """`factory` builds the real crewAI LLM; None answers every miss offline."""
+        super().__init__(**kwargs)
+        self._store = store
+        self._factory = factory
+
+    def _inner(self):
+        """
+        This thread's client. Pipeline steps call the model concurrently, and
+        a client's token counters are only attributable to one call at a time.
+        """
+        inner = getattr(self._local, "llm", None)
+        if inner is None:
+            inner = self._local.llm = self._factory()
+        return inner
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def supports_function_calling(self):
+        # Tools are described in the prompt (ReAct), so every response is text that can be cached
+        return False
+
+    def get_context_window_size(self):
+        return self._inner().get_context_window_size() if self._factory else super().get_context_window_size()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None,
+             from_agent=None, response_model=None):
+        started = time.perf_counter()
+        stop = list(self.stop_sequences)
+        key = request_key(self.model, messages, stop)
+        attributes = {"model": self.model, "prompt_chars": len(_prompt_text(messages))}
+        try:
+            text, outcome = self._respond(key, messages, stop, callbacks, from_task, from_agent, attributes)
+        except Exception as e:
+            telemetry.record("chat", time.perf_counter() - started, "llm", status="error",
+                             error=f"{type(e).__name__}: {e}", **attributes)
+            raise
+        telemetry.record("chat", time.perf_counter() - started, "llm", cache=outcome,
+                         response_chars=len(text), **attributes)
+        return text
+
+    def _respond(self, key, messages, stop, callbacks, from_task, from_agent, attributes):
+        """(response text, cache outcome) for one request."""
+        if self.mode in ("cache", "replay"):
+            data = self._store.get(key)
+            if data is not None:
+                self._count("hits")
+                # No tokens were spent, so the original usage is not reported
+                return json.loads(data.decode("utf-8"))["content"], "hit"
+            self._count("misses")
+        if self.mode == "replay" or self._factory is None:
+            self._count("replay_misses")
+            print(f"LLM replay miss for request {key[:12]}; answering with the offline fake model.")
+            return fake_response(messages), "replay_miss"
+
+        self._count("calls")
+        inner = self._inner()
+        prompt_tokens, completion_tokens = _token_usage(inner)
+        # The executor sets the ReAct stop words on this object; the inner client must honour them too
+        with call_stop_override(inner, stop):
+            text = str(inner.call(messages, callbacks=callbacks, from_task=from_task, from_agent=from_agent))
+        now_prompt, now_completion = _token_usage(inner)
+        if now_prompt is not None:
+            attributes["prompt_tokens"] = now_prompt - (prompt_tokens or 0)
+            attributes["completion_tokens"] = (now_completion or 0) - (completion_tokens or 0)
+        if self.mode != "off":
+            self._store.put(key, json.dumps({"model": self.model, "content": text}).encode("utf-8"))
+        return text, "miss" if self.mode == "cache" else self.mode
+
+
+def build_llm(mode=None, model_name=None):
+    """
+    Returns the crewAI LLM the agents use, according to LLM_CACHE_MODE:
+    'off' for Gemini on Vertex AI with no cache, 'cache' (default) for Gemini
+    behind a TTL/size-bounded response cache, 'record' / 'replay' to capture
+    and re-serve a run from LLM_RECORDINGS_DIR, or 'fake' for FakeLLM only.
+    'replay' and 'fake' never touch the network.
+    """
+    mode = mode or LLM_CACHE_MODE
+    model_name = model_name or LLM_MODEL_NAME
+    if mode not in MODES:
+        raise ValueError(f"Unknown LLM cache mode '{mode}'; expected one of {MODES}.")
+    if mode == "fake":
+        return FakeLLM(model="fake-chat")
+
+    factory = None
+    if mode != "replay":
+        from crewai import LLM
+
+        def factory():
+            return LLM(model=f"gemini/{model_name}", project=VERTEX_AI_PROJECT, location=VERTEX_AI_LOCATION,
+                       use_vertexai=True)
+
+    if mode == "cache":
+        store = DiskCache(LLM_CACHE_DIR, max_bytes=LLM_CACHE_MAX_BYTES, ttl_seconds=LLM_CACHE_TTL_SECONDS, suffix=".json")
+    elif mode == "off":
+        store = None
+    else:
+        # Recordings are fixtures: no TTL or size limit
+        store = DiskCache(LLM_RECORDINGS_DIR, suffix=".json")
+    return CachedLLM(store, factory, model=model_name, mode=mode)
@@ -0,0 +1,308 @@
+# memory.py
+"""
+Long-term memory of past briefings.
+
+Briefing markdown is stored zlib-compressed in briefing_contents, keyed by
+its SHA-256 so identical briefings are kept once; briefing_dates maps each
+date to its content. The briefings view joins the two back into the
+original (id, briefing_date, content) columns, decompressing with the
+inflate() SQL function that db.connect registers, so SQL written against
+the plain-text table keeps working. When a briefing is stored, a compact
+record of its conclusions is extracted into small indexed tables:
+memory_log (one line per date with the outlook direction), memory_picks
+(the tickers of the Top Opportunity section, the pick ranked first) and
+memory_risks (the key risk per ticker). recall() reads those, so agents get
+their past conclusions without re-reading full briefings.
+"""
+import hashlib
+import re
+import zlib
+from db import bump_table_versions, connection, query_df, query_one
+from config import (
+    BRIEFING_COMPRESSION_LEVEL,
+    MEMORY_CHARS_PER_TOKEN,
+    MEMORY_RECALL_LAST_N,
+    MEMORY_RECALL_MAX_TOKENS,
+    MEMORY_RISK_CHARS,
+    MEMORY_SUMMARY_CHARS,
+)
+
+MEMORY_TABLES = ("briefing_dates", "briefing_contents", "memory_log", "memory_picks", "memory_risks")
+
+# Briefings as the original table had them, with the markdown decompressed.
+# Unqualified names, so a point-in-time connection can define it over its own views.
+BRIEFINGS_VIEW_SELECT = """SELECT d.id, d.briefing_date, inflate(c.content) AS content, d.content_hash
+    FROM briefing_dates d JOIN briefing_contents c ON c.content_hash = d.content_hash"""
+
+# SGX tickers as written in briefings, e.g. D05.SI
+_TICKER_RE = re.compile(r"\b[A-Z0-9]{1,6}\.SI\b")
+_TOP_OPPORTUNITY_RE = re.compile(r"top opportunity", re.IGNORECASE)
+_RISK_RE = re.compile(r"key risks?(?: assessment)?|risk assessment", re.IGNORECASE)
+# Tried in order: the macro task's 'Future Outlook' section, any outlook section
+_OUTLOOK_RES = (re.compile(r"future outlook", re.IGNORECASE), re.compile(r"outlook", re.IGNORECASE))
+# Markdown headings and lines that are only bold text, e.g. "**Key Risks:**"
+_HEADING_RE = re.compile(r"^[ \t]*(?:#{1,6}[ \t]+\S.*|\*\*[^*\n]+\*\*:?)[ \t]*$", re.MULTILINE)
+# A period inside a token (D05.SI, 3.5%) does not end a sentence
+_SENTENCE_RE = re.compile(r"(?:[^.!?\n]|[.!?](?=\S))+[.!?]?")
+_MARKUP_RE = re.compile(r"[*_#>`|]+|^\s*[-+]\s+", re.MULTILINE)
+# Checked in this order, so a tie goes to the first
+OUTLOOK_DIRECTIONS = {
+    "acceleration": re.compile(r"\baccelerat\w*|\bexpan(?:d|ds|ding|sion)\b|\bpick(?:s|ing)? up\b", re.IGNORECASE),
+    "deceleration": re.compile(r"\bdecelerat\w*|\bslow(?:s|ing|down|er)?\b|\bcontract\w*", re.IGNORECASE),
+    "continuation": re.compile(r"\bcontinu\w*|\bstable\b|\bsteady\b|\bunchanged\b", re.IGNORECASE),
+}
+
+
+# --- Compression ---
+def content_hash(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def compress(content):
+    return zlib.compress(content.encode("utf-8"), BRIEFING_COMPRESSION_LEVEL)
+
+
+def decompress(blob):
+    return zlib.decompress(blob).decode("utf-8")
+
+
+# --- Extraction ---
+def _section(content, pattern):
+    """
+    The text after the first match of `pattern` up to the next heading, or
+    None when it does not occur. Headings straight after the match (e.g. a
+    bold "**D05.SI (DBS)**" line under "## Top Opportunity") belong to it.
+    """
+    match = pattern.search(content or "")
+    if match is None:
+        return None
+    end = len(content)
+    for heading in _HEADING_RE.finditer(content, content.find("\n", match.end()) + 1 or len(content)):
+        if _HEADING_RE.sub("", content[match.end():heading.start()]).strip(" \t\n:-"):
+            end = heading.start()
+            break
+    return content[match.end():end]
+
+
+def _truncate(text, limit):
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def _plain(text):
+    """`text` without markdown markup, on one line."""
+    return " ".join(_MARKUP_RE.sub(" ", text).split()).strip(" :-")
+
+
+def _sentences(text):
+    return [s for s in (_plain(m.group()) for m in _SENTENCE_RE.finditer(text or "")) if s]
+
+
+def extract_picks(content, tickers):
+    """The known tickers in a briefing's 'Top Opportunity' section, in order of first mention: the pick comes first."""
+    section = _section(content, _TOP_OPPORTUNITY_RE)
+    return list(dict.fromkeys(t for t in _TICKER_RE.findall(section or "") if t in tickers))
+
+
+def extract_outlook(content):
+    """
+    'acceleration', 'deceleration' or 'continuation': the direction mentioned
+    most in the outlook section (or, failing that, the whole briefing); None
+    when none is.
+    """
+    for text in [_section(content, pattern) for pattern in _OUTLOOK_RES] + [content]:
+        counts = {direction: len(pattern.findall(text or "")) for direction, pattern in OUTLOOK_DIRECTIONS.items()}
+        direction = max(counts, key=counts.get)
+        if counts[direction]:
+            return direction
+    return None
+
+
+def extract_risks(content, tickers):
+    """{ticker: risk} for the known tickers in the risk section; a risk naming no ticker is keyed by None."""
+    risks = {}
+    for sentence in _sentences(_section(content, _RISK_RE)):
+        if len(sentence.split()) < 4:
+            continue
+        named = [t for t in dict.fromkeys(_TICKER_RE.findall(sentence)) if t in tickers]
+        for ticker in named or [None]:
+            # "D05.SI: Rate cuts ..." is stored as "Rate cuts ..."
+            risk = re.sub(rf"^{re.escape(ticker)}\W+", "", sentence) if ticker else sentence
+            risks.setdefault(ticker, _truncate(risk, MEMORY_RISK_CHARS))
+    if len(risks) > 1:
+        risks.pop(None, None)
+    return risks
+
+
+def extract_record(briefing_date, content, tickers):
+    """The compact conclusions of one briefing: date, outlook, picks, risks and a one-line summary."""
+    picks = extract_picks(content, tickers)
+    outlook = extract_outlook(content)
+    risks = extract_risks(content, tickers)
+    parts = [f"Outlook: {outlook or 'unclear'}"]
+    if picks:
+        # The first full sentence of the section, skipping a bare "D05.SI (DBS)" line
+        rationale = _sentences(_section(content, _TOP_OPPORTUNITY_RE))
+        reason = next((s.rstrip(".") for s in rationale if len(s.split()) >= 4), None)
+        parts.append(f"Top pick: {picks[0]}" + (f" ({reason})" if reason else ""))
+    risk = risks.get(picks[0]) if picks else None
+    risk = risk or next(iter(risks.values()), None)
+    if risk:
+        parts.append(f"Key risk: {risk.rstrip('.')}")
+    return {
+        "date": briefing_date,
+        "outlook": outlook,
+        "picks": picks,
+        "risks": risks,
+        "summary": _truncate(". ".join(parts) + ".", MEMORY_SUMMARY_CHARS),
+    }
+
+
+# --- Storage ---
+def known_tickers(conn):
+    return {row[0] for row in conn.execute("SELECT DISTINCT ticker FROM sgx_stocks_daily")}
+
+
+def store_briefings(conn, rows, tickers=None):
+    """
+    Writes (briefing_date, content) rows and their memory records on `conn`,
+    inside the caller's transaction, replacing whatever was stored for the
+    same dates. Content no briefing refers to any more is deleted.
+    """
+    tickers = known_tickers(conn) if tickers is None else tickers
+    # The last row wins when a date repeats
+    rows = list({day: str(content) for day, content in rows}.items())
+    if not rows:
+        return
+    hashes = [content_hash(content) for _, content in rows]
+    records = [extract_record(day, content, tickers) for day, content in rows]
+    dates = [(day,) for day, _ in rows]
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO briefing_contents (content_hash, content) VALUES (?, ?)",
+        [(h, compress(content)) for h, (_, content) in dict(zip(hashes, rows)).items()]
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO briefing_dates (briefing_date, content_hash) VALUES (?, ?)",
+        [(day, h) for (day, _), h in zip(rows, hashes)]
+    )
+    conn.execute("DELETE FROM briefing_contents WHERE content_hash NOT IN (SELECT content_hash FROM briefing_dates)")
+
+    conn.executemany("DELETE FROM memory_picks WHERE log_date = ?", dates)
+    conn.executemany("DELETE FROM memory_risks WHERE log_date = ?", dates)
+    conn.executemany(
+        "INSERT OR REPLACE INTO memory_log (log_date, summary, outlook) VALUES (?, ?, ?)",
+        [(r["date"], r["summary"], r["outlook"]) for r in records]
+    )
+    conn.executemany(
+        "INSERT INTO memory_picks (log_date, ticker, pick_rank) VALUES (?, ?, ?)",
+        [(r["date"], ticker, rank) for r in records for rank, ticker in enumerate(r["picks"], start=1)]
+    )
+    conn.executemany(
+        "INSERT INTO memory_risks (log_date, ticker, risk) VALUES (?, ?, ?)",
+        [(r["date"], ticker, risk) for r in records for ticker, risk in r["risks"].items()]
+    )
+    bump_table_versions(conn, *MEMORY_TABLES)
+
+
+def migrate(conn):
+    """
+    Moves briefings kept in a `briefings` table to briefing_dates /
+    briefing_contents and replaces the table with the briefings view. The
+    original table held plain-text content, whose memory records are
+    extracted on the way; a later one already mapped dates to content
+    hashes. Runs on `conn` inside the caller's transaction (see
+    database_setup.create_tables) and returns the number of briefings
+    moved, 0 when the database is already current.
+    """
+    found = conn.execute("SELECT type FROM sqlite_master WHERE name = 'briefings'").fetchone()
+    if found is None or found[0] != "table":
+        return 0
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(briefings)")}
+    if "content" in columns:
+        rows = conn.execute("SELECT briefing_date, content FROM briefings").fetchall()
+        conn.execute("DROP TABLE briefings")
+        store_briefings(conn, rows)
+    else:
+        rows = conn.execute("SELECT id, briefing_date, content_hash FROM briefings").fetchall()
+        conn.execute("DROP TABLE briefings")
+        conn.executemany(
+            "INSERT OR REPLACE INTO briefing_dates (id, briefing_date, content_hash) VALUES (?, ?, ?)", rows
+        )
+        bump_table_versions(conn, *MEMORY_TABLES)
+    conn.execute(f"CREATE VIEW briefings AS {BRIEFINGS_VIEW_SELECT}")
+    return len(rows)
+
+
+# --- Reading ---
+def load_briefing(briefing_date=None):
+    """(briefing_date, markdown) of the briefing for `briefing_date`, by default the latest; (None, None) if none."""
+    sql = "SELECT briefing_date, content FROM briefings"
+    if briefing_date is None:
+        row = query_one(sql + " ORDER BY briefing_date DESC LIMIT 1")
+    else:
+        row = query_one(sql + " WHERE briefing_date = ?", (briefing_date,))
+    return tuple(row) if row else (None, None)
+
+
+def top_picks(start_date=None, end_date=None):
+    """One row per stored briefing in the date range with its first pick (None when it named none)."""
+    return query_df(
+        """SELECT b.briefing_date, p.ticker FROM briefing_dates b
+           LEFT JOIN memory_picks p ON p.log_date = b.briefing_date AND p.pick_rank = 1
+           WHERE b.briefing_date >= ? AND b.briefing_date <= ? ORDER BY b.briefing_date""",
+        params=(start_date or "0000-01-01", end_date or "9999-12-31")
+    )
+
+
+def _estimate_tokens(text):
+    return -(-len(text) // MEMORY_CHARS_PER_TOKEN)
+
+
+def recall(ticker=None, outlook=None, last_n=None, max_tokens=None, before=None):
+    """
+    The most recent `last_n` stored conclusions, newest first, as text that
+    fits `max_tokens` (estimated at MEMORY_CHARS_PER_TOKEN characters each).
+    `ticker` keeps the dates that picked it or named a risk for it, adding
+    that risk to each line; `outlook` keeps one outlook direction; `before`
+    keeps dates earlier than 'YYYY-MM-DD'.
+    """
+    last_n = last_n or MEMORY_RECALL_LAST_N
+    max_tokens = max_tokens or MEMORY_RECALL_MAX_TOKENS
+    clauses, params = ["m.log_date < ?"], [before or "9999-12-31"]
+    if ticker:
+        clauses.append("""m.log_date IN (SELECT log_date FROM memory_picks WHERE ticker = ?
+                                          UNION SELECT log_date FROM memory_risks WHERE ticker = ?)""")
+        params += [ticker, ticker]
+    if outlook:
+        clauses.append("m.outlook = ?")
+        params.append(outlook)
+    risk_column = "(SELECT risk FROM memory_risks r WHERE r.log_date = m.log_date AND r.ticker = ?)" if ticker \
+        else "NULL"
+    with connection() as conn:
+        rows = conn.execute(
+            f"""SELECT m.log_date, m.summary, {risk_column} FROM memory_log m
+                WHERE {' AND '.join(clauses)} ORDER BY m.log_date DESC LIMIT ?""",
+            ([ticker] if ticker else []) + params + [last_n]
+        ).fetchall()
+    if not rows:
+        return "No past conclusions stored" + (f" for {ticker}." if ticker else ".")
+
+    header = "Past conclusions, newest first:"
+    lines, budget = [], max_tokens - _estimate_tokens(header)
+    for log_date, summary, risk in rows:
+        line = f"- {log_date}: {summary}"
+        if risk and risk not in summary:
+            line += f" {ticker} risk: {risk}"
+        cost = _estimate_tokens(line) + 1
+        if cost > budget:
+            if not lines and budget > 8:
+                # Always return something: the newest conclusion, cut to the budget
+                lines.append(_truncate(line, (budget - 1) * MEMORY_CHARS_PER_TOKEN))
+            break
+        lines.append(line)
+        budget -= cost
+    omitted = len(rows) - len(lines)
+    if omitted:
+        lines.append(f"({omitted} older conclusions omitted to fit the token budget.)")
+    return "\n".join([header] + lines)
+
@@ -0,0 +1,78 @@
+# model_store.py
+import json
+from datetime import datetime
+import numpy as np
+from disk_cache import DiskCache
+from config import MODEL_STORE_DIR, MODEL_STORE_MAX_BYTES, MODEL_STORE_MAX_ENTRIES
+
+_store = None
+
+
+def get_store():
+    """Returns the process-wide model store, creating its directory on first use."""
+    global _store
+    if _store is None:
+        _store = DiskCache(
+            MODEL_STORE_DIR,
+            max_bytes=MODEL_STORE_MAX_BYTES,
+            max_entries=MODEL_STORE_MAX_ENTRIES,
+            suffix=".json"
+        )
+    return _store
+
+
+def _store_key(indicator, model_key):
+    return f"{indicator}|{model_key}"
+
+
+def save_model(indicator, model_key, model, fingerprint):
+    """Serializes a fitted Prophet model along with the fingerprint of its training data."""
+    from prophet.serialize import model_to_json
+
+    payload = {
+        "indicator": indicator,
+        "model_key": model_key,
+        "fingerprint": list(fingerprint),
+        "fitted_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "model": model_to_json(model),
+    }
+    get_store().put(_store_key(indicator, model_key), json.dumps(payload).encode("utf-8"))
+
+
+def load_model(indicator, model_key):
+    """
+    Returns (model, fingerprint) for the last fit of `indicator` with the given
+    hyperparameters, or (None, None) if nothing usable is stored.
+    """
+    from prophet.serialize import model_from_json
+
+    data = get_store().get(_store_key(indicator, model_key))
+    if data is None:
+        return None, None
+    try:
+        payload = json.loads(data)
+        return model_from_json(payload["model"]), tuple(payload["fingerprint"])
+    except Exception as e:
+        # A model written by an incompatible Prophet version is just a cache miss
+        print(f"    - Discarding stored model for {indicator}: {e}")
+        get_store().delete(_store_key(indicator, model_key))
+        return None, None
+
+
+def warm_start_params(model):
+    """
+    Extracts a fitted model's parameters in the form Prophet.fit(init=...) expects,
+    so a refit on slightly longer history starts from the previous optimum.
+    """
+    params = {}
+    for name in ['k', 'm', 'sigma_obs']:
+        if model.mcmc_samples == 0:
+            params[name] = model.params[name][0][0]
+        else:
+            params[name] = np.mean(model.params[name])
+    for name in ['delta', 'beta']:
+        if model.mcmc_samples == 0:
+            params[name] = model.params[name][0]
+        else:
+            params[name] = np.mean(model.params[name], axis=0)
+    return params
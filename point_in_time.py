@@ -0,0 +1,202 @@
+# point_in_time.py
+import re
+import time
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from analytics import (
+    CORRELATION_COLUMNS,
+    LATEST_METRIC_COLUMNS,
+    compute_correlations,
+    compute_daily_features,
+    compute_latest_metrics,
+    indicator_frequency,
+    insert_rows,
+    latest_metric_rows,
+    load_indicators,
+    load_prices,
+)
+from backtesting import prefix_forecasts
+from db import connect, query_all, use_snapshot
+from memory import BRIEFINGS_VIEW_SELECT
+from predictive_models import forecast_rows, load_histories
+from config import (
+    FORECAST_HORIZON_DAYS,
+    FORECAST_MIN_HISTORY,
+    INDICATOR_DEFAULT_RELEASE_LAG_DAYS,
+    INDICATOR_RELEASE_LAG_DAYS,
+)
+
+# Tables whose rows carry the date they became known: rows dated after the
+# as-of day are hidden behind a temp view of the same name
+DATED_TABLES = {
+    "sgx_stocks_daily": "record_date",
+    "unstructured_news": "published_date",
+    # Rolling, backward-looking features, so a day's row does not depend on later prices
+    "stock_features_daily": "record_date",
+    # Complete periods only; the period still running on the as-of day is left out
+    "stock_returns_periodic": "period_end",
+    # singstat_data is not here: a value is dated at the start of the period it
+    # describes and published some time after that period ends, so its view
+    # hides values by their availability date instead (see availability_dates)
+}
+# Written on a given day, so a briefing for that day only sees earlier ones
+PRIOR_TABLES = {
+    "briefing_dates": "briefing_date",
+    "memory_log": "log_date",
+    "memory_picks": "log_date",
+    "memory_risks": "log_date",
+}
+# Derived from the whole history, so recomputed per day into a temp table of the same name
+RECOMPUTED_TABLES = ("indicator_forecasts", "stock_latest_metrics", "stock_indicator_correlations")
+
+_CREATE_TABLE_RE = re.compile(r"^\s*CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?", re.IGNORECASE)
+
+
+def _next_day(as_of):
+    # Dates may be stored with a time part, so "on or before the as-of day" is "before the next day"
+    return (pd.Timestamp(as_of).normalize() + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def availability_dates(indicator_name, record_dates, freq=None):
+    """
+    The day each of an indicator's values was published: the end of the
+    reference period starting at its record_date, plus the indicator's
+    release lag (INDICATOR_RELEASE_LAG_DAYS). A value is known on days on or
+    after that date.
+    """
+    record_dates = pd.DatetimeIndex(pd.to_datetime(record_dates))
+    freq = freq or indicator_frequency(record_dates)
+    lag = INDICATOR_RELEASE_LAG_DAYS.get(indicator_name, INDICATOR_DEFAULT_RELEASE_LAG_DAYS)
+    return record_dates.to_period(freq).end_time.normalize() + pd.Timedelta(days=lag)
+
+
+class Snapshots:
+    """
+    Point-in-time views of the database for a set of past dates, so a
+    briefing generated for one of them sees only what was known that day.
+
+    The history is loaded once for all dates. Prices, features and indicator
+    values are sliced per date, and indicators are forecast once per
+    distinct history prefix rather than once per date (a monthly indicator
+    only changes prefix when a new observation is published inside the
+    range), through the backtest cache of prefix forecasts. An indicator
+    value counts as known from its availability date, not its record_date.
+    """
+
+    def __init__(self, dates, forecast_backend=None, horizon_days=FORECAST_HORIZON_DAYS):
+        started = time.perf_counter()
+        self.prices, self.date_strings = load_prices()
+        self.features = compute_daily_features(self.prices) if not self.prices.empty else None
+        self.indicators = load_indicators()
+        self.frequencies, available = {}, pd.Series(pd.NaT, index=self.indicators.index, dtype='datetime64[ns]')
+        for name, group in self.indicators.groupby('indicator_name', sort=False):
+            self.frequencies[name] = indicator_frequency(group['record_date'])
+            available[group.index] = availability_dates(name, group['record_date'], self.frequencies[name]).to_numpy()
+        self.indicators['available_date'] = available
+        self.schemas = {
+            name: _CREATE_TABLE_RE.sub("CREATE TEMP TABLE ", sql)
+            for name, sql in query_all(
+                f"SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name IN "
+                f"({', '.join('?' * len(RECOMPUTED_TABLES))})",
+                RECOMPUTED_TABLES
+            )
+        }
+        self.forecasts = self._forecast_prefixes(dates, forecast_backend, horizon_days)
+        print(f"Prepared point-in-time data for {len(dates)} dates in {time.perf_counter() - started:.1f}s.")
+
+    def _forecast_prefixes(self, dates, backend, horizon_days):
+        """{date: [forecast frame per indicator]}, fitting each indicator's distinct history prefixes in one batch."""
+        next_days = pd.to_datetime([_next_day(d) for d in dates]).to_numpy()
+        prefixes, by_date = {}, {d: [] for d in dates}
+        for name, history in load_histories().items():
+            # Values are in date order, so those published before a day are a prefix
+            available = availability_dates(name, history['ds'], self.frequencies.get(name)).to_numpy()
+            lengths = np.searchsorted(available, next_days.astype(available.dtype), side='left')
+            for day, length in zip(dates, lengths):
+                if length >= FORECAST_MIN_HISTORY:
+                    by_date[day].append((name, int(length)))
+            prefixes[name] = (history, lengths[lengths >= FORECAST_MIN_HISTORY])
+        forecasts = prefix_forecasts(prefixes, backend, horizon_days)
+        fitted = dict(tuple(forecasts.groupby(['indicator_name', 'length'], sort=False)))
+        return {d: [fitted[key] for key in keys if key in fitted] for d, keys in by_date.items()}
+
+    def _recomputed_rows(self, as_of):
+        """Rows of each RECOMPUTED_TABLES table as they would have been computed on `as_of`."""
+        next_day = pd.Timestamp(_next_day(as_of))
+        rows = {}
+        forecasts = self.forecasts.get(as_of, [])
+        rows["indicator_forecasts"] = (
+            ("indicator_name", "forecast_date", "predicted_value"),
+            forecast_rows(pd.concat(forecasts)) if forecasts else [],
+        )
+        prices = self.prices[self.prices.index < next_day].dropna(axis=1, how='all') if not self.prices.empty \
+            else self.prices
+        if prices.empty:
+            rows["stock_latest_metrics"] = (LATEST_METRIC_COLUMNS, [])
+            rows["stock_indicator_correlations"] = (CORRELATION_COLUMNS, [])
+            return rows
+        features = self.features[self.features['date'] < next_day]
+        latest = compute_latest_metrics(prices, features)
+        correlations = compute_correlations(
+            prices, indicators=self.indicators[self.indicators['available_date'] < next_day]
+        )
+        rows["stock_latest_metrics"] = (LATEST_METRIC_COLUMNS, list(latest_metric_rows(latest, self.date_strings)))
+        rows["stock_indicator_correlations"] = (
+            CORRELATION_COLUMNS, list(correlations[list(CORRELATION_COLUMNS)].itertuples(index=False, name=None))
+        )
+        return rows
+
+    def _indicator_cutoffs(self, next_day):
+        """(indicator_name, first record_date not yet published by `next_day`) for indicators with unpublished values."""
+        hidden = self.indicators[self.indicators['available_date'] >= pd.Timestamp(next_day)]
+        first = hidden.groupby('indicator_name')['record_date'].min()
+        return [(name, day.strftime('%Y-%m-%d')) for name, day in first.items()]
+
+    def connect(self, as_of):
+        """A new connection on which the data tables read as they stood at the end of `as_of` ('YYYY-MM-DD')."""
+        as_of = pd.Timestamp(as_of).strftime('%Y-%m-%d')
+        next_day = _next_day(as_of)
+        conn = connect()
+        try:
+            # Unqualified names resolve to temp objects before main ones. The
+            # bounds are formatted dates, so they are safe to inline (views
+            # cannot take parameters).
+            for table, column in DATED_TABLES.items():
+                conn.execute(f"CREATE TEMP VIEW {table} AS SELECT * FROM main.{table} WHERE {column} < '{next_day}'")
+            conn.execute("CREATE TEMP TABLE singstat_cutoffs (indicator_name TEXT PRIMARY KEY, visible_before TEXT NOT NULL)")
+            insert_rows(conn, "singstat_cutoffs", ("indicator_name", "visible_before"), self._indicator_cutoffs(next_day))
+            conn.execute(
+                f"""CREATE TEMP VIEW singstat_data AS SELECT s.* FROM main.singstat_data s
+                    WHERE s.record_date < COALESCE(
+                        (SELECT c.visible_before FROM singstat_cutoffs c WHERE c.indicator_name = s.indicator_name),
+                        '{next_day}'
+                    )"""
+            )
+            for table, column in PRIOR_TABLES.items():
+                conn.execute(f"CREATE TEMP VIEW {table} AS SELECT * FROM main.{table} WHERE {column} < '{as_of}'")
+            # Briefing contents carry no date: only those of the earlier briefings are visible
+            conn.execute(
+                "CREATE TEMP VIEW briefing_contents AS SELECT * FROM main.briefing_contents "
+                "WHERE content_hash IN (SELECT content_hash FROM briefing_dates)"
+            )
+            # The main briefings view reads the main tables, so it is shadowed by one over the views above
+            conn.execute(f"CREATE TEMP VIEW briefings AS {BRIEFINGS_VIEW_SELECT}")
+            for table, (columns, rows) in self._recomputed_rows(as_of).items():
+                conn.execute(self.schemas[table])
+                insert_rows(conn, table, columns, rows)
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    @contextmanager
+    def as_of(self, as_of):
+        """Routes the reads of the enclosed block (and of threads it starts with its context) to connect(as_of)."""
+        conn = self.connect(as_of)
+        try:
+            with use_snapshot(conn, pd.Timestamp(as_of).strftime('%Y-%m-%d')):
+                yield conn
+        finally:
+            conn.close()
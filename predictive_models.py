@@ -1,70 +1,639 @@
 # predictive_models.py
-import sqlite3
+import hashlib
+import signal
+import threading
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
 import pandas as pd
-from prophet import Prophet
-from config import DATABASE_NAME
+import columnar_store
+import telemetry
+from db import bump_table_versions, query_df, query_all, transaction
+from jobs import report_progress, stage
+from model_store import load_model, save_model, warm_start_params
+from config import (
+    FORECAST_HORIZON_DAYS,
+    FORECAST_MIN_HISTORY,
+    FORECAST_MAX_WORKERS,
+    FORECAST_TIMEOUT_SECONDS,
+    FORECAST_BACKEND,
+)
 
-def generate_forecasts():
+
+# Identifies the model configuration a stored forecast was produced with; a
+# change here invalidates every fingerprint and forces a full refit.
+PROPHET_MODEL_KEY = "prophet:yearly_seasonality=True,daily_seasonality=False"
+
+
+class ForecastTimeout(Exception):
+    """Raised inside a worker when a single indicator exceeds its time budget."""
+
+
+def _raise_timeout(signum, frame):
+    raise ForecastTimeout()
+
+
+def load_histories():
+    """
+    Loads every indicator's history keyed by indicator name, from the
+    columnar store when it is enabled and in sync, otherwise in one query.
+    """
+    # Prophet requires columns to be named 'ds' (datestamp) and 'y' (value)
+    stored = columnar_store.read_table("singstat_data")
+    if stored is not None:
+        return {name: df.rename(columns={'record_date': 'ds', 'value': 'y'}) for name, df in stored.items()}
+
+    df = query_df(
+        "SELECT indicator_name, record_date, value FROM singstat_data ORDER BY indicator_name, record_date",
+        parse_dates=['record_date']
+    )
+    df.rename(columns={'record_date': 'ds', 'value': 'y'}, inplace=True)
+    return {name: group[['ds', 'y']].reset_index(drop=True) for name, group in df.groupby('indicator_name', sort=True)}
+
+
+def history_fingerprint(history_df):
+    """Returns (row_count, max_record_date, content_hash) for an indicator's history."""
+    hashed = pd.util.hash_pandas_object(history_df[['ds', 'y']], index=False).to_numpy()
+    max_date = history_df['ds'].max().strftime('%Y-%m-%d') if len(history_df) else None
+    return len(history_df), max_date, hashlib.sha256(hashed.tobytes()).hexdigest()
+
+
+def load_fingerprints():
+    """Returns the stored fingerprints as {indicator: (row_count, max_date, hash, model, horizon)}."""
+    rows = query_all(
+        "SELECT indicator_name, row_count, max_record_date, content_hash, model, horizon_days FROM forecast_fingerprints"
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def _predict_future(model, indicator, history_df, horizon_days):
+    """Predicts `horizon_days` past the end of the history, in storage format."""
+    # Create a future dataframe to predict on (next 3 months by default)
+    future = model.make_future_dataframe(periods=horizon_days)
+    forecast = model.predict(future)
+
+    # Extract the forecast data and format for storage
+    forecast['indicator_name'] = indicator
+    forecast_to_store = forecast[['indicator_name', 'ds', 'yhat']].copy()
+    forecast_to_store.rename(columns={'ds': 'forecast_date', 'yhat': 'predicted_value'}, inplace=True)
+
+    # Keep only future predictions
+    future_only = forecast_to_store[forecast_to_store['forecast_date'] > history_df['ds'].max()]
+    return future_only.reset_index(drop=True)
+
+
+def _new_prophet():
+    # Imported lazily: prophet (and its Stan backend) takes seconds to load and
+    # is not needed by the NumPy backends or by modules that only read forecasts.
+    from prophet import Prophet
+    return Prophet(yearly_seasonality=True, daily_seasonality=False)
+
+
+def _fit_prophet(indicator, history_df, fingerprint, use_store):
+    """
+    Returns a Prophet model fitted on `history_df`, going through the model store.
+
+    An identical stored fit is reused as-is; otherwise the previous fit's
+    parameters seed the optimizer and the new model replaces it in the store.
+    With `use_store` off the store is neither read nor written, so fits of
+    partial histories (backtests) never replace the full-history model.
+    """
+    previous, previous_fingerprint = load_model(indicator, PROPHET_MODEL_KEY) if use_store else (None, None)
+    if previous is not None and previous_fingerprint == tuple(fingerprint):
+        return previous
+
+    model = None
+    if previous is not None:
+        try:
+            model = _new_prophet().fit(history_df, init=warm_start_params(previous))
+        except Exception as e:
+            # e.g. the changepoint count differs from the previous fit
+            print(f"    - Warm start failed for {indicator}, refitting from scratch: {e}")
+            model = None
+    if model is None:
+        model = _new_prophet().fit(history_df)
+
+    if use_store:
+        save_model(indicator, PROPHET_MODEL_KEY, model, fingerprint)
+    return model
+
+
+def fit_indicator(indicator, history_df, horizon_days=FORECAST_HORIZON_DAYS, timeout=None, use_store=True):
+    """
+    Fits a Prophet model for one indicator and returns its future-only forecast.
+
+    Runs unchanged in the parent process (serial mode) or in a pool worker.
+    Returns a tuple of (indicator, forecast_df or None, error or None, seconds).
+    """
+    started = time.perf_counter()
+    # Signal handlers can only be installed from the main thread; off it the
+    # caller enforces the timeout instead (see ProphetForecaster.forecast)
+    use_alarm = bool(timeout) and hasattr(signal, 'setitimer') and _on_main_thread()
+    previous_handler = None
+    try:
+        if use_alarm:
+            previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        model = _fit_prophet(indicator, history_df, history_fingerprint(history_df), use_store)
+        future_only = _predict_future(model, indicator, history_df, horizon_days)
+        return indicator, future_only, None, time.perf_counter() - started
+    except ForecastTimeout:
+        return indicator, None, f"timed out after {timeout:.0f}s", time.perf_counter() - started
+    except Exception as e:
+        return indicator, None, str(e), time.perf_counter() - started
+    finally:
+        if previous_handler is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+
+
+def _on_main_thread():
+    return threading.current_thread() is threading.main_thread()
+
+
+def forecast_indicator(indicator, horizon_days=FORECAST_HORIZON_DAYS):
+    """
+    Returns a forecast for one indicator at any horizon, reusing the stored model
+    when the indicator's history has not changed since it was fitted.
+    """
+    history_df = query_df(
+        "SELECT record_date AS ds, value AS y FROM singstat_data WHERE indicator_name = ? ORDER BY record_date",
+        params=(indicator,),
+        parse_dates=['ds']
+    )
+    if len(history_df) < FORECAST_MIN_HISTORY:
+        raise ValueError(f"{indicator} has {len(history_df)} points; need at least {FORECAST_MIN_HISTORY}.")
+    model = _fit_prophet(indicator, history_df, history_fingerprint(history_df), use_store=True)
+    return _predict_future(model, indicator, history_df, horizon_days)
+
+
+def _run_serial(histories, horizon_days, timeout, use_store):
+    for indicator, history_df in histories.items():
+        print(f"  - Forecasting for {indicator}...")
+        yield fit_indicator(indicator, history_df, horizon_days, timeout, use_store)
+
+
+def _terminate(executor):
+    """Kills the pool's worker processes, so a fit stuck past its deadline does not keep running."""
+    # ProcessPoolExecutor has no public way to stop a running task before Python 3.14
+    for process in list((getattr(executor, '_processes', None) or {}).values()):
+        if process.is_alive():
+            process.terminate()
+
+
+def _run_parallel(histories, horizon_days, timeout, max_workers, use_store):
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    timed_out = False
+    try:
+        pending = {
+            executor.submit(fit_indicator, indicator, history_df, horizon_days, timeout, use_store): indicator
+            for indicator, history_df in histories.items()
+        }
+        # Workers enforce the per-indicator timeout themselves; this is only a
+        # backstop for a worker that stops responding altogether.
+        batches = -(-len(pending) // max_workers)
+        deadline = time.monotonic() + timeout * (batches + 1) if timeout else None
+        while pending:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                timed_out = True
+                for indicator in pending.values():
+                    yield indicator, None, "worker did not respond before the deadline", 0.0
+                return
+            for future in done:
+                indicator = pending.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # e.g. a worker process that died mid-fit
+                    yield indicator, None, str(e), 0.0
+    finally:
+        if timed_out:
+            _terminate(executor)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Forecasting backends ---
+class Forecaster:
+    """
+    Interface shared by all forecasting backends.
+
+    `forecast(histories, horizon_days)` takes {indicator: DataFrame(ds, y)} and
+    yields one (indicator, forecast_df or None, error or None, seconds) tuple
+    per indicator, where forecast_df has the indicator_forecasts columns
+    (indicator_name, forecast_date, predicted_value) and covers dates after the
+    end of the history up to `horizon_days` ahead. `model_key` identifies the
+    model configuration for forecast fingerprints.
+    """
+    name = None
+
+    @property
+    def model_key(self):
+        return self.name
+
+    def forecast(self, histories, horizon_days=FORECAST_HORIZON_DAYS):
+        raise NotImplementedError
+
+
+class ProphetForecaster(Forecaster):
+    """One Prophet model per indicator, fitted across a process pool."""
+    name = "prophet"
+
+    def __init__(self, max_workers=None, timeout=None, use_store=True):
+        self.max_workers = max_workers or FORECAST_MAX_WORKERS
+        self.timeout = FORECAST_TIMEOUT_SECONDS if timeout is None else timeout
+        self.use_store = use_store
+
+    @property
+    def model_key(self):
+        return PROPHET_MODEL_KEY
+
+    def forecast(self, histories, horizon_days=FORECAST_HORIZON_DAYS):
+        workers = min(self.max_workers, len(histories))
+        if workers > 1:
+            print(f"  - Fitting {len(histories)} indicators across {workers} worker processes...")
+            return _run_parallel(histories, horizon_days, self.timeout, workers, self.use_store)
+        if self.timeout and histories and not _on_main_thread():
+            # No SIGALRM off the main thread (Streamlit, job runner threads):
+            # a one-worker pool enforces the timeout from its own main thread
+            return _run_parallel(histories, horizon_days, self.timeout, 1, self.use_store)
+        return _run_serial(histories, horizon_days, self.timeout, self.use_store)
+
+
+# (max spacing in days, season length, pandas offset for one step)
+_FREQUENCIES = [
+    (1.5, 7, pd.DateOffset(days=1)),
+    (8, 52, pd.DateOffset(weeks=1)),
+    (45, 12, pd.DateOffset(months=1)),
+    (100, 4, pd.DateOffset(months=3)),
+    (float('inf'), 1, pd.DateOffset(years=1)),
+]
+
+
+def _infer_frequency(history_df):
+    """Returns (season_length, step_offset) from the median spacing of the dates."""
+    # Whole days between consecutive dates, as Series.diff().dt.days gives, without the pandas overhead
+    days = np.diff(history_df['ds'].to_numpy()).astype('timedelta64[D]').astype(np.int64)
+    spacing = np.median(days) if len(days) else np.nan
+    for max_days, season_length, step in _FREQUENCIES:
+        if spacing <= max_days:
+            return season_length, step
+    return _FREQUENCIES[-1][1:]
+
+
+def _future_dates(last_date, step, horizon_days):
+    """Dates one step apart after `last_date` up to `horizon_days` ahead (always at least one)."""
+    end = last_date + pd.Timedelta(days=horizon_days)
+    dates = [last_date + step]
+    while last_date + step * (len(dates) + 1) <= end:
+        dates.append(last_date + step * (len(dates) + 1))
+    return dates
+
+
+def _stack(histories):
+    """Right-aligns histories into an (n_series, max_len) array padded with NaN on the left."""
+    length = max(len(df) for df in histories)
+    stacked = np.full((len(histories), length), np.nan)
+    for i, df in enumerate(histories):
+        stacked[i, length - len(df):] = df['y'].to_numpy(dtype=float)
+    return stacked
+
+
+def _seasonal_naive(y, season_length, steps):
+    """Repeats the last observed season."""
+    length = y.shape[1]
+    offsets = (np.arange(steps) % season_length) - season_length
+    return y[:, length + offsets]
+
+
+def _linear_seasonal(y, season_length, steps, ridge=1e-6):
+    """Least-squares linear trend plus one dummy per season, solved for all series at once."""
+    length = y.shape[1]
+    t = np.arange(length + steps)
+    design = [np.ones_like(t, dtype=float), t / length]
+    design += [(t % season_length == s).astype(float) for s in range(1, season_length)]
+    design = np.stack(design, axis=1)
+    past, future = design[:length], design[length:]
+
+    weights = (~np.isnan(y)).astype(float)
+    values = np.nan_to_num(y)
+    gram = np.einsum('nl,lp,lq->npq', weights, past, past) + ridge * np.eye(design.shape[1])
+    moment = np.einsum('nl,lp,nl->np', weights, past, values)
+    coefficients = np.linalg.solve(gram, moment[..., None])[..., 0]
+    return coefficients @ future.T
+
+
+_HOLT_WINTERS_GRID = [
+    (alpha, beta, gamma)
+    for alpha in (0.1, 0.3, 0.5, 0.8)
+    for beta in (0.0, 0.05, 0.2)
+    for gamma in (0.05, 0.2, 0.5)
+]
+
+
+def _holt_winters(y, season_length, steps):
+    """
+    Additive Holt-Winters, run for every (series, smoothing-parameter) pair as
+    one array and keeping the parameters with the lowest one-step-ahead error.
+    """
+    n_series, length = y.shape
+    m = season_length
+    start = np.argmax(~np.isnan(y), axis=1)
+    counts = length - start
+    rows = np.arange(n_series)
+
+    # Initial level/season from the first full season, trend from the first two
+    first_idx = np.minimum(start[:, None] + np.arange(m), length - 1)
+    first = y[rows[:, None], first_idx]
+    level0 = first.mean(axis=1)
+    second_idx = np.minimum(first_idx + m, length - 1)
+    second = y[rows[:, None], second_idx]
+    trend0 = np.where(counts >= 2 * m, (second.mean(axis=1) - level0) / m, 0.0)
+    season0 = np.zeros((n_series, m))
+    season0[rows[:, None], first_idx % m] = first - level0[:, None]
+
+    grid = np.array(_HOLT_WINTERS_GRID)
+    alpha, beta, gamma = (grid[:, i][:, None] for i in range(3))
+    level = np.broadcast_to(level0, (len(grid), n_series)).copy()
+    trend = np.broadcast_to(trend0, (len(grid), n_series)).copy()
+    season = np.broadcast_to(season0, (len(grid), n_series, m)).copy()
+    sse = np.zeros((len(grid), n_series))
+
+    for t in range(length):
+        active = t >= start + m
+        if not active.any():
+            continue
+        obs = np.nan_to_num(y[:, t])
+        slot = season[:, :, t % m]
+        error = obs - (level + trend + slot)
+        new_level = alpha * (obs - slot) + (1 - alpha) * (level + trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        new_slot = gamma * (obs - new_level) + (1 - gamma) * slot
+        sse += np.where(active, error ** 2, 0.0)
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+        season[:, :, t % m] = np.where(active, new_slot, slot)
+
+    best = np.argmin(sse, axis=0)
+    level, trend, season = level[best, rows], trend[best, rows], season[best, rows]
+    horizon = np.arange(1, steps + 1)
+    slots = (length - 1 + horizon) % m
+    return level[:, None] + trend[:, None] * horizon + season[:, slots]
+
+
+class NumpyForecaster(Forecaster):
+    """
+    Lightweight statistical models implemented with NumPy only.
+
+    Series are grouped by frequency and each group is fitted as one stacked
+    array, so the cost is a handful of vectorized passes rather than one model
+    per indicator. Forecasts are produced at the series' own frequency (e.g.
+    monthly points for monthly data) up to `horizon_days` ahead.
+    """
+    METHODS = {
+        "seasonal_naive": _seasonal_naive,
+        "holt_winters": _holt_winters,
+        "linear_seasonal": _linear_seasonal,
+    }
+
+    def __init__(self, method="holt_winters"):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown NumPy forecasting method '{method}'. Choose from {sorted(self.METHODS)}.")
+        self.method = method
+        self.name = method
+
+    @property
+    def model_key(self):
+        return f"numpy:{self.method}"
+
+    def forecast(self, histories, horizon_days=FORECAST_HORIZON_DAYS):
+        groups = {}
+        for indicator, history_df in histories.items():
+            season_length, step = _infer_frequency(history_df)
+            groups.setdefault((season_length, step), []).append(indicator)
+
+        for (season_length, step), indicators in groups.items():
+            started = time.perf_counter()
+            frames = [histories[name] for name in indicators]
+            step_dates = [_future_dates(df['ds'].max(), step, horizon_days) for df in frames]
+            steps = max(len(dates) for dates in step_dates)
+            try:
+                predictions = self.METHODS[self.method](_stack(frames), season_length, steps)
+            except Exception as e:
+                for name in indicators:
+                    yield name, None, str(e), 0.0
+                continue
+            elapsed = (time.perf_counter() - started) / len(indicators)
+            for i, name in enumerate(indicators):
+                dates = step_dates[i]
+                forecast_df = pd.DataFrame({
+                    'indicator_name': name,
+                    'forecast_date': pd.to_datetime(dates),
+                    'predicted_value': predictions[i, :len(dates)],
+                })
+                yield name, forecast_df, None, elapsed
+
+
+def get_forecaster(backend=None, **kwargs):
+    """
+    Returns a forecaster by name: 'prophet' or one of NumpyForecaster.METHODS.
+    Keyword arguments are ProphetForecaster options and are ignored otherwise.
+    """
+    backend = backend or FORECAST_BACKEND
+    if backend == ProphetForecaster.name:
+        return ProphetForecaster(**kwargs)
+    return NumpyForecaster(backend)
+
+
+def forecast_rows(forecast_df):
+    """A forecast frame as indicator_forecasts rows (indicator_name, forecast_date, predicted_value)."""
+    return [
+        (name, ts.strftime('%Y-%m-%d %H:%M:%S'), float(value))
+        for name, ts, value in forecast_df[['indicator_name', 'forecast_date', 'predicted_value']].itertuples(index=False)
+    ]
+
+
+def _store_forecasts(forecast_df, fingerprints, replaced, full_refresh):
+    """
+    Writes forecasts and their fingerprints in a single transaction.
+
+    Only the rows of indicators in `replaced` are deleted, unless `full_refresh`
+    is set, in which case both tables are cleared first.
+    """
+    rows = forecast_rows(forecast_df)
+    fitted_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with transaction() as conn:
+        if full_refresh:
+            conn.execute("DELETE FROM indicator_forecasts;")
+            conn.execute("DELETE FROM forecast_fingerprints;")
+        else:
+            replaced = [(name,) for name in replaced]
+            conn.executemany("DELETE FROM indicator_forecasts WHERE indicator_name = ?", replaced)
+            conn.executemany("DELETE FROM forecast_fingerprints WHERE indicator_name = ?", replaced)
+        conn.executemany(
+            "INSERT INTO indicator_forecasts (indicator_name, forecast_date, predicted_value) VALUES (?, ?, ?)",
+            rows
+        )
+        conn.executemany(
+            """INSERT INTO forecast_fingerprints
+                   (indicator_name, row_count, max_record_date, content_hash, model, horizon_days, fitted_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            [(name, *fingerprint, fitted_at) for name, fingerprint in fingerprints.items()]
+        )
+        bump_table_versions(conn, "indicator_forecasts", "forecast_fingerprints")
+    return len(rows)
+
+
+@telemetry.run("forecasts")
+def generate_forecasts(max_workers=None, timeout=None, horizon_days=FORECAST_HORIZON_DAYS, full_refresh=False,
+                       backend=None):
     """
     Trains a time-series model for each economic indicator and stores the forecasts.
+
+    Runs incrementally: each indicator's history is fingerprinted (row count,
+    latest record_date and a content hash) and compared to the fingerprint
+    stored with its current forecast, so only indicators whose history or model
+    settings changed are refitted and replaced. `full_refresh=True` refits
+    everything from scratch and rebuilds both tables.
+
+    `backend` selects the forecaster (defaults to FORECAST_BACKEND): 'prophet',
+    or one of the NumPy models 'holt_winters', 'linear_seasonal' and
+    'seasonal_naive', which fit every indicator at once in a few milliseconds.
+
+    With Prophet, fitted models are kept in the on-disk model store (see
+    model_store.py): an indicator whose stored model matches its history is
+    only re-predicted, and a refit on new points warm-starts from the previous
+    fit's parameters. Fits run across a process pool of `max_workers` processes
+    (defaults to FORECAST_MAX_WORKERS); with a single worker they run serially
+    in-process. Each fit is limited to `timeout` seconds.
+
+    Failures are captured per indicator instead of aborting the run, and all
+    forecasts are written in one transaction once every fit has finished.
+
+    Returns a dict with the number of stored points, the unchanged and skipped
+    indicators and a mapping of indicator -> error message for failed fits.
     """
     print("Generating ML forecasts for economic indicators...")
-    conn = sqlite3.connect(DATABASE_NAME)
-    
-    # Clear old forecasts
-    conn.execute("DELETE FROM indicator_forecasts;")
-    conn.commit()
+    forecaster = get_forecaster(backend, max_workers=max_workers, timeout=timeout, use_store=not full_refresh)
+    with stage("load"):
+        histories = load_histories()
+    stored_fingerprints = {} if full_refresh else load_fingerprints()
+    skipped = [name for name, df in histories.items() if len(df) < FORECAST_MIN_HISTORY]
+    for name in skipped:
+        print(f"    - Skipping {name}: Insufficient historical data (need at least {FORECAST_MIN_HISTORY} points).")
+        del histories[name]
 
-    # Get the list of unique indicators to forecast
-    indicators_df = pd.read_sql_query("SELECT DISTINCT indicator_name FROM singstat_data", conn)
-    indicators = indicators_df['indicator_name'].tolist()
+    fingerprints = {}
+    unchanged = []
+    for name in list(histories):
+        fingerprint = (*history_fingerprint(histories[name]), forecaster.model_key, horizon_days)
+        if stored_fingerprints.get(name) == fingerprint:
+            unchanged.append(name)
+            del histories[name]
+        else:
+            fingerprints[name] = fingerprint
+    if unchanged:
+        print(f"  - {len(unchanged)} indicators unchanged since their last fit; keeping existing forecasts.")
 
-    all_forecasts = []
+    # Indicators that disappeared from singstat_data (or fell below the minimum
+    # history) lose their stale forecasts too.
+    removed = [name for name in stored_fingerprints if name not in fingerprints and name not in unchanged]
 
-    for indicator in indicators:
-        print(f"  - Forecasting for {indicator}...")
-        # Fetch historical data for the current indicator
-        history_df = pd.read_sql_query(
-            f"SELECT record_date, value FROM singstat_data WHERE indicator_name = '{indicator}'",
-            conn,
-            parse_dates=['record_date']
+    results = forecaster.forecast(histories, horizon_days) if histories else []
+
+    all_forecasts = {}
+    errors = {}
+    with stage("fit"):
+        for done, (indicator, forecast_df, error, elapsed) in enumerate(results, start=1):
+            # Fits may run in worker processes, so each is recorded from the time it reports
+            telemetry.record(
+                "forecast.fit", elapsed, "forecast", status="ok" if error is None else "error",
+                indicator=indicator, backend=forecaster.name, points=len(histories[indicator]), error=error
+            )
+            if error is not None:
+                errors[indicator] = error
+                print(f"    - Could not generate forecast for {indicator}: {error}")
+            else:
+                all_forecasts[indicator] = forecast_df
+                print(f"    - {indicator} fitted in {elapsed:.1f}s")
+            report_progress(0.9 * done / len(histories), f"fitted {indicator}")
+
+    if not (all_forecasts or errors or removed or full_refresh):
+        return {"stored": 0, "unchanged": unchanged, "skipped": skipped, "errors": errors}
+
+    # Concatenate in indicator order so the output matches the serial path
+    final_forecast_df = pd.concat([all_forecasts[name] for name in sorted(all_forecasts)]) if all_forecasts \
+        else pd.DataFrame(columns=['indicator_name', 'forecast_date', 'predicted_value'])
+    # A failed refit drops that indicator's old forecast, as a full run would
+    replaced = sorted(set(all_forecasts) | set(errors) | set(removed))
+    with stage("store"):
+        stored = _store_forecasts(
+            final_forecast_df,
+            {name: fingerprints[name] for name in all_forecasts},
+            replaced,
+            full_refresh
         )
-        
-        # Prophet requires columns to be named 'ds' (datestamp) and 'y' (value)
-        history_df.rename(columns={'record_date': 'ds', 'value': 'y'}, inplace=True)
-        
-        if len(history_df) < 12:
-            print(f"    - Skipping {indicator}: Insufficient historical data (need at least 12 points).")
+    if stored:
+        print(f"\nSuccessfully generated and stored {stored} new forecast points.")
+
+    return {"stored": stored, "unchanged": unchanged, "skipped": skipped, "errors": errors}
+
+def backtest(backends=("prophet", "holt_winters", "linear_seasonal", "seasonal_naive"), holdout_points=3,
+             max_workers=None):
+    """
+    Compares forecasting backends on the same singstat_data.
+
+    The last `holdout_points` observations of every indicator are held out,
+    each backend forecasts them from the remaining history, and accuracy is
+    measured on the dates where a forecast and an actual value coincide.
+    Returns one row per backend with MAPE, RMSE, MAE and wall time.
+    """
+    histories = load_histories()
+
+    train, held_out = {}, []
+    for name, df in histories.items():
+        if len(df) < FORECAST_MIN_HISTORY + holdout_points:
             continue
+        train[name] = df.iloc[:-holdout_points].reset_index(drop=True)
+        held_out.append(df.iloc[-holdout_points:].assign(indicator_name=name))
+    if not train:
+        print("Not enough history to backtest.")
+        return pd.DataFrame()
+    actual = pd.concat(held_out).rename(columns={'ds': 'forecast_date', 'y': 'actual'})
+    horizon_days = max((df['ds'].max() - train[name]['ds'].max()).days for name, df in histories.items() if name in train)
 
-        try:
-            # Initialize and train the Prophet model
-            model = Prophet(yearly_seasonality=True, daily_seasonality=False)
-            model.fit(history_df)
-
-            # Create a future dataframe to predict on (next 3 months)
-            future = model.make_future_dataframe(periods=90)
-            forecast = model.predict(future)
-            
-            # Extract the forecast data and format for storage
-            forecast['indicator_name'] = indicator
-            forecast_to_store = forecast[['indicator_name', 'ds', 'yhat']].copy()
-            forecast_to_store.rename(columns={'ds': 'forecast_date', 'yhat': 'predicted_value'}, inplace=True)
-            
-            # Keep only future predictions
-            future_only = forecast_to_store[forecast_to_store['forecast_date'] > history_df['ds'].max()]
-            all_forecasts.append(future_only)
+    rows = []
+    for backend in backends:
+        forecaster = get_forecaster(backend, max_workers=max_workers, use_store=False)
+        started = time.perf_counter()
+        results = list(forecaster.forecast(train, horizon_days))
+        elapsed = time.perf_counter() - started
 
-        except Exception as e:
-            print(f"    - Could not generate forecast for {indicator}: {e}")
+        forecasts = [df for _, df, error, _ in results if error is None]
+        predicted = pd.concat(forecasts) if forecasts else pd.DataFrame(columns=['indicator_name', 'forecast_date', 'predicted_value'])
+        matched = actual.merge(predicted, on=['indicator_name', 'forecast_date'])
+        errors = matched['predicted_value'] - matched['actual']
+        nonzero = matched['actual'] != 0
+        rows.append({
+            'backend': backend,
+            'indicators': len(forecasts),
+            'failed': len(results) - len(forecasts),
+            'points': len(matched),
+            'mape': float((errors[nonzero].abs() / matched.loc[nonzero, 'actual'].abs()).mean() * 100),
+            'rmse': float(np.sqrt((errors ** 2).mean())),
+            'mae': float(errors.abs().mean()),
+            'seconds': elapsed,
+        })
 
-    if all_forecasts:
-        final_forecast_df = pd.concat(all_forecasts)
-        final_forecast_df.to_sql('indicator_forecasts', conn, if_exists='append', index=False)
-        print(f"\nSuccessfully generated and stored {len(final_forecast_df)} new forecast points.")
-    
-    conn.close()
+    report = pd.DataFrame(rows)
+    print(report.to_string(index=False))
+    return report
 
 if __name__ == '__main__':
-    generate_forecasts()
-  
+    import sys
+    if sys.argv[1:2] == ['backtest']:
+        backtest()
+    else:
+        generate_forecasts()
@@ -0,0 +1,139 @@
+# query_cache.py
+import re
+import threading
+from collections import OrderedDict
+from config import QUERY_CACHE_MAX_ENTRIES
+from db import get_table_versions, query_all
+
+# Single-quoted literals, double-quoted identifiers, or a run of anything else
+_SQL_PARTS_RE = re.compile(r"('(?:[^']|'')*')|(\"(?:[^\"]|\"\")*\")|([^'\"]+)")
+_IDENTIFIER_RE = re.compile(r"[a-z_][a-z0-9_]*")
+
+
+def normalize_sql(sql):
+    """
+    Canonical form of a query for use as a cache key: whitespace collapsed,
+    keywords and identifiers lower-cased and any trailing semicolon dropped.
+    Quoted literals are kept verbatim, so 'D05.SI' and 'd05.si' stay distinct.
+    """
+    parts = []
+    for literal, quoted_identifier, text in _SQL_PARTS_RE.findall(sql.strip().rstrip(';').strip()):
+        parts.append(literal or quoted_identifier or re.sub(r"\s+", " ", text.lower()))
+    return "".join(parts).strip()
+
+
+def _unquoted_identifiers(normalized_sql):
+    identifiers = set()
+    for _, quoted_identifier, text in _SQL_PARTS_RE.findall(normalized_sql):
+        if quoted_identifier:
+            identifiers.add(quoted_identifier[1:-1].replace('""', '"').lower())
+        elif text:
+            identifiers.update(_IDENTIFIER_RE.findall(text))
+    return identifiers
+
+
+class QueryCache:
+    """
+    An LRU cache of rendered query results, invalidated by table versions.
+
+    Each entry remembers the versions (see db.bump_table_versions) of the
+    tables its query reads (views count as the tables they read). A lookup
+    compares them with the current versions and drops the entry if any table
+    has been written since. Only read-only statements (SELECT / WITH) are
+    cached, and only when every table they read has a version: a table no
+    writer bumps could change without the entry ever going stale.
+    """
+
+    def __init__(self, max_entries=QUERY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.uncacheable = 0
+
+    @staticmethod
+    def is_cacheable(normalized_sql):
+        return normalized_sql.startswith(("select", "with"))
+
+    @staticmethod
+    def referenced_tables(normalized_sql):
+        """The tables a query reads, with the views it reads resolved to their own tables."""
+        objects = {
+            name.lower(): (kind, sql)
+            for name, kind, sql in query_all("SELECT name, type, sql FROM sqlite_master WHERE type IN ('table', 'view')")
+        }
+        tables, seen = set(), set()
+        pending = _unquoted_identifiers(normalized_sql) & set(objects)
+        while pending:
+            name = pending.pop()
+            seen.add(name)
+            kind, sql = objects[name]
+            if kind == "table":
+                tables.add(name)
+            else:
+                pending |= (_unquoted_identifiers(normalize_sql(sql)) & set(objects)) - seen
+        return sorted(tables)
+
+    def get(self, sql, versions=None):
+        """Returns the cached result for `sql`, or None on a miss or a stale entry."""
+        key = normalize_sql(sql)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        tables, snapshot, value = entry
+        versions = get_table_versions() if versions is None else versions
+        with self._lock:
+            if any(versions.get(table, 0) != snapshot.get(table, 0) for table in tables):
+                self._entries.pop(key, None)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, sql, value, versions=None):
+        """Caches `value` for `sql` against the current versions of the tables it reads."""
+        key = normalize_sql(sql)
+        if not self.is_cacheable(key):
+            return
+        tables = self.referenced_tables(key)
+        versions = get_table_versions() if versions is None else versions
+        if any(table not in versions for table in tables):
+            with self._lock:
+                self.uncacheable += 1
+            return
+        snapshot = {table: versions[table] for table in tables}
+        with self._lock:
+            self._entries[key] = (tables, snapshot, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "uncacheable": self.uncacheable,
+            }
+
+
+# Shared by every DatabaseTool in the process, so repeated queries hit across agents and runs
+query_cache = QueryCache()
@@ -0,0 +1,302 @@
+# rendering.py
+from itertools import chain
+import numpy as np
+import pandas as pd
+from config import TOOL_MAX_ROWS, TOOL_MAX_CHARS, TOOL_RESULT_FORMAT
+
+# Columns that identify a series, in order of preference
+_KEY_COLUMNS = ["ticker", "indicator_name", "source"]
+# Target number of points when a long series is resampled for the summary
+_SERIES_POINTS = 12
+# Resampling rules _resample_rule picks from, and the matching pandas periods
+_PERIODS = {"W": "W", "ME": "M", "QE": "Q", "YE": "Y"}
+
+
+def _format_table(df, fmt):
+    """Renders a frame as compact CSV or a pipe-delimited markdown table."""
+    if fmt == "markdown":
+        values = df.astype(str).to_numpy().tolist()
+        lines = ["| " + " | ".join(map(str, df.columns)) + " |", "|" + "---|" * len(df.columns)]
+        lines += ["| " + " | ".join(row) + " |" for row in values]
+        return "\n".join(lines)
+    return df.to_csv(index=False, float_format="%.6g").strip()
+
+
+def _date_column(df):
+    for column in df.columns:
+        if "date" in column.lower():
+            parsed = pd.to_datetime(df[column], errors="coerce")
+            if parsed.notna().mean() > 0.9:
+                return column, parsed
+    return None, None
+
+
+def _key_column(df):
+    for column in _KEY_COLUMNS:
+        if column in df.columns:
+            return column
+    return None
+
+
+def _resample_rule(dates):
+    """Picks a resampling period that leaves roughly _SERIES_POINTS points per series."""
+    span_days = (dates.max() - dates.min()).days
+    for rule, days in (("W", 7), ("ME", 30), ("QE", 91), ("YE", 365)):
+        if span_days / days <= _SERIES_POINTS * 1.5:
+            return rule
+    return "YE"
+
+
+def summarize_frame(df):
+    """
+    Summarizes a large result: per series (ticker / indicator / source, if
+    present) the row count, date range and, for each numeric column, min, max,
+    last value and % change over the period; plus a resampled view of the
+    first numeric column. Returns a list of (title, DataFrame) sections.
+    """
+    key = _key_column(df)
+    date_column, dates = _date_column(df)
+    numeric = [c for c in df.select_dtypes("number").columns if c != "id"]
+    work = df.assign(_date=dates) if date_column else df.copy()
+    if date_column:
+        work = work.sort_values("_date", kind="stable")
+    groups = work.groupby(key, sort=True) if key else [("all rows", work)]
+
+    rows = []
+    for name, group in groups:
+        row = {key or "series": name, "rows": len(group)}
+        if date_column:
+            row["from"] = group["_date"].min().date()
+            row["to"] = group["_date"].max().date()
+        for column in numeric:
+            values = group[column].dropna()
+            if values.empty:
+                continue
+            first, last = values.iloc[0], values.iloc[-1]
+            row[f"{column}_min"] = values.min()
+            row[f"{column}_max"] = values.max()
+            row[f"{column}_last"] = last
+            if first:
+                row[f"{column}_pct_change"] = round((last / first - 1) * 100, 2)
+        rows.append(row)
+    sections = [("Summary", pd.DataFrame(rows))]
+
+    if date_column and numeric:
+        value = numeric[0]
+        rule = _resample_rule(work["_date"])
+        indexed = work.set_index("_date")
+        if key:
+            series = indexed.groupby(key)[value].resample(rule).last().unstack(0)
+        else:
+            series = indexed[value].resample(rule).last().to_frame(value)
+        series = series.dropna(how="all").tail(_SERIES_POINTS * 2)
+        series.index = series.index.date
+        sections.append((f"{value} resampled ({rule}, last value per period)", series.reset_index(names=date_column)))
+    return sections
+
+
+class StreamingSummary:
+    """
+    summarize_frame for a result that arrives in chunks. Per series it keeps
+    running aggregates (row count, date range, and min/max/first/last of each
+    numeric column) and, for every resampling rule, the last value in each of
+    the latest periods, so memory grows with the number of series rather
+    than rows. Feed chunks in result order with add(), then call sections().
+    """
+
+    def __init__(self, first_chunk):
+        self.key = _key_column(first_chunk)
+        self.date_column, _ = _date_column(first_chunk)
+        self.numeric = [c for c in first_chunk.select_dtypes("number").columns if c != "id"]
+        self.rows = 0
+        self.counts = None
+        self.values = {}
+        self.buckets = {}
+        self.min_date = self.max_date = None
+
+    def _prepare(self, chunk):
+        """The chunk as _key/_rank/_order/_date + numeric columns, in the order summarize_frame sorts rows."""
+        work = pd.DataFrame({
+            "_key": chunk[self.key].to_numpy() if self.key else "all rows",
+            "_order": np.arange(self.rows, self.rows + len(chunk)),
+        })
+        if self.date_column:
+            dates = pd.to_datetime(chunk[self.date_column], errors="coerce").reset_index(drop=True)
+            work["_date"] = dates
+            # Nanoseconds since the epoch, with missing dates sorting last as sort_values puts them
+            ranks = dates.to_numpy("datetime64[ns]").view("i8").copy()
+            ranks[dates.isna().to_numpy()] = np.iinfo(np.int64).max
+            work["_rank"] = ranks
+        else:
+            work["_rank"] = 0
+        for column in self.numeric:
+            work[column] = pd.to_numeric(chunk[column], errors="coerce").to_numpy()
+        return work.sort_values(["_rank", "_order"], kind="stable")
+
+    @staticmethod
+    def _pick(frame, prefix, keep):
+        ordered = frame.sort_values([f"{prefix}_rank", f"{prefix}_order"], kind="stable")
+        ordered = ordered[~ordered.index.duplicated(keep=keep)]
+        return ordered[[prefix, f"{prefix}_rank", f"{prefix}_order"]]
+
+    def add(self, chunk):
+        if chunk.empty:
+            return
+        work = self._prepare(chunk)
+        self.rows += len(chunk)
+
+        groups = work.groupby("_key", sort=False)
+        counts = pd.DataFrame({"rows": groups.size()})
+        if self.date_column:
+            counts["from"] = groups["_date"].min()
+            counts["to"] = groups["_date"].max()
+            chunk_min, chunk_max = work["_date"].min(), work["_date"].max()
+            if pd.notna(chunk_min):
+                self.min_date = chunk_min if self.min_date is None else min(self.min_date, chunk_min)
+                self.max_date = chunk_max if self.max_date is None else max(self.max_date, chunk_max)
+        if self.counts is not None:
+            counts = pd.concat([self.counts, counts]).groupby(level=0).agg({
+                "rows": "sum", **({"from": "min", "to": "max"} if self.date_column else {})
+            })
+        self.counts = counts
+
+        for column in self.numeric:
+            valid = work[work[column].notna()]
+            if valid.empty:
+                continue
+            groups = valid.groupby("_key", sort=False)
+            part = pd.DataFrame({"min": groups[column].min(), "max": groups[column].max()})
+            for prefix, how in (("first", "first"), ("last", "last")):
+                picked = getattr(groups[[column, "_rank", "_order"]], how)()
+                part[prefix], part[f"{prefix}_rank"], part[f"{prefix}_order"] = (
+                    picked[column], picked["_rank"], picked["_order"]
+                )
+            previous = self.values.get(column)
+            if previous is not None:
+                both = pd.concat([previous, part])
+                part = both.groupby(level=0).agg({"min": "min", "max": "max"}).join(
+                    [self._pick(both, "first", "first"), self._pick(both, "last", "last")]
+                )
+            self.values[column] = part
+
+        if self.date_column and self.numeric:
+            value = self.numeric[0]
+            valid = work[work["_date"].notna() & work[value].notna()]
+            for rule, period in _PERIODS.items():
+                ends = valid["_date"].dt.to_period(period).dt.end_time.dt.normalize()
+                latest = pd.concat([
+                    self.buckets.get(rule),
+                    pd.DataFrame({"_key": valid["_key"], "_end": ends, "_rank": valid["_rank"],
+                                  "_order": valid["_order"], "value": valid[value]}),
+                ]).sort_values(["_rank", "_order"], kind="stable").drop_duplicates(["_key", "_end"], keep="last")
+                # Only the latest periods with any value reach the summary
+                kept = np.sort(latest["_end"].unique())[-_SERIES_POINTS * 2:]
+                self.buckets[rule] = latest[latest["_end"].isin(kept)]
+
+    def sections(self):
+        """The same (title, DataFrame) sections summarize_frame returns for the concatenated chunks."""
+        rows = []
+        for name in sorted(self.counts.index):
+            row = {self.key or "series": name, "rows": self.counts.at[name, "rows"]}
+            if self.date_column:
+                row["from"] = self.counts.at[name, "from"].date()
+                row["to"] = self.counts.at[name, "to"].date()
+            for column in self.numeric:
+                values = self.values.get(column)
+                if values is None or name not in values.index:
+                    continue
+                first, last = values.at[name, "first"], values.at[name, "last"]
+                row[f"{column}_min"] = values.at[name, "min"]
+                row[f"{column}_max"] = values.at[name, "max"]
+                row[f"{column}_last"] = last
+                if first:
+                    row[f"{column}_pct_change"] = round((last / first - 1) * 100, 2)
+            rows.append(row)
+        sections = [("Summary", pd.DataFrame(rows))]
+
+        if self.date_column and self.numeric and self.min_date is not None:
+            value = self.numeric[0]
+            rule = _resample_rule(pd.Series([self.min_date, self.max_date]))
+            latest = self.buckets[rule]
+            if self.key:
+                series = latest.pivot(index="_end", columns="_key", values="value").sort_index()
+                series = series[sorted(series.columns)]
+                series.columns.name = self.key
+            else:
+                series = latest.set_index("_end")["value"].sort_index().to_frame(value)
+            series.index = series.index.date
+            sections.append((f"{value} resampled ({rule}, last value per period)", series.reset_index(names=self.date_column)))
+        return sections
+
+
+def _summary_text(rows, columns, max_rows, sections, tail, fmt):
+    parts = [f"Result has {rows} rows x {columns} columns, over the {max_rows}-row budget; showing a summary."]
+    for title, section in sections:
+        parts.append(f"{title}:\n{_format_table(section, fmt)}")
+    parts.append(f"Last 5 rows:\n{_format_table(tail, fmt)}")
+    return "\n\n".join(parts)
+
+
+def _fit_budget(text, truncated, max_chars, narrowing_hint):
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit("\n", 1)[0] + "\n..."
+        truncated = True
+    if truncated:
+        hint = narrowing_hint or (
+            "filter with WHERE (e.g. a ticker, indicator_name or record_date range), aggregate with GROUP BY, "
+            "or add LIMIT"
+        )
+        text += f"\n\n[Truncated: not every row is shown. To see exact rows, narrow the query: {hint}.]"
+    return text
+
+
+def render_chunks(chunks, max_rows=None, max_chars=None, fmt=None, narrowing_hint=None):
+    """
+    render_frame for a result read in chunks (see db.query_chunks). A result
+    within the row budget is rendered in full; a larger one is summarized
+    chunk by chunk with StreamingSummary, so at most one chunk is in memory.
+    """
+    max_rows = max_rows or TOOL_MAX_ROWS
+    max_chars = max_chars or TOOL_MAX_CHARS
+    fmt = fmt or TOOL_RESULT_FORMAT
+    chunks = iter(chunks)
+    head, rows = [], 0
+    for chunk in chunks:
+        head.append(chunk)
+        rows += len(chunk)
+        if rows > max_rows:
+            break
+    else:
+        df = pd.concat(head, ignore_index=True) if head else pd.DataFrame()
+        return render_frame(df, max_rows, max_chars, fmt, narrowing_hint)
+
+    summary = StreamingSummary(head[0])
+    columns = len(head[0].columns)
+    tail = None
+    for chunk in chain(head, chunks):
+        summary.add(chunk)
+        tail = chunk.tail(5) if tail is None else pd.concat([tail, chunk.tail(5)], ignore_index=True).tail(5)
+    head = None
+    text = _summary_text(summary.rows, columns, max_rows, summary.sections(), tail, fmt)
+    return _fit_budget(text, True, max_chars, narrowing_hint)
+
+
+def render_frame(df, max_rows=None, max_chars=None, fmt=None, narrowing_hint=None):
+    """
+    Renders a query result for an LLM prompt within a row and character budget.
+
+    Results of up to `max_rows` rows are rendered in full as compact CSV (or
+    markdown). Larger results are replaced by a statistical summary, and
+    anything still over `max_chars` is cut. Whenever the agent does not see
+    every row, a notice says so and suggests how to narrow the query.
+    """
+    max_rows = max_rows or TOOL_MAX_ROWS
+    max_chars = max_chars or TOOL_MAX_CHARS
+    fmt = fmt or TOOL_RESULT_FORMAT
+    if df.empty:
+        return "Query returned no rows."
+
+    if len(df) <= max_rows:
+        return _fit_budget(_format_table(df, fmt), False, max_chars, narrowing_hint)
+    text = _summary_text(len(df), len(df.columns), max_rows, summarize_frame(df), df.tail(5), fmt)
+    return _fit_budget(text, True, max_chars, narrowing_hint)
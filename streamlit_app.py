@@ -1,29 +1,133 @@
 # streamlit_app.py
-import streamlit as st
+import json
 import sqlite3
-import pandas as pd
-from datetime import datetime
-from data_ingestion import run_ingestion
-from agent_core import run_analysis
-from predictive_models import generate_forecasts # Import the new function
-from config import DATABASE_NAME
+import streamlit as st
+import dashboard_data
+import telemetry
+from jobs import get_runner, list_jobs
+from memory import load_briefing
+from config import EDA_MAX_POINTS, JOB_STATUS_REFRESH_SECONDS
 
 # --- Page Configuration ---
 st.set_page_config(page_title="AI Investment Analyst", page_icon="🧠", layout="wide")
 
 st.write("Hello Streamlit!")
 
-# --- Helper Functions to Fetch Data ---
-def get_db_connection():
-    return sqlite3.connect(DATABASE_NAME)
+# --- Background Jobs ---
+# Ingestion, forecasting and analysis run on a job runner shared by every
+# session. Its worker threads import data_ingestion (yfinance),
+# predictive_models (prophet) and agent_core (crewai, Vertex AI) on first
+# use, so none of them slows down page loads.
+@st.cache_resource
+def get_job_runner():
+    return get_runner()
+
+
+def submit_job(kind, label):
+    job_id, created = get_job_runner().submit(kind)
+    if created:
+        st.success(f"{label} started as job #{job_id}.")
+    else:
+        st.info(f"{label} is already running as job #{job_id}.")
+
+
+# Polled as a fragment: only the job list reruns, so progress updates without reloading the page
+@st.fragment(run_every=JOB_STATUS_REFRESH_SECONDS)
+def show_jobs(limit=5):
+    jobs = list_jobs(limit)
+    if jobs.empty:
+        st.caption("No jobs yet.")
+        return
+    for job in jobs.itertuples():
+        st.markdown(f"**#{job.id} {job.kind}** — {job.status}")
+        st.progress(min(max(float(job.progress), 0.0), 1.0), text=job.message or "")
+        stages = json.loads(job.stages or "{}")
+        if stages:
+            st.caption(" · ".join(f"{name} {secs:.1f}s" for name, secs in stages.items()))
+        if job.error:
+            st.caption(f"Error: {job.error}")
+        if job.status in ("queued", "running") and st.button("Cancel", key=f"cancel_{job.id}"):
+            get_job_runner().cancel(job.id)
+            st.rerun(scope="fragment")
+
+
+# --- Cached EDA Loaders ---
+# The first argument of each is a change token (the write versions of the
+# tables it reads). It is part of the cache key, so cached results are
+# reused across reruns and sessions until ingestion or forecasting writes.
+@st.cache_data(show_spinner=False, max_entries=4)
+def cached_indicators(token):
+    return dashboard_data.list_indicators()
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def cached_tickers(token):
+    return dashboard_data.list_tickers()
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_indicator_history(token, indicator, max_points):
+    return dashboard_data.load_indicator_history(indicator, max_points=max_points)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_stock_history(token, ticker, max_points):
+    return dashboard_data.load_stock_history(ticker, max_points=max_points)
+
+
+# --- Cached Performance Loaders ---
+# Keyed on the run_metrics version, which changes whenever a run is stored
+@st.cache_data(show_spinner=False, max_entries=16)
+def cached_runs(token, kind):
+    return telemetry.list_runs(kind, limit=50)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_breakdown(token, kind, category):
+    return telemetry.breakdown(kind, category)
+
 
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_run(token, run_id):
+    return telemetry.load_run(run_id)
+
+
+def show_run_details(spans):
+    """Per-span-name totals of one run, plus its LLM usage and slowest tool calls."""
+    timed = spans[spans['seconds'].notna() & (spans['category'] != 'run')]
+    summary = timed.groupby(['category', 'name'])['seconds'].agg(['count', 'sum', 'mean', 'max'])
+    st.dataframe(summary.sort_values('sum', ascending=False).round(3))
+
+    llm = timed[timed['category'] == 'llm']
+    if not llm.empty:
+        st.markdown("**LLM calls**")
+        cols = st.columns(4)
+        cols[0].metric("Calls", len(llm))
+        cols[1].metric("Latency (total)", f"{llm['seconds'].sum():.1f}s")
+        for col, field in zip(cols[2:], ("prompt_tokens", "completion_tokens")):
+            tokens = llm[field].sum() if field in llm else 0
+            col.metric(field.replace("_", " ").capitalize(), f"{int(tokens or 0):,}")
+        if 'cache' in llm:
+            st.caption(" · ".join(f"{outcome}: {n}" for outcome, n in llm['cache'].fillna('none').value_counts().items()))
+
+    tool_calls = timed[timed['category'] == 'tool']
+    if not tool_calls.empty:
+        st.markdown("**Slowest tool calls**")
+        columns = [c for c in ('name', 'parent', 'seconds', 'rows', 'output_bytes', 'cache_hit', 'query', 'topic')
+                   if c in tool_calls]
+        st.dataframe(tool_calls.sort_values('seconds', ascending=False)[columns].head(20))
+
+    counters = spans[spans['value'].notna()]
+    if not counters.empty:
+        st.markdown("**Counters**")
+        st.dataframe(counters[['category', 'name', 'value']])
+
+
+# --- Helper Functions to Fetch Data ---
 def get_latest_briefing():
     try:
-        conn = get_db_connection()
-        df = pd.read_sql_query("SELECT briefing_date, content FROM briefings ORDER BY briefing_date DESC LIMIT 1", conn)
-        conn.close()
-        return (df.iloc[0]['briefing_date'], df.iloc[0]['content']) if not df.empty else (None, None)
-    except pd.errors.DatabaseError:
+        return load_briefing()
+    except sqlite3.OperationalError:
         return None, "Briefing table not found. Please run the analysis."
     except Exception as e:
         return None, f"An error occurred: {e}"
@@ -32,7 +136,7 @@ def get_latest_briefing():
 st.title("Predictive AI Investment Analyst 🔮")
 st.markdown("An AI agent-driven system, enhanced with ML forecasting, to generate forward-looking investment briefings.")
 
-main_tab, eda_tab = st.tabs(["📊 Main Dashboard", "🔍 Exploratory Data Analysis"])
+main_tab, eda_tab, perf_tab = st.tabs(["📊 Main Dashboard", "🔍 Exploratory Data Analysis", "⏱️ Performance"])
 
 # --- Main Dashboard Tab ---
 with main_tab:
@@ -43,24 +147,21 @@ with main_tab:
         st.header("Controls")
         st.markdown("Follow these steps in order:")
         
+        # Each step runs as a background job; wait for one to finish before starting the next
         # Step 1: Ingestion
         if st.button("1. Ingest Latest Data"):
-            with st.spinner("Fetching latest historical data..."):
-                run_ingestion()
-                st.success("Data ingestion complete!")
+            submit_job("ingestion", "Data ingestion")
         
         # Step 2: Prediction
         if st.button("2. Generate Forecasts"):
-            with st.spinner("🤖 Training models and predicting future values..."):
-                generate_forecasts()
-                st.success("Forecasts are ready!")
+            submit_job("forecasts", "🤖 Forecasting")
         
         # Step 3: Analysis
         if st.button("3. Run AI Analysis"):
-            with st.spinner("🧠 Agents are analyzing historical data and forecasts..."):
-                run_analysis()
-                st.success("Daily briefing complete!")
-                st.experimental_rerun()
+            submit_job("analysis", "🧠 AI analysis")
+
+        st.subheader("Jobs")
+        show_jobs()
 
     with col2:
         st.header("Latest Investment Briefing")
@@ -77,44 +178,64 @@ with eda_tab:
     st.header("🔍 Exploratory Data Analysis & Forecasts")
     st.write("Visualize the raw data that the AI agents use for their analysis.")
 
+    downsample = st.checkbox(f"Downsample long series (about {EDA_MAX_POINTS} points)", value=True)
+    max_points = EDA_MAX_POINTS if downsample else None
+
     try:
-        conn = get_db_connection()
         st.subheader("Economic Indicators & Forecasts")
-        indicators = pd.read_sql_query("SELECT DISTINCT indicator_name FROM singstat_data", conn)['indicator_name'].tolist()
+        indicator_token = dashboard_data.change_token(dashboard_data.INDICATOR_TABLES)
+        indicators = cached_indicators(indicator_token)
         
         if indicators:
             selected_indicator = st.selectbox("Select an Indicator to Visualize", options=indicators)
             if selected_indicator:
-                # Fetch historical data
-                df_hist = pd.read_sql_query(f"SELECT record_date, value FROM singstat_data WHERE indicator_name = '{selected_indicator}'", conn, parse_dates=['record_date'])
-                df_hist.rename(columns={'value': 'Historical'}, inplace=True)
-                
-                # Fetch forecast data
-                df_fcst = pd.read_sql_query(f"SELECT forecast_date, predicted_value FROM indicator_forecasts WHERE indicator_name = '{selected_indicator}'", conn, parse_dates=['forecast_date'])
-                df_fcst.rename(columns={'predicted_value': 'Forecast', 'forecast_date': 'record_date'}, inplace=True)
-                
-                # Combine for plotting
-                df_plot = pd.merge(df_hist, df_fcst, on='record_date', how='outer').set_index('record_date')
+                # Historical values and forecasts, outer-joined on date
+                df_plot = cached_indicator_history(indicator_token, selected_indicator, max_points)
                 
                 st.line_chart(df_plot)
                 st.dataframe(df_plot.sort_index(ascending=False).head(10))
                 
         # --- Stock Data Visualization ---
         st.subheader("SGX Stock Prices (Close)")
-        tickers = pd.read_sql_query("SELECT DISTINCT ticker FROM sgx_stocks_daily", conn)['ticker'].tolist()
+        stock_token = dashboard_data.change_token(dashboard_data.STOCK_TABLES)
+        tickers = cached_tickers(stock_token)
         if tickers:
             selected_ticker = st.selectbox("Select a Stock Ticker to Visualize", options=tickers)
             if selected_ticker:
-                df_stock = pd.read_sql_query(f"SELECT record_date, close_price FROM sgx_stocks_daily WHERE ticker = '{selected_ticker}'", conn, parse_dates=['record_date'])
-                df_stock = df_stock.set_index('record_date')
+                df_stock = cached_stock_history(stock_token, selected_ticker, max_points)
                 st.line_chart(df_stock)
                 st.dataframe(df_stock.sort_index(ascending=False).head())
         else:
             st.warning("No stock data found. Please run data ingestion.")
-
-        conn.close()
         
     except Exception as e:
         st.error(f"Failed to load data for EDA. Please ensure data has been ingested. Error: {e}")
 
+# --- Performance Tab ---
+with perf_tab:
+    st.header("⏱️ Performance")
+    st.write("Where the time of each run went: stages, data sources, model fits, tool calls and LLM calls.")
+
+    try:
+        metrics_token = dashboard_data.change_token(("run_metrics",))
+        kind = st.selectbox("Run type", options=["analysis", "ingestion", "forecasts"])
+        runs = cached_runs(metrics_token, kind)
+        if runs.empty:
+            st.info(f"No {kind} runs recorded yet.")
+        else:
+            st.subheader("Stages across runs (seconds)")
+            st.bar_chart(cached_breakdown(metrics_token, kind, "stage"))
+            st.subheader("Busy time by category (seconds)")
+            st.caption("Concurrent spans each count in full, so totals can exceed the run's wall time.")
+            st.bar_chart(cached_breakdown(metrics_token, kind, None))
+
+            st.subheader("Run details")
+            labels = {
+                row.run_id: f"{row.run_started_at} · {row.seconds:.1f}s · {row.status}" for row in runs.itertuples()
+            }
+            run_id = st.selectbox("Run", options=list(labels), format_func=labels.get)
+            show_run_details(cached_run(metrics_token, run_id))
+    except Exception as e:
+        st.error(f"Failed to load run metrics. Error: {e}")
+
 st.write("Hello Streamlit5!")
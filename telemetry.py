@@ -0,0 +1,211 @@
+# telemetry.py
+import contextvars
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import pandas as pd
+from db import bump_table_versions, query_df, transaction
+from config import TELEMETRY_ENABLED, TELEMETRY_MAX_ATTRIBUTE_CHARS, TELEMETRY_RETENTION_DAYS
+
+_current_run = contextvars.ContextVar("current_run", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _clean(attributes):
+    """JSON-encodes span attributes, truncating long strings such as SQL text."""
+    cleaned = {}
+    for key, value in attributes.items():
+        if isinstance(value, str) and len(value) > TELEMETRY_MAX_ATTRIBUTE_CHARS:
+            value = value[:TELEMETRY_MAX_ATTRIBUTE_CHARS] + "..."
+        cleaned[key] = value
+    return json.dumps(cleaned, default=str)
+
+
+class Run:
+    """
+    The spans and counters of one pipeline run. They are buffered in memory
+    (recording costs a lock and a list append) and written to run_metrics in
+    one transaction when the run ends.
+    """
+
+    def __init__(self, kind):
+        self.run_id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.started_at = _now()
+        self._origin = time.perf_counter()
+        self._spans = []
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def offset(self):
+        return time.perf_counter() - self._origin
+
+    def add_span(self, name, category, start, seconds, status="ok", parent=None, attributes=None):
+        with self._lock:
+            self._spans.append((category, name, parent, start, seconds, status, attributes or {}))
+
+    def add_count(self, name, category, value):
+        with self._lock:
+            total, events = self._counters.get((category, name), (0, 0))
+            self._counters[(category, name)] = (total + value, events + 1)
+
+    def rows(self):
+        base = (self.run_id, self.kind, self.started_at)
+        with self._lock:
+            spans = [
+                (*base, category, name, parent, round(start, 6), round(seconds, 6), None, status, _clean(attributes))
+                for category, name, parent, start, seconds, status, attributes in self._spans
+            ]
+            counters = [
+                (*base, category, name, None, None, None, total, "ok", json.dumps({"events": events}))
+                for (category, name), (total, events) in self._counters.items()
+            ]
+        return spans + counters
+
+    def flush(self):
+        """Writes the run's records and drops runs older than TELEMETRY_RETENTION_DAYS."""
+        cutoff = (datetime.now() - timedelta(days=TELEMETRY_RETENTION_DAYS)).strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            with transaction() as conn:
+                conn.executemany(
+                    """INSERT INTO run_metrics (run_id, run_kind, run_started_at, category, name, parent,
+                           start_offset, seconds, value, status, attributes)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    self.rows()
+                )
+                conn.execute("DELETE FROM run_metrics WHERE run_started_at < ?", (cutoff,))
+                bump_table_versions(conn, "run_metrics")
+        except Exception as e:
+            # Telemetry must never fail the run it measures
+            print(f"Could not store run metrics for {self.kind} run {self.run_id}: {e}")
+
+
+@contextmanager
+def run(kind, **attributes):
+    """
+    Collects the spans recorded by the current thread (and the threads it
+    hands its context to) as one run of `kind`, timed as a whole, and stores
+    them when it ends. Inside another run it joins that run instead, so a
+    pipeline started by a job or a benchmark is recorded once.
+    """
+    current = _current_run.get()
+    if current is not None or not TELEMETRY_ENABLED:
+        yield current
+        return
+    current = Run(kind)
+    token = _current_run.set(current)
+    status = "ok"
+    try:
+        yield current
+    except BaseException as e:
+        status = "error"
+        attributes["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_run.reset(token)
+        current.add_span(kind, "run", 0.0, current.offset(), status, attributes=attributes)
+        current.flush()
+
+
+@contextmanager
+def span(name, category="stage", **attributes):
+    """
+    Times the enclosed block as a span of the current run and yields its
+    attribute dict, so the block can add results (rows, bytes, ...) to it.
+    An exception marks the span as an error. A no-op outside a run.
+    """
+    current = _current_run.get()
+    if current is None:
+        yield attributes
+        return
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    start = current.offset()
+    status = "ok"
+    try:
+        yield attributes
+    except BaseException as e:
+        status = "error"
+        attributes["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.add_span(name, category, start, current.offset() - start, status, parent, attributes)
+
+
+def record(name, seconds, category, status="ok", **attributes):
+    """Records a span timed elsewhere (e.g. in a worker process) as ending now; a no-op outside a run."""
+    current = _current_run.get()
+    if current is not None:
+        end = current.offset()
+        current.add_span(name, category, max(end - seconds, 0.0), seconds, status, _current_span.get(), attributes)
+
+
+def count(name, value=1, category="counter"):
+    """Adds `value` to a counter of the current run; counters are summed in memory and stored once per run."""
+    current = _current_run.get()
+    if current is not None:
+        current.add_count(name, category, value)
+
+
+def current_run_id():
+    current = _current_run.get()
+    return current.run_id if current else None
+
+
+# --- Reading ---
+def list_runs(kind=None, limit=20):
+    """The most recent runs, newest first, with their total seconds and status."""
+    return query_df(
+        """SELECT run_id, run_kind, run_started_at, seconds, status, attributes FROM run_metrics
+           WHERE category = 'run' AND (? IS NULL OR run_kind = ?)
+           ORDER BY run_started_at DESC, id DESC LIMIT ?""",
+        params=(kind, kind, limit)
+    )
+
+
+def breakdown(kind=None, category=None, limit=20):
+    """
+    Seconds spent in each of the last `limit` runs, as a frame with one row
+    per run (oldest first): one column per span name of `category`, or per
+    category when it is None. Spans running concurrently are each counted
+    in full, so a row can add up to more than the run's wall time.
+    """
+    column = "m.category" if category is None else "m.name"
+    df = query_df(
+        f"""WITH recent AS (
+               SELECT run_id, run_started_at FROM run_metrics
+               WHERE category = 'run' AND (? IS NULL OR run_kind = ?)
+               ORDER BY run_started_at DESC, id DESC LIMIT ?
+           )
+           SELECT recent.run_started_at || ' ' || substr(m.run_id, 1, 6) AS run, {column} AS name,
+                  SUM(m.seconds) AS seconds
+           FROM run_metrics m JOIN recent ON recent.run_id = m.run_id
+           WHERE m.category != 'run' AND m.seconds IS NOT NULL AND (? IS NULL OR m.category = ?)
+           GROUP BY m.run_id, {column}
+           ORDER BY recent.run_started_at""",
+        params=(kind, kind, limit, category, category)
+    )
+    if df.empty:
+        return df
+    return df.pivot_table(index='run', columns='name', values='seconds', aggfunc='sum', sort=False).fillna(0.0)
+
+
+def load_run(run_id):
+    """Every span and counter of one run, attributes decoded into columns."""
+    df = query_df(
+        """SELECT category, name, parent, start_offset, seconds, value, status, attributes FROM run_metrics
+           WHERE run_id = ? ORDER BY start_offset IS NULL, start_offset""",
+        params=(run_id,)
+    )
+    if df.empty:
+        return df
+    attributes = pd.json_normalize(df.pop('attributes').map(json.loads).tolist())
+    return pd.concat([df, attributes.set_index(df.index)], axis=1)
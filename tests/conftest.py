@@ -0,0 +1,57 @@
+# tests/conftest.py
+"""
+Every test runs offline against stores in a scratch directory. Config is
+read once at import, so the environment is set before any project module
+is imported; the `database` fixture then gives each test its own SQLite file.
+"""
+import os
+import socket
+import tempfile
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix="ai_analyst_tests_")
+os.environ.update({
+    "BACKTEST_CACHE_DIR": os.path.join(_workdir, "backtest_cache"),
+    # crewAI's telemetry export would otherwise wait on the network at every task
+    "CREWAI_DISABLE_TELEMETRY": "true",
+    "OTEL_SDK_DISABLED": "true",
+    "FORECAST_MAX_WORKERS": "1",
+    "INGESTION_BACKOFF_SECONDS": "0.01",
+    "LLM_CACHE_DIR": os.path.join(_workdir, "llm_cache"),
+    "LLM_CACHE_MODE": "fake",
+    "MODEL_STORE_DIR": os.path.join(_workdir, "model_store"),
+    "SINGSTAT_REQUESTS_PER_SECOND": "0",
+    "VECTOR_INDEX_DIR": os.path.join(_workdir, "vector_index"),
+    "YFINANCE_REQUESTS_PER_SECOND": "0",
+})
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh database with every table created, used by every connection the test opens."""
+    import db
+    from query_cache import query_cache
+
+    path = str(tmp_path / "test.db")
+    monkeypatch.setattr(db, "DATABASE_NAME", path)
+    if db._pool is not None:
+        db._pool.close()
+    monkeypatch.setattr(db, "_pool", None)
+    query_cache.clear()
+    db.get_pool()
+    yield path
+    db._pool.close()
+
+
+@pytest.fixture
+def no_network(monkeypatch):
+    """Fails any connection to a host other than this machine."""
+    connect = socket.socket.connect
+
+    def guarded(sock, address):
+        host = address[0] if isinstance(address, tuple) else address
+        if sock.family in (socket.AF_INET, socket.AF_INET6) and host not in ("127.0.0.1", "::1", "localhost"):
+            raise OSError(f"Network access in a test: {address}")
+        return connect(sock, address)
+
+    monkeypatch.setattr(socket.socket, "connect", guarded)
@@ -0,0 +1,42 @@
+# tests/test_agent_core.py
+import pytest
+import agent_core
+from dag import run_dag
+
+
+@pytest.fixture
+def recorded_steps(monkeypatch):
+    """Replaces every pipeline step with one that records the inputs it was given."""
+    inputs_of = {}
+
+    def fake(name):
+        def step(inputs):
+            inputs_of[name] = dict(inputs)
+            return f"<{name}>"
+        return step
+
+    monkeypatch.setattr(agent_core, "_agents", None)
+    monkeypatch.setattr(agent_core, "_query_step", lambda sql: fake("query"))
+    monkeypatch.setattr(agent_core, "_news_step", lambda ticker: fake(f"news_{ticker}"))
+    monkeypatch.setattr(agent_core, "_memory_step", lambda before: fake("memory"))
+    monkeypatch.setattr(agent_core, "_task_step", lambda task: fake(task.agent.role))
+    return inputs_of
+
+
+def test_risk_review_sees_the_stock_pick(recorded_steps):
+    pipeline = agent_core.build_pipeline("2024-06-03", watchlist=["AAA.SI"], indicators=["CPI_All_Items"])
+    nodes = {node.name: node for node in pipeline}
+
+    run = run_dag(pipeline, max_workers=4)
+
+    assert "stock_picking" in nodes["risk_assessment"].deps
+    risk_role = agent_core.get_agents()["risk_sentinel"].role
+    pick_role = agent_core.get_agents()["alpha_hunter"].role
+    assert recorded_steps[risk_role]["stock_picking"] == f"<{pick_role}>"
+    assert run.timings["risk_assessment"][0] >= run.timings["stock_picking"][1]
+
+
+def test_risk_task_is_given_the_stock_pick_as_context():
+    tasks = agent_core.build_tasks("2024-06-03", agent_core.get_agents())
+
+    assert tasks["risk_assessment"].context == [tasks["stock_picking"]]
@@ -0,0 +1,99 @@
+# tests/test_analytics.py
+import numpy as np
+import pandas as pd
+import pytest
+import analytics
+from analytics import compute_analytics
+from benchmarks.synthetic import generate
+from db import bump_table_versions, get_table_versions, query_all, transaction
+
+TABLES = ("stock_features_daily", "stock_returns_periodic", "stock_latest_metrics", "stock_indicator_correlations")
+
+
+@pytest.fixture
+def computed(database, monkeypatch):
+    """Synthetic history with its analytics computed, recording the tickers each run computes features for."""
+    generate(indicators=3, tickers=4, years=2, news=0, seed=5, end="2024-07-01")
+    compute_analytics()
+    featured = []
+    features = analytics.compute_daily_features
+    monkeypatch.setattr(analytics, "compute_daily_features",
+                        lambda prices: featured.append(sorted(prices.columns)) or features(prices))
+    return featured
+
+
+def _contents():
+    # Rounded: correlations computed over fewer columns differ in the last bits
+    return {
+        table: sorted(tuple(round(v, 9) if isinstance(v, float) else v for v in row)
+                      for row in query_all(f"SELECT * FROM {table}"))
+        for table in TABLES
+    }
+
+
+def _write(sql, table):
+    with transaction() as conn:
+        conn.execute(sql)
+        bump_table_versions(conn, table)
+
+
+def test_unchanged_sources_skip_the_rebuild(computed):
+    versions = get_table_versions()
+
+    assert compute_analytics()["unchanged"]
+    assert computed == []
+    assert {table: get_table_versions()[table] for table in TABLES} == {table: versions[table] for table in TABLES}
+
+
+def test_only_changed_tickers_are_recomputed(computed):
+    ticker = query_all("SELECT DISTINCT ticker FROM sgx_stocks_daily ORDER BY ticker")[0][0]
+    _write(f"UPDATE sgx_stocks_daily SET close_price = close_price * 1.1 WHERE ticker = '{ticker}' "
+           f"AND record_date >= '2024-06-01'", "sgx_stocks_daily")
+
+    counts = compute_analytics()
+
+    assert computed == [[ticker]]
+    assert counts["tickers"] == 1
+    incremental = _contents()
+    compute_analytics(full_refresh=True)
+    assert _contents() == incremental
+
+
+def test_indicator_changes_only_recompute_their_correlations(computed):
+    features = _contents()["stock_features_daily"]
+    _write("UPDATE singstat_data SET value = value * 1.05 WHERE indicator_name = 'CPI_All_Items' "
+           "AND record_date >= '2024-01-01'", "singstat_data")
+
+    counts = compute_analytics()
+
+    assert computed == []
+    assert counts["correlations"] == len(query_all(
+        "SELECT 1 FROM stock_indicator_correlations WHERE indicator_name = 'CPI_All_Items'"
+    )) > 0
+    incremental = _contents()
+    assert incremental["stock_features_daily"] == features
+    compute_analytics(full_refresh=True)
+    assert _contents() == incremental
+
+
+def test_quarterly_indicators_correlate_with_quarterly_returns():
+    days = pd.bdate_range("2019-01-01", "2023-12-29")
+    rng = np.random.default_rng(0)
+    prices = pd.DataFrame({"A.SI": 10 * np.exp(np.cumsum(rng.normal(0, 0.01, len(days))))}, index=days)
+    quarterly = prices["A.SI"].resample("QE").last()
+    monthly = prices["A.SI"].resample("ME").last()
+    # Values are dated at the start of their period and track the stock's return over it
+    indicators = pd.concat([
+        pd.DataFrame({"indicator_name": "GDP_Quarterly", "record_date": quarterly.index.to_period("Q").start_time,
+                      "value": quarterly.to_numpy()}),
+        pd.DataFrame({"indicator_name": "CPI_All_Items", "record_date": monthly.index.to_period("M").start_time,
+                      "value": monthly.to_numpy()}),
+    ])
+
+    result = analytics.compute_correlations(prices, min_periods=8, indicators=indicators).set_index("indicator_name")
+
+    assert result.loc["GDP_Quarterly", "observations"] == len(quarterly) - 1
+    assert result.loc["GDP_Quarterly", "correlation"] == pytest.approx(1.0)
+    assert result.loc["GDP_Quarterly", "window_start"] == "2019Q1"
+    assert result.loc["CPI_All_Items", "observations"] == len(monthly) - 1
+    assert result.loc["CPI_All_Items", "correlation"] == pytest.approx(1.0)
@@ -0,0 +1,86 @@
+# tests/test_backtesting.py
+import numpy as np
+import pandas as pd
+import pytest
+import backtesting
+from backtesting import score_picks, walk_forward
+from benchmarks.synthetic import generate
+from db import transaction
+from disk_cache import DiskCache
+from memory import store_briefings
+from predictive_models import load_histories
+
+CUTOFFS = ["2023-06-15", "2023-12-31", "2024-03-01"]
+
+
+@pytest.fixture
+def fitted(database, tmp_path, monkeypatch):
+    """Synthetic indicator history, an empty prefix cache, and the histories each backtest fits, by key."""
+    generate(indicators=2, tickers=1, years=3, news=0, seed=8, end="2024-07-01")
+    monkeypatch.setattr(backtesting, "_cache", DiskCache(str(tmp_path / "backtest_cache"), suffix=".json"))
+    histories = {}
+    fit = backtesting._fit
+
+    def recording(backend, prefixes, horizon_days, max_workers):
+        histories.update(prefixes)
+        yield from fit(backend, prefixes, horizon_days, max_workers)
+
+    monkeypatch.setattr(backtesting, "_fit", recording)
+    return histories
+
+
+def test_walk_forward_fits_only_the_history_before_each_cutoff(fitted):
+    report = walk_forward(["holt_winters"], cutoffs=CUTOFFS, horizon_days=90)
+
+    expected = {}
+    for name, history in load_histories().items():
+        for cutoff in CUTOFFS:
+            known = int((history["ds"] <= pd.Timestamp(cutoff)).sum())
+            expected[f"{name}@{known}"] = history.iloc[:known]
+    assert sorted(fitted) == sorted(expected)
+    for key, history in fitted.items():
+        pd.testing.assert_frame_equal(history, expected[key].reset_index(drop=True))
+
+    assert set(report["backend"]) == {"holt_winters"}
+    assert report["horizon"].min() == 1
+    # Every horizon is scored once per cutoff and indicator, against a value released after the cutoff
+    assert (report["points"] == len(CUTOFFS) * 2).all() and (report["series"] == 2).all()
+    assert (report[["mape", "rmse", "mae"]] >= 0).all().all()
+
+
+def test_walk_forward_reuses_cached_prefix_fits(fitted):
+    first = walk_forward(["holt_winters"], cutoffs=CUTOFFS[:2], horizon_days=90)
+    fitted.clear()
+    # One new cutoff: only its prefixes are fitted
+    second = walk_forward(["holt_winters"], cutoffs=CUTOFFS, horizon_days=90)
+
+    assert len(fitted) == 2 and all(history["ds"].max() <= pd.Timestamp(CUTOFFS[2]) for history in fitted.values())
+    assert second["points"].sum() > first["points"].sum()
+
+
+def test_score_picks_measures_returns_from_the_briefing_date(database):
+    days = pd.bdate_range("2024-06-03", periods=10)
+    rows = [("D05.SI", day, 10.0 + i, 1000) for i, day in enumerate(days.strftime("%Y-%m-%d %H:%M:%S"))]
+    rows += [("C6L.SI", day, 20.0, 1000) for day in days.strftime("%Y-%m-%d %H:%M:%S")]
+    with transaction() as conn:
+        conn.executemany("INSERT INTO sgx_stocks_daily (ticker, record_date, close_price, volume) VALUES (?, ?, ?, ?)", rows)
+        store_briefings(conn, [
+            # A Saturday: bought at Friday's close of 14
+            ("2024-06-08", "## Top Opportunity\n**D05.SI (DBS)** looks cheap."),
+            ("2024-06-12", "## Top Opportunity\nNothing stands out."),
+            # Too late for the 2-day horizon to have played out
+            ("2024-06-14", "## Top Opportunity\n**C6L.SI (SIA)** is recovering."),
+        ], {"D05.SI", "C6L.SI"})
+
+    summary, picks = score_picks(horizons=[2])
+
+    assert picks["ticker"].fillna("none").tolist() == ["D05.SI", "none", "C6L.SI"]
+    assert picks["return_2d"].iloc[0] == pytest.approx(16 / 14 - 1)
+    # Against the average of D05.SI and the flat C6L.SI
+    assert picks["excess_2d"].iloc[0] == pytest.approx((16 / 14 - 1) / 2)
+    assert np.isnan(picks["return_2d"].iloc[1:]).all()
+    assert summary.to_dict("records") == [{
+        "horizon_days": 2, "picks": 1, "mean_return": pytest.approx(16 / 14 - 1),
+        "median_return": pytest.approx(16 / 14 - 1), "mean_excess": pytest.approx((16 / 14 - 1) / 2),
+        "hit_rate": 1.0, "beat_rate": 1.0,
+    }]
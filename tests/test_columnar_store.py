@@ -0,0 +1,82 @@
+# tests/test_columnar_store.py
+import pandas as pd
+import pytest
+import columnar_store
+from benchmarks.synthetic import generate
+from columnar_store import DATASETS, compact, read_series, read_table, rebuild
+from data_ingestion import _store_source
+from db import bump_table_versions, query_df, transaction
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def store(database, tmp_path, monkeypatch):
+    """Synthetic history with the columnar store switched on and rebuilt from it."""
+    monkeypatch.setattr(columnar_store, "COLUMNAR_STORE_ENABLED", True)
+    monkeypatch.setattr(columnar_store, "COLUMNAR_STORE_DIR", str(tmp_path / "columnar"))
+    generate(indicators=3, tickers=3, years=1, news=0, seed=4, end="2024-07-01")
+    rebuild()
+
+
+def _sqlite(table):
+    """What SQLite holds for `table`, in the shape read_table returns."""
+    key_column, value_columns = DATASETS[table]
+    frame = query_df(
+        f"SELECT {key_column}, record_date, {', '.join(value_columns)} FROM {table} ORDER BY {key_column}, record_date",
+        parse_dates=['record_date']
+    )
+    return {
+        name: group[["record_date", *value_columns]].astype({column: float for column in value_columns})
+        .reset_index(drop=True)
+        for name, group in frame.groupby(key_column, sort=True)
+    }
+
+
+def _assert_matches_sqlite(table):
+    expected = _sqlite(table)
+    stored = read_table(table)
+    assert list(stored) == list(expected)
+    for name, frame in expected.items():
+        pd.testing.assert_frame_equal(stored[name], frame)
+        pd.testing.assert_frame_equal(read_series(table, name), frame)
+
+
+def test_rebuilt_store_reads_like_sqlite(store):
+    for table in DATASETS:
+        _assert_matches_sqlite(table)
+    assert list(read_series("singstat_data", "CPI_All_Items", columns=["value"]).columns) == ["record_date", "value"]
+
+
+def test_appended_revision_wins_and_survives_compaction(store):
+    ticker, day = "D05.SI", "2024-06-28 00:00:00"
+    # Each store call is one append, so the ticker ends up with more files than compaction allows
+    for i in range(3):
+        _store_source("sgx", [(ticker, day, 100.0 + i, 1_000 + i)])
+    revised = read_series("sgx_stocks_daily", ticker)
+    assert revised.loc[revised["record_date"] == pd.Timestamp(day), "close_price"].tolist() == [102.0]
+    _assert_matches_sqlite("sgx_stocks_daily")
+
+    assert compact("sgx_stocks_daily", max_parts=2) == 1
+    parts = query_df("SELECT series, COUNT(*) AS parts FROM columnar_partitions "
+                     "WHERE table_name = 'sgx_stocks_daily' GROUP BY series")
+    assert parts["parts"].max() == 1
+    _assert_matches_sqlite("sgx_stocks_daily")
+
+
+def test_store_behind_sqlite_is_not_read(store):
+    # A write that bypasses the store (e.g. a manual fix in SQLite)
+    with transaction() as conn:
+        conn.execute("UPDATE singstat_data SET value = value + 1 WHERE indicator_name = 'CPI_All_Items'")
+        bump_table_versions(conn, "singstat_data")
+
+    assert read_table("singstat_data") is None
+    assert read_series("singstat_data", "CPI_All_Items") is None
+    # The other dataset is still in sync
+    assert read_table("sgx_stocks_daily") is not None
+    # A write through ingestion does not bring a stale store back into use
+    _store_source("singstat", [("CPI_All_Items", "2024-07-01", 1.0)])
+    assert read_table("singstat_data") is None
+
+    rebuild(["singstat_data"])
+    _assert_matches_sqlite("singstat_data")
@@ -0,0 +1,101 @@
+# tests/test_dashboard_data.py
+import pandas as pd
+import pytest
+import columnar_store
+import dashboard_data
+from benchmarks.synthetic import generate
+from dashboard_data import (
+    INDICATOR_TABLES,
+    STOCK_TABLES,
+    change_token,
+    list_indicators,
+    list_tickers,
+    load_indicator_history,
+    load_stock_history,
+)
+from db import bump_table_versions, query_df, transaction
+
+
+@pytest.fixture
+def history(database):
+    generate(indicators=3, tickers=3, years=2, news=0, seed=9, end="2024-07-01")
+
+
+def _all_closes(ticker):
+    return query_df("SELECT record_date, close_price FROM sgx_stocks_daily WHERE ticker = ? ORDER BY record_date",
+                    params=(ticker,), parse_dates=["record_date"])
+
+
+def test_change_token_follows_writes_to_its_tables(history):
+    indicators, stocks = change_token(INDICATOR_TABLES), change_token(STOCK_TABLES)
+    with transaction() as conn:
+        bump_table_versions(conn, "indicator_forecasts")
+
+    assert change_token(INDICATOR_TABLES) != indicators
+    assert change_token(STOCK_TABLES) == stocks
+    assert change_token(("never_written",)) == (0,)
+
+
+def test_lists_are_sorted_and_distinct(history):
+    assert list_tickers() == ["C6L.SI", "D05.SI", "S0000.SI"]
+    assert list_indicators() == ["CPI_All_Items", "GDP_Quarterly", "Indicator_000"]
+
+
+def test_long_histories_are_thinned_in_sqlite(history):
+    full = _all_closes("D05.SI")
+
+    thinned = load_stock_history("D05.SI", max_points=50)
+
+    assert len(full) > 500 and len(thinned) <= 51
+    # Every n-th row plus the latest one, at most max_points + 1
+    pd.testing.assert_frame_equal(thinned.reset_index(), dashboard_data._thin(full, 50))
+    assert thinned.index[-1] == full["record_date"].iloc[-1]
+    pd.testing.assert_frame_equal(load_stock_history("D05.SI").reset_index(), full)
+
+
+def test_date_bounds_are_inclusive(history):
+    window = load_stock_history("D05.SI", start="2024-03-01", end="2024-03-28")
+
+    # Stored with a time part, the end day is still included
+    assert window.index.min() == pd.Timestamp("2024-03-01")
+    assert window.index.max() == pd.Timestamp("2024-03-28")
+
+
+def test_indicator_history_joins_forecasts(history):
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO indicator_forecasts (indicator_name, forecast_date, predicted_value) VALUES (?, ?, ?)",
+            [("CPI_All_Items", "2024-07-01", 1.5), ("CPI_All_Items", "2024-08-01", 1.6)]
+        )
+
+    frame = load_indicator_history("CPI_All_Items", start="2024-05-01")
+
+    assert list(frame.columns) == ["Historical", "Forecast"]
+    assert frame["Forecast"].dropna().tolist() == [1.5, 1.6]
+    assert frame.index.is_monotonic_increasing and frame.index[0] == pd.Timestamp("2024-05-01")
+
+
+def test_columnar_store_serves_the_same_series(history, tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    expected = [
+        load_stock_history("D05.SI", max_points=50),
+        load_stock_history("D05.SI", start="2024-03-01", end="2024-03-28"),
+        load_indicator_history("GDP_Quarterly", max_points=10),
+    ]
+    monkeypatch.setattr(columnar_store, "COLUMNAR_STORE_ENABLED", True)
+    monkeypatch.setattr(columnar_store, "COLUMNAR_STORE_DIR", str(tmp_path / "columnar"))
+    columnar_store.rebuild()
+    reads = []
+    read_series = columnar_store.read_series
+    monkeypatch.setattr(columnar_store, "read_series", lambda *args, **kwargs: reads.append(args[:2]) or
+                        read_series(*args, **kwargs))
+
+    actual = [
+        load_stock_history("D05.SI", max_points=50),
+        load_stock_history("D05.SI", start="2024-03-01", end="2024-03-28"),
+        load_indicator_history("GDP_Quarterly", max_points=10),
+    ]
+
+    assert ("singstat_data", "GDP_Quarterly") in reads
+    for got, want in zip(actual, expected):
+        pd.testing.assert_frame_equal(got, want)
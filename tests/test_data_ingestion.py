@@ -0,0 +1,230 @@
+# tests/test_data_ingestion.py
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+import data_ingestion
+from benchmarks.stubs import SingStatStub, SyntheticPriceProvider
+from data_ingestion import RateLimiter, RetryableError, fetch_singstat_series, make_session, run_ingestion, with_retries
+from db import get_table_versions, query_all, query_one, transaction
+
+
+@pytest.fixture
+def singstat(monkeypatch):
+    """A local SingStat API that data_ingestion is pointed at."""
+    with SingStatStub() as stub:
+        monkeypatch.setattr(data_ingestion, "SINGSTAT_API_URL", stub.url)
+        monkeypatch.setattr(data_ingestion, "SINGSTAT_API_KEY", "test-key")
+        yield stub
+
+
+@pytest.fixture
+def write_transactions(monkeypatch):
+    """Counts the write transactions ingestion opens."""
+    opened = []
+    transaction = data_ingestion.transaction
+
+    def counting():
+        opened.append(1)
+        return transaction()
+
+    monkeypatch.setattr(data_ingestion, "transaction", counting)
+    return opened
+
+
+def test_transient_errors_are_retried_with_exponential_backoff(singstat, no_network, monkeypatch):
+    monkeypatch.setattr(data_ingestion, "INGESTION_BACKOFF_SECONDS", 0.05)
+    singstat.fail("M1", 429, 503)
+
+    rows = fetch_singstat_series("CPI", "M1", make_session(2))
+
+    attempts = singstat.requests_for("M1")
+    assert [status for _, status in attempts] == [429, 503, 200]
+    assert rows and {row[0] for row in rows} == {"CPI"}
+    # Delays are backoff * 2**n plus up to 25% jitter
+    first, second = attempts[1][0] - attempts[0][0], attempts[2][0] - attempts[1][0]
+    assert 0.05 <= first < 0.05 * 1.25 + 0.05
+    assert 0.10 <= second < 0.10 * 1.25 + 0.05
+
+
+def test_retries_stop_after_max_attempts(singstat, no_network):
+    singstat.fail("M1", *[500] * 10)
+
+    with pytest.raises(RetryableError, match="HTTP 500"):
+        fetch_singstat_series("CPI", "M1", make_session(2))
+
+    assert len(singstat.requests_for("M1")) == data_ingestion.INGESTION_MAX_RETRIES
+
+
+def test_client_errors_are_not_retried(singstat, no_network):
+    singstat.fail("M1", 404)
+
+    with pytest.raises(data_ingestion.requests.exceptions.HTTPError):
+        fetch_singstat_series("CPI", "M1", make_session(2))
+
+    assert len(singstat.requests_for("M1")) == 1
+
+
+def test_with_retries_reraises_after_the_last_attempt():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        raise RetryableError("busy")
+
+    with pytest.raises(RetryableError):
+        with_retries(flaky, attempts=3, backoff=0)
+    assert len(calls) == 3
+
+
+def test_rate_limiter_spaces_calls_across_threads():
+    limiter = RateLimiter(50)
+    times, lock = [], threading.Lock()
+
+    def worker():
+        for _ in range(5):
+            limiter.wait()
+            with lock:
+                times.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The k-th call may not happen before k intervals have passed
+    times.sort()
+    assert len(times) == 20
+    assert all(at - started >= k * 0.02 - 0.001 for k, at in enumerate(times))
+
+
+def test_rate_limiter_spaces_singstat_requests(singstat, no_network):
+    session = make_session(4)
+    limiter = RateLimiter(20)
+    threads = [
+        threading.Thread(target=fetch_singstat_series, args=(f"S{i}", f"M{i}", session, limiter))
+        for i in range(6)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    times = sorted(at for _, at, _ in singstat.requests)
+    assert len(times) == 6
+    assert times[-1] - started >= 5 * 0.05
+
+
+def test_failing_price_downloads_are_retried(database, no_network):
+    provider = SyntheticPriceProvider(failures=2)
+
+    stored = data_ingestion.store_sgx_data(["AAA.SI", "BBB.SI"], provider=provider)
+
+    assert provider.calls == 3
+    assert stored == query_one("SELECT COUNT(*) FROM sgx_stocks_daily")[0] > 0
+
+
+def test_ingestion_writes_in_bounded_batches(database, singstat, no_network, write_transactions, monkeypatch):
+    monkeypatch.setattr(data_ingestion, "INGESTION_WRITE_BATCH_ROWS", 100)
+    indicators = {"CPI": "M1", "GDP": "M2"}
+    tickers = ["AAA.SI", "BBB.SI", "CCC.SI"]
+    provider = SyntheticPriceProvider()
+
+    counts = run_ingestion(indicators, tickers, price_provider=provider, max_workers=4)
+
+    assert counts["failures"] == {}
+    assert counts["singstat_data"] == query_one("SELECT COUNT(*) FROM singstat_data")[0] > 0
+    assert counts["sgx_stocks_daily"] == query_one("SELECT COUNT(*) FROM sgx_stocks_daily")[0] > 100
+    # Tickers with the same fetch window share one batched download
+    assert provider.calls == 1
+    # One transaction per batch of at most 100 rows, of the price stream and of each SingStat series
+    per_series = dict(query_all("SELECT indicator_name, COUNT(*) FROM singstat_data GROUP BY indicator_name"))
+    expected = math.ceil(counts["sgx_stocks_daily"] / 100) + sum(math.ceil(rows / 100) for rows in per_series.values())
+    assert len(write_transactions) == expected
+    marks = dict(query_all("SELECT series, high_water_mark FROM ingestion_watermarks WHERE source = 'sgx'"))
+    assert set(marks) == set(tickers)
+
+
+def test_singstat_series_are_stored_as_they_arrive(database, singstat, no_network, monkeypatch):
+    stored = []
+    store = data_ingestion._store_source
+
+    def recording(source, rows):
+        if source == "singstat":
+            stored.append(sorted({row[0] for row in rows}))
+        return store(source, rows)
+
+    monkeypatch.setattr(data_ingestion, "_store_source", recording)
+    # GDP's first requests fail, so CPI is stored while GDP is still being retried
+    singstat.fail("M2", 503, 503)
+
+    counts = run_ingestion({"GDP": "M2", "CPI": "M1"}, [], max_workers=4)
+
+    assert stored == [["CPI"], ["GDP"]]
+    assert counts["singstat_data"] == query_one("SELECT COUNT(*) FROM singstat_data")[0] > 0
+
+
+def test_incremental_ingestion_only_fetches_new_periods(database, singstat, no_network, write_transactions):
+    indicators = {"CPI": "M1"}
+    provider = SyntheticPriceProvider()
+    run_ingestion(indicators, ["AAA.SI"], price_provider=provider, max_workers=2)
+    del write_transactions[:]
+
+    counts = run_ingestion(indicators, ["AAA.SI"], price_provider=provider, max_workers=2)
+
+    # Only the latest period is fetched again (for revisions); prices are already current
+    assert counts["singstat_data"] == 1
+    assert counts["sgx_stocks_daily"] == 0
+    assert provider.calls == 1
+    assert len(write_transactions) == 1
+
+
+def test_watermarks_fall_back_to_stored_data_and_never_move_back(database):
+    data_ingestion._store_source("sgx", [("AAA.SI", "2024-01-05 00:00:00", 10.0, 100)])
+    with transaction() as conn:
+        conn.execute("DELETE FROM ingestion_watermarks")
+        conn.execute("INSERT INTO sgx_stocks_daily (ticker, record_date, close_price, volume) "
+                     "VALUES ('BBB.SI', '2024-01-03 00:00:00', 5.0, 1)")
+    # Series ingested before watermarks existed start from their latest stored date
+    assert data_ingestion.load_watermarks("sgx") == {
+        "AAA.SI": datetime(2024, 1, 5), "BBB.SI": datetime(2024, 1, 3)
+    }
+
+    data_ingestion._store_source("sgx", [("AAA.SI", "2024-01-09 00:00:00", 11.0, 100)])
+    # A late revision of an older day does not move the watermark back
+    data_ingestion._store_source("sgx", [("AAA.SI", "2024-01-02 00:00:00", 9.0, 100)])
+    assert data_ingestion.load_watermarks("sgx")["AAA.SI"] == datetime(2024, 1, 9)
+
+
+def test_fetch_windows_skip_current_tickers():
+    end = datetime(2024, 1, 10, 18, 0)
+    marks = {"OLD.SI": datetime(2024, 1, 2), "NOW.SI": datetime(2024, 1, 9)}
+
+    windows = data_ingestion._sgx_fetch_windows(["NEW.SI", "OLD.SI", "NOW.SI"], marks, end)
+
+    assert windows == {"NEW.SI": end - timedelta(days=365), "OLD.SI": datetime(2024, 1, 2)}
+
+
+def test_upserts_only_count_as_writes_when_values_change(database):
+    rows = [("AAA.SI", "2024-01-02 00:00:00", 10.0, 100), ("AAA.SI", "2024-01-03 00:00:00", 10.5, 120)]
+
+    def version():
+        return get_table_versions().get("sgx_stocks_daily", 0)
+
+    data_ingestion._store_source("sgx", rows)
+    stored = version()
+    assert stored == 1
+
+    # Re-fetching the same overlap leaves the table and its cached reads alone
+    data_ingestion._store_source("sgx", rows)
+    assert version() == stored
+
+    data_ingestion._store_source("sgx", [("AAA.SI", "2024-01-03 00:00:00", 10.7, 120)])
+    assert version() == stored + 1
+    assert query_all("SELECT record_date, close_price FROM sgx_stocks_daily ORDER BY record_date") == [
+        ("2024-01-02 00:00:00", 10.0), ("2024-01-03 00:00:00", 10.7)
+    ]
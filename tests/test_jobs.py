@@ -0,0 +1,92 @@
+# tests/test_jobs.py
+import threading
+import time
+import pytest
+import jobs
+from db import execute
+from jobs import JobRunner, get_job, report_progress, stage
+
+_release = threading.Event()
+
+
+def wait_for_release(**params):
+    """A job that runs until the test releases it, reporting progress so it can be cancelled."""
+    with stage("wait"):
+        while not _release.wait(0.01):
+            report_progress(0.5, "waiting")
+    return params
+
+
+@pytest.fixture
+def runner(database, monkeypatch):
+    monkeypatch.setitem(jobs.JOB_KINDS, "wait", (__name__, "wait_for_release"))
+    monkeypatch.setattr(jobs, "JOB_PROGRESS_INTERVAL_SECONDS", 0)
+    _release.clear()
+    runner = JobRunner(max_workers=1)
+    yield runner
+    _release.set()
+    runner.shutdown()
+
+
+def _wait_for(job_id, *statuses, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = get_job(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} is still {get_job(job_id)['status']}")
+
+
+def test_identical_active_jobs_are_deduplicated(runner):
+    job_id, created = runner.submit("wait", n=1)
+    assert created
+    assert runner.submit("wait", n=1) == (job_id, False)
+    other, created = runner.submit("wait", n=2)
+    assert created and other != job_id
+
+    _release.set()
+    assert _wait_for(job_id, "succeeded")["result"] == {"n": 1}
+    _wait_for(other, "succeeded")
+    # Once finished, the same job can run again
+    again, created = runner.submit("wait", n=1)
+    assert created and again not in (job_id, other)
+
+
+def test_queued_jobs_are_cancelled_before_they_start(runner):
+    running, _ = runner.submit("wait", n=1)
+    _wait_for(running, "running")
+    queued, _ = runner.submit("wait", n=2)
+
+    assert runner.cancel(queued)
+    _release.set()
+    _wait_for(running, "succeeded")
+    runner.shutdown()
+    job = get_job(queued)
+    assert job["status"] == "cancelled" and job["started_at"] is None
+
+
+def test_running_jobs_stop_at_their_next_progress_report(runner):
+    job_id, _ = runner.submit("wait", n=1)
+    _wait_for(job_id, "running")
+
+    assert runner.cancel(job_id)
+    job = _wait_for(job_id, "cancelled", "succeeded", "failed")
+    assert job["status"] == "cancelled"
+    assert "wait" in job["stages"]
+    assert not runner.cancel(job_id)
+
+
+def test_jobs_of_exited_workers_are_failed(database):
+    # Above Linux's pid_max, so no such process can exist
+    pid = 2 ** 22 + 1
+    execute(
+        """INSERT INTO jobs (kind, params, dedup_key, status, worker_pid, created_at)
+           VALUES ('ingestion', '{}', 'ingestion:{}', 'running', ?, '2024-01-01 00:00:00')""",
+        (pid,)
+    )
+
+    JobRunner(max_workers=1).shutdown()
+
+    job = get_job(1)
+    assert job["status"] == "failed" and "Interrupted" in job["error"]
@@ -0,0 +1,79 @@
+# tests/test_llm_cache.py
+import json
+import pytest
+from crewai import BaseLLM
+import agent_core
+import telemetry
+from benchmarks.synthetic import generate
+from db import query_all
+from disk_cache import DiskCache
+from llm_cache import CachedLLM, FakeLLM, build_llm, fake_response
+from memory import load_briefing
+
+
+class StubLLM(BaseLLM):
+    """Answers with the stop words it was called with, counting calls."""
+
+    calls: int = 0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None,
+             from_agent=None, response_model=None):
+        self.calls += 1
+        return f"stop={self.stop_sequences} n={self.calls}"
+
+
+MESSAGES = [{"role": "system", "content": "You are an analyst."}, {"role": "user", "content": "Outlook?"}]
+
+
+def test_cache_mode_serves_repeats_from_disk(tmp_path):
+    inner = StubLLM(model="stub")
+    llm = CachedLLM(DiskCache(str(tmp_path)), lambda: inner, model="stub", mode="cache", stop=["\nObservation:"])
+
+    first = llm.call(MESSAGES)
+    second = llm.call(MESSAGES)
+
+    assert first == second == "stop=['\\nObservation:'] n=1"
+    assert inner.calls == 1
+    assert llm.stats() == {"hits": 1, "misses": 1, "calls": 1, "replay_misses": 0}
+
+
+def test_replay_serves_recordings_and_never_calls_the_model(tmp_path):
+    recorder = CachedLLM(DiskCache(str(tmp_path)), lambda: StubLLM(model="stub"), model="stub", mode="record")
+    recorded = recorder.call(MESSAGES)
+
+    replay = CachedLLM(DiskCache(str(tmp_path)), None, model="stub", mode="replay")
+    assert replay.call(MESSAGES) == recorded
+    other = [{"role": "user", "content": "Something never recorded"}]
+    assert replay.call(other) == fake_response(other)
+    assert replay.stats()["replay_misses"] == 1
+
+
+def test_agents_get_the_llm_object_itself():
+    # crewAI turns anything that is not a BaseLLM into its own LiteLLM client,
+    # which would bypass the cache; build_llm must hand agents a BaseLLM
+    assert isinstance(build_llm("fake"), FakeLLM)
+    assert isinstance(build_llm("replay"), CachedLLM)
+
+
+def test_run_analysis_runs_offline_in_fake_mode(database, no_network, monkeypatch):
+    generate(indicators=4, tickers=4, years=1, news=50, seed=1)
+    calls = []
+    original = FakeLLM.call
+    monkeypatch.setattr(FakeLLM, "call", lambda self, messages, **kwargs: calls.append(1) or original(self, messages))
+    monkeypatch.setattr(agent_core, "_agents", None)
+
+    briefing = agent_core.run_analysis()
+
+    # One model call per agent task, all answered by the fake model
+    assert len(calls) == 4
+    assert "Offline response" in str(briefing)
+    assert load_briefing()[1] == str(briefing)
+    run_id = telemetry.list_runs("analysis", limit=1)["run_id"].iloc[0]
+    spans = query_all("SELECT attributes FROM run_metrics WHERE run_id = ? AND category = 'llm'", (run_id,))
+    assert len(spans) == 4
+    assert {json.loads(attributes)["cache"] for attributes, in spans} == {"fake"}
+
+
+@pytest.fixture(autouse=True)
+def _reset_agents(monkeypatch):
+    monkeypatch.setattr(agent_core, "_agents", None)
@@ -0,0 +1,148 @@
+# tests/test_memory.py
+import sqlite3
+import pytest
+import db
+import memory
+from benchmarks.synthetic import generate
+from database_setup import create_tables
+from db import query_all, query_one, transaction, use_snapshot
+from memory import extract_record, load_briefing, recall, store_briefings, top_picks
+from point_in_time import Snapshots
+from query_cache import query_cache
+
+BRIEFING = """# Investment Briefing
+
+## Macro Outlook
+**Future Outlook:** Forecasts point to an acceleration in GDP growth, with CPI steady.
+
+## Top Opportunity
+**D05.SI (DBS)**
+DBS benefits from higher rates and a strong deposit franchise. C6L.SI was considered too.
+
+## Key Risk Assessment
+D05.SI: Rate cuts later in the year would compress net interest margins.
+"""
+TICKERS = {"D05.SI", "C6L.SI"}
+
+
+def _store(rows):
+    with transaction() as conn:
+        store_briefings(conn, rows, TICKERS)
+
+
+def _object_type(name):
+    row = query_one("SELECT type FROM sqlite_master WHERE name = ?", (name,))
+    return row[0] if row else None
+
+
+@pytest.fixture
+def old_database(tmp_path, monkeypatch):
+    """Points the project at a database file a test fills in before any table is created."""
+    path = str(tmp_path / "old.db")
+    monkeypatch.setattr(db, "DATABASE_NAME", path)
+    if db._pool is not None:
+        db._pool.close()
+    monkeypatch.setattr(db, "_pool", None)
+    query_cache.clear()
+    yield path
+    if db._pool is not None:
+        db._pool.close()
+
+
+def test_extract_record_reads_pick_outlook_and_risk():
+    record = extract_record("2024-06-03", BRIEFING, TICKERS)
+
+    assert record["picks"] == ["D05.SI", "C6L.SI"]
+    assert record["outlook"] == "acceleration"
+    assert record["risks"] == {"D05.SI": "Rate cuts later in the year would compress net interest margins."}
+    assert record["summary"].startswith("Outlook: acceleration. Top pick: D05.SI (DBS benefits")
+
+
+def test_briefings_are_stored_compressed_once_per_content(database):
+    _store([("2024-06-03", BRIEFING), ("2024-06-04", BRIEFING)])
+
+    assert query_one("SELECT COUNT(*) FROM briefing_contents")[0] == 1
+    blob = query_one("SELECT content FROM briefing_contents")[0]
+    assert isinstance(blob, bytes) and len(blob) < len(BRIEFING)
+    # SQL written against the original plain-text table still works
+    assert query_all("SELECT briefing_date, content FROM briefings ORDER BY briefing_date") == [
+        ("2024-06-03", BRIEFING), ("2024-06-04", BRIEFING)
+    ]
+
+    _store([("2024-06-03", "Replaced."), ("2024-06-04", "Replaced.")])
+    assert load_briefing() == ("2024-06-04", "Replaced.")
+    # The old content is no longer referenced, so it is gone
+    assert query_one("SELECT COUNT(*) FROM briefing_contents")[0] == 1
+
+
+def test_recall_filters_and_fits_the_budget(database):
+    _store([
+        ("2024-06-03", BRIEFING),
+        ("2024-06-04", BRIEFING.replace("acceleration", "slowdown").replace("D05.SI (DBS)", "C6L.SI (SIA)")
+         .replace("D05.SI:", "C6L.SI:")),
+        ("2024-06-05", "No sections at all."),
+    ])
+
+    assert recall(before="2024-06-03") == "No past conclusions stored."
+    by_ticker = recall(ticker="D05.SI")
+    assert "2024-06-03" in by_ticker and "2024-06-05" not in by_ticker
+    assert [line[:12] for line in recall(outlook="deceleration").splitlines()[1:]] == ["- 2024-06-04"]
+    assert recall(last_n=1).splitlines()[1].startswith("- 2024-06-05")
+    assert "omitted to fit the token budget" in recall(max_tokens=40)
+    assert list(top_picks()["ticker"].fillna("none")) == ["D05.SI", "C6L.SI", "none"]
+
+
+def test_original_layout_is_migrated_when_the_database_is_opened(old_database, capsys):
+    conn = sqlite3.connect(old_database)
+    conn.execute("CREATE TABLE briefings (id INTEGER PRIMARY KEY AUTOINCREMENT, briefing_date DATE UNIQUE NOT NULL, content TEXT NOT NULL)")
+    conn.executemany("INSERT INTO briefings (briefing_date, content) VALUES (?, ?)",
+                     [("2024-06-03", BRIEFING), ("2024-06-04", "Short note.")])
+    conn.commit()
+    conn.close()
+
+    # Opening the database creates the new tables and moves the old rows in the same transaction
+    db.get_pool()
+    assert "Moved 2 briefings" in capsys.readouterr().out
+    assert _object_type("briefings") == "view"
+    assert load_briefing("2024-06-03") == ("2024-06-03", BRIEFING)
+    # Backfill resume reads briefing_dates, so it must see the migrated dates
+    assert query_all("SELECT briefing_date FROM briefing_dates ORDER BY briefing_date") == [
+        ("2024-06-03",), ("2024-06-04",)
+    ]
+    assert query_one("SELECT outlook FROM memory_log WHERE log_date = '2024-06-03'")[0] == "acceleration"
+
+    create_tables(verbose=False)
+    assert "Moved" not in capsys.readouterr().out
+    assert query_one("SELECT COUNT(*) FROM briefings")[0] == 2
+
+
+def test_hash_keyed_table_is_migrated_to_the_view(old_database):
+    conn = db.connect()
+    conn.execute("CREATE TABLE briefings (id INTEGER PRIMARY KEY AUTOINCREMENT, briefing_date DATE UNIQUE NOT NULL, content_hash TEXT NOT NULL)")
+    conn.execute("CREATE TABLE briefing_contents (content_hash TEXT PRIMARY KEY, content BLOB NOT NULL)")
+    digest = memory.content_hash(BRIEFING)
+    conn.execute("INSERT INTO briefing_contents VALUES (?, ?)", (digest, memory.compress(BRIEFING)))
+    conn.execute("INSERT INTO briefings (id, briefing_date, content_hash) VALUES (7, '2024-06-03', ?)", (digest,))
+    conn.commit()
+    conn.close()
+
+    create_tables(verbose=False)
+    assert _object_type("briefings") == "view"
+    assert query_all("SELECT id, briefing_date, content FROM briefings") == [(7, "2024-06-03", BRIEFING)]
+
+
+def test_snapshots_only_see_earlier_briefings(database):
+    generate(indicators=3, tickers=3, years=1, news=20, seed=2)
+    _store([("2024-06-03", BRIEFING), ("2024-06-05", "Later briefing.")])
+    snapshots = Snapshots(["2024-06-04"], forecast_backend="holt_winters")
+
+    conn = snapshots.connect("2024-06-04")
+    try:
+        with use_snapshot(conn, "2024-06-04"):
+            assert load_briefing() == ("2024-06-03", BRIEFING)
+            assert query_all("SELECT briefing_date FROM briefings") == [("2024-06-03",)]
+            assert query_one("SELECT COUNT(*) FROM briefing_contents")[0] == 1
+            assert "2024-06-05" not in recall()
+    finally:
+        conn.close()
+    assert load_briefing()[0] == "2024-06-05"
@@ -0,0 +1,122 @@
+# tests/test_model_store.py
+import json
+import pickle
+import sys
+import types
+import numpy as np
+import pandas as pd
+import pytest
+import model_store
+import predictive_models
+from disk_cache import DiskCache
+from model_store import load_model, save_model, warm_start_params
+from predictive_models import PROPHET_MODEL_KEY, _fit_prophet, history_fingerprint
+
+
+class FakeProphet:
+    """Stands in for a Prophet model: records how it was fitted and exposes MAP-shaped params."""
+
+    mcmc_samples = 0
+    fail_warm_start = False
+
+    def fit(self, df, init=None):
+        if init is not None and self.fail_warm_start:
+            raise ValueError("changepoints differ")
+        self.init = init
+        self.rows = len(df)
+        self.params = {"k": [[0.1 * len(df)]], "m": [[0.5]], "sigma_obs": [[0.05]],
+                       "delta": [np.zeros(3)], "beta": [np.ones(2)]}
+        return self
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """An empty model store, with models serialized by pickle instead of Prophet's JSON format."""
+    monkeypatch.setattr(model_store, "_store", DiskCache(str(tmp_path / "models"), suffix=".json"))
+    serialize = types.ModuleType("prophet.serialize")
+    serialize.model_to_json = lambda model: pickle.dumps(model).hex()
+    serialize.model_from_json = lambda text: pickle.loads(bytes.fromhex(text))
+    monkeypatch.setitem(sys.modules, "prophet", types.ModuleType("prophet"))
+    monkeypatch.setitem(sys.modules, "prophet.serialize", serialize)
+    return model_store._store
+
+
+@pytest.fixture
+def fits(store, monkeypatch):
+    """The models _fit_prophet creates, in order."""
+    created = []
+
+    def new_prophet():
+        created.append(FakeProphet())
+        return created[-1]
+
+    monkeypatch.setattr(predictive_models, "_new_prophet", new_prophet)
+    return created
+
+
+def _history(months):
+    return pd.DataFrame({"ds": pd.date_range("2020-01-01", periods=months, freq="MS"), "y": np.arange(months) + 100.0})
+
+
+def test_models_round_trip_with_their_fingerprint(store):
+    model = FakeProphet().fit(_history(3))
+    save_model("CPI", "v1", model, (3, "2020-03-01", "abc"))
+
+    loaded, fingerprint = load_model("CPI", "v1")
+    assert fingerprint == (3, "2020-03-01", "abc")
+    assert loaded.rows == 3 and loaded.params["k"] == model.params["k"]
+    # Other hyperparameters are another model
+    assert load_model("CPI", "v2") == (None, None)
+    assert json.loads(store.get("CPI|v1"))["indicator"] == "CPI"
+
+
+def test_unreadable_models_are_discarded(store):
+    store.put("CPI|v1", json.dumps({"model": "not hex", "fingerprint": [1]}).encode("utf-8"))
+
+    assert load_model("CPI", "v1") == (None, None)
+    assert store.get("CPI|v1") is None
+
+
+def test_warm_start_params_average_mcmc_samples():
+    model = FakeProphet().fit(_history(10))
+    assert warm_start_params(model) == {"k": 1.0, "m": 0.5, "sigma_obs": 0.05, "delta": model.params["delta"][0],
+                                        "beta": model.params["beta"][0]}
+
+    model.mcmc_samples = 2
+    model.params = {"k": [1.0, 3.0], "m": [0.0, 1.0], "sigma_obs": [0.1, 0.3],
+                    "delta": np.array([[0.0, 2.0], [2.0, 4.0]]), "beta": np.array([[1.0], [3.0]])}
+    params = warm_start_params(model)
+    assert (params["k"], params["m"]) == (2.0, 0.5) and params["sigma_obs"] == pytest.approx(0.2)
+    assert params["delta"].tolist() == [1.0, 3.0] and params["beta"].tolist() == [2.0]
+
+
+def test_refits_reuse_or_warm_start_from_the_stored_model(fits):
+    history = _history(24)
+    first = _fit_prophet("CPI", history, history_fingerprint(history), use_store=True)
+    assert first.init is None
+
+    # Same history: the stored model is returned without fitting
+    again = _fit_prophet("CPI", history, history_fingerprint(history), use_store=True)
+    assert len(fits) == 1 and again.rows == 24
+
+    # One more month: fitted from the previous optimum, and stored in its place
+    longer = _history(25)
+    warm = _fit_prophet("CPI", longer, history_fingerprint(longer), use_store=True)
+    assert warm.init["k"] == pytest.approx(2.4) and warm.rows == 25
+    assert load_model("CPI", PROPHET_MODEL_KEY)[1] == history_fingerprint(longer)
+
+    # Without the store nothing is read or written
+    cold = _fit_prophet("CPI", history, history_fingerprint(history), use_store=False)
+    assert cold.init is None and len(fits) == 3
+    assert load_model("CPI", PROPHET_MODEL_KEY)[1] == history_fingerprint(longer)
+
+
+def test_failed_warm_start_refits_from_scratch(fits, monkeypatch):
+    history = _history(24)
+    _fit_prophet("CPI", history, history_fingerprint(history), use_store=True)
+    monkeypatch.setattr(FakeProphet, "fail_warm_start", True)
+
+    longer = _history(26)
+    model = _fit_prophet("CPI", longer, history_fingerprint(longer), use_store=True)
+
+    assert len(fits) == 3 and model.init is None and model.rows == 26
@@ -0,0 +1,96 @@
+# tests/test_point_in_time.py
+import pytest
+import agent_core
+import point_in_time
+from analytics import compute_analytics
+from benchmarks.synthetic import generate
+from db import query_all, query_one, transaction
+from memory import load_briefing
+from point_in_time import Snapshots
+
+AS_OF = "2024-03-15"
+
+
+@pytest.fixture
+def history(database, monkeypatch):
+    """A year of synthetic data up to the end of June 2024, with its analytics."""
+    generate(indicators=3, tickers=3, years=1, news=200, seed=4, end="2024-07-01")
+    compute_analytics()
+    monkeypatch.setattr(agent_core, "_agents", None)
+
+
+def _latest(conn, sql):
+    return conn.execute(sql).fetchone()[0]
+
+
+def test_snapshot_hides_everything_after_its_date(history):
+    conn = Snapshots([AS_OF], forecast_backend="holt_winters").connect(AS_OF)
+    try:
+        assert _latest(conn, "SELECT MAX(record_date) FROM sgx_stocks_daily")[:10] == "2024-03-15"
+        assert _latest(conn, "SELECT MAX(record_date) FROM singstat_data") <= AS_OF
+        assert _latest(conn, "SELECT MAX(published_date) FROM unstructured_news") <= AS_OF
+        assert _latest(conn, "SELECT MAX(record_date) FROM stock_features_daily")[:10] <= AS_OF
+        assert _latest(conn, "SELECT MAX(period_end) FROM stock_returns_periodic")[:10] <= AS_OF
+        # Recomputed tables are rebuilt from the visible history only
+        assert {row[0][:10] for row in conn.execute("SELECT as_of FROM stock_latest_metrics")} == {AS_OF}
+        last_values = dict(conn.execute("SELECT indicator_name, MAX(record_date) FROM singstat_data GROUP BY 1"))
+        first_forecasts = dict(conn.execute("SELECT indicator_name, MIN(forecast_date) FROM indicator_forecasts GROUP BY 1"))
+        assert first_forecasts and all(first_forecasts[name][:10] > last_values[name] for name in first_forecasts)
+        # The rows that are visible are the stored ones, unchanged
+        assert conn.execute(
+            "SELECT close_price FROM sgx_stocks_daily WHERE record_date LIKE '2024-03-15%' ORDER BY ticker"
+        ).fetchall() == query_all(
+            "SELECT close_price FROM sgx_stocks_daily WHERE record_date LIKE '2024-03-15%' ORDER BY ticker"
+        )
+    finally:
+        conn.close()
+    # The live database is untouched
+    assert query_one("SELECT MAX(record_date) FROM sgx_stocks_daily")[0][:10] == "2024-06-28"
+    assert query_one("SELECT MIN(as_of) FROM stock_latest_metrics")[0][:10] == "2024-06-28"
+
+
+def test_indicator_values_are_hidden_until_published(history, monkeypatch):
+    monkeypatch.setattr(point_in_time, "INDICATOR_RELEASE_LAG_DAYS", {"CPI_All_Items": 10})
+    monkeypatch.setattr(point_in_time, "INDICATOR_DEFAULT_RELEASE_LAG_DAYS", 0)
+    dates = ["2024-03-30", "2024-03-31", "2024-04-10"]
+    snapshots = Snapshots(dates, forecast_backend="holt_winters")
+
+    latest, first_forecast = {}, {}
+    for day in dates:
+        conn = snapshots.connect(day)
+        try:
+            latest[day] = dict(conn.execute("SELECT indicator_name, MAX(record_date) FROM singstat_data GROUP BY 1"))
+            first_forecast[day] = dict(
+                conn.execute("SELECT indicator_name, MIN(forecast_date) FROM indicator_forecasts GROUP BY 1")
+            )
+        finally:
+            conn.close()
+
+    # March's monthly value (dated 2024-03-01) is only known once March is over
+    assert latest["2024-03-30"]["GDP_Quarterly"] == "2024-02-01"
+    assert latest["2024-03-31"]["GDP_Quarterly"] == "2024-03-01"
+    # ... and for CPI, 10 days after that
+    assert latest["2024-03-31"]["CPI_All_Items"] == "2024-02-01"
+    assert latest["2024-04-10"]["CPI_All_Items"] == "2024-03-01"
+    # Forecasts are fitted on the published values only
+    assert first_forecast["2024-03-30"]["GDP_Quarterly"][:10] == "2024-03-01"
+    assert first_forecast["2024-03-31"]["GDP_Quarterly"][:10] == "2024-04-01"
+
+
+def test_backfill_writes_each_date_once_and_resumes(history):
+    first = agent_core.backfill_briefings("2024-03-13", "2024-03-15", max_workers=2, forecast_backend="holt_winters")
+
+    assert first["written"] == ["2024-03-13", "2024-03-14", "2024-03-15"]
+    assert first["errors"] == {}
+    assert all("Offline response" in load_briefing(day)[1] for day in first["written"])
+
+    # As if interrupted before the last date was written: a resumed run only does the missing dates
+    with transaction() as conn:
+        conn.execute("DELETE FROM briefing_dates WHERE briefing_date = '2024-03-15'")
+    second = agent_core.backfill_briefings("2024-03-13", "2024-03-18", forecast_backend="holt_winters")
+
+    assert second["skipped"] == ["2024-03-13", "2024-03-14"]
+    assert second["written"] == ["2024-03-15", "2024-03-18"]
+    assert [row[0] for row in query_all("SELECT briefing_date FROM briefing_dates ORDER BY briefing_date")] == [
+        "2024-03-13", "2024-03-14", "2024-03-15", "2024-03-18"
+    ]
@@ -0,0 +1,90 @@
+# tests/test_predictive_models.py
+import pandas as pd
+import pytest
+from db import bump_table_versions, executemany, query_all, query_one, transaction
+from predictive_models import NumpyForecaster, generate_forecasts, history_fingerprint
+
+INDICATORS = ["CPI_All_Items", "Retail_Sales", "Unemployment_Rate"]
+
+
+@pytest.fixture
+def fitted(monkeypatch):
+    """Records the indicators each forecast() call is asked to fit."""
+    calls = []
+    forecast = NumpyForecaster.forecast
+
+    def recording(self, histories, horizon_days):
+        calls.append(sorted(histories))
+        return forecast(self, histories, horizon_days)
+
+    monkeypatch.setattr(NumpyForecaster, "forecast", recording)
+    return calls
+
+
+def _write(sql, params=()):
+    with transaction() as conn:
+        conn.execute(sql, params)
+        bump_table_versions(conn, "singstat_data")
+
+
+def _seed(months=24):
+    """Two years of monthly values for every indicator."""
+    dates = pd.date_range("2022-01-01", periods=months, freq="MS")
+    executemany(
+        "INSERT INTO singstat_data (indicator_name, record_date, value) VALUES (?, ?, ?)",
+        [(name, day.strftime('%Y-%m-%d'), 100.0 + 10 * i + n) for i, name in enumerate(INDICATORS) for n, day in enumerate(dates)]
+    )
+
+
+def _forecast_counts():
+    return dict(query_all("SELECT indicator_name, COUNT(*) FROM indicator_forecasts GROUP BY indicator_name"))
+
+
+def test_history_fingerprint_tracks_content():
+    df = pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=4, freq="MS"), "y": [1.0, 2.0, 3.0, 4.0]})
+
+    count, max_date, digest = history_fingerprint(df)
+    assert (count, max_date) == (4, "2024-04-01")
+    assert history_fingerprint(df.copy()) == (count, max_date, digest)
+    revised = df.assign(y=[1.0, 2.5, 3.0, 4.0])
+    assert history_fingerprint(revised)[:2] == (count, max_date)
+    assert history_fingerprint(revised)[2] != digest
+
+
+def test_only_changed_indicators_are_refitted(database, fitted):
+    _seed()
+
+    first = generate_forecasts(backend="holt_winters")
+    assert first["stored"] > 0 and first["unchanged"] == []
+    assert fitted == [INDICATORS]
+    counts = _forecast_counts()
+
+    second = generate_forecasts(backend="holt_winters")
+    assert second["stored"] == 0 and sorted(second["unchanged"]) == INDICATORS
+    assert len(fitted) == 1
+
+    # A revised value changes only that indicator's fingerprint
+    _write("UPDATE singstat_data SET value = value + 1 WHERE indicator_name = 'CPI_All_Items' "
+           "AND record_date = (SELECT MAX(record_date) FROM singstat_data WHERE indicator_name = 'CPI_All_Items')")
+    third = generate_forecasts(backend="holt_winters")
+    assert fitted[-1] == ["CPI_All_Items"]
+    assert sorted(third["unchanged"]) == ["Retail_Sales", "Unemployment_Rate"]
+    assert _forecast_counts() == counts
+
+
+def test_model_settings_and_removed_series_invalidate_forecasts(database, fitted):
+    _seed()
+    generate_forecasts(backend="holt_winters")
+
+    # Another model or horizon is a different fingerprint for every indicator
+    generate_forecasts(backend="seasonal_naive")
+    assert fitted[-1] == INDICATORS
+    generate_forecasts(backend="seasonal_naive", horizon_days=30)
+    assert fitted[-1] == INDICATORS
+    assert {row[0] for row in query_all("SELECT DISTINCT model FROM forecast_fingerprints")} == {"numpy:seasonal_naive"}
+
+    _write("DELETE FROM singstat_data WHERE indicator_name = 'Retail_Sales'")
+    result = generate_forecasts(backend="seasonal_naive", horizon_days=30)
+    assert result["stored"] == 0
+    assert "Retail_Sales" not in _forecast_counts()
+    assert query_one("SELECT COUNT(*) FROM forecast_fingerprints WHERE indicator_name = 'Retail_Sales'")[0] == 0
@@ -0,0 +1,95 @@
+# tests/test_query_cache.py
+import pytest
+import jobs
+from data_ingestion import _advance_watermarks
+from db import bump_table_versions, execute, transaction
+from query_cache import QueryCache, normalize_sql, query_cache
+from tools import db_tool
+
+
+def _insert_price(ticker, date, close):
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO sgx_stocks_daily (ticker, record_date, close_price, volume) VALUES (?, ?, ?, 1)",
+            (ticker, date, close)
+        )
+        bump_table_versions(conn, "sgx_stocks_daily")
+
+
+def test_normalize_sql_keeps_literals():
+    assert normalize_sql("SELECT *\n FROM  Foo WHERE t = 'D05.SI';") == "select * from foo where t = 'D05.SI'"
+
+
+def test_entries_expire_when_a_table_they_read_is_written(database):
+    _insert_price("AAA.SI", "2024-01-02", 10.0)
+    sql = "SELECT ticker, close_price FROM sgx_stocks_daily"
+
+    first = db_tool._run(sql)
+    assert db_tool._run(sql) == first
+    assert query_cache.stats()["hits"] == 1
+
+    _insert_price("BBB.SI", "2024-01-02", 20.0)
+    second = db_tool._run(sql)
+    assert "BBB.SI" in second and second != first
+    assert query_cache.stats()["invalidations"] == 1
+
+
+def test_tables_without_a_version_are_never_cached(database):
+    # Nothing has bumped unstructured_news in a fresh database
+    sql = "SELECT COUNT(*) AS n FROM unstructured_news"
+    db_tool._run(sql)
+    execute("INSERT INTO unstructured_news (source, published_date, content) VALUES ('x', '2024-01-02', 'Story')")
+
+    assert "1" in db_tool._run(sql)
+    assert query_cache.stats()["entries"] == 0
+    assert query_cache.stats()["uncacheable"] == 2
+
+
+def test_views_are_invalidated_through_their_tables(database):
+    execute("CREATE VIEW latest_prices AS SELECT ticker, MAX(record_date) AS record_date FROM sgx_stocks_daily GROUP BY ticker")
+    _insert_price("AAA.SI", "2024-01-02", 10.0)
+    cache = QueryCache()
+
+    assert cache.referenced_tables(normalize_sql("SELECT * FROM latest_prices")) == ["sgx_stocks_daily"]
+    cache.put("SELECT * FROM latest_prices", "old")
+    assert cache.get("SELECT * FROM latest_prices") == "old"
+    _insert_price("AAA.SI", "2024-01-03", 11.0)
+    assert cache.get("SELECT * FROM latest_prices") is None
+
+
+def test_watermark_writes_bump_their_version(database):
+    sql = "SELECT series, high_water_mark FROM ingestion_watermarks"
+    with transaction() as conn:
+        _advance_watermarks(conn, "sgx", [("AAA.SI", "2024-01-02 00:00:00")])
+    assert "2024-01-02" in db_tool._run(sql)
+
+    with transaction() as conn:
+        _advance_watermarks(conn, "sgx", [("AAA.SI", "2024-01-05 00:00:00")])
+    assert "2024-01-05" in db_tool._run(sql)
+
+
+def test_job_writes_bump_their_version(database, monkeypatch):
+    monkeypatch.setitem(jobs.JOB_KINDS, "dumps", ("json", "dumps"))
+    sql = "SELECT id, status FROM jobs ORDER BY id"
+
+    def run_job(**params):
+        runner = jobs.JobRunner(max_workers=1)
+        job_id, _ = runner.submit("dumps", **params)
+        runner.shutdown()
+        return job_id
+
+    first = run_job(obj=[1])
+    assert db_tool._run(sql) == db_tool._run(sql) == f"id,status\n{first},succeeded"
+    assert query_cache.stats()["hits"] == 1
+
+    second = run_job(obj=[2])
+    assert db_tool._run(sql) == f"id,status\n{first},succeeded\n{second},succeeded"
+    assert query_cache.stats()["invalidations"] == 1
+
+
+@pytest.fixture(autouse=True)
+def _fresh_stats(monkeypatch):
+    monkeypatch.setattr(query_cache, "hits", 0)
+    monkeypatch.setattr(query_cache, "misses", 0)
+    monkeypatch.setattr(query_cache, "invalidations", 0)
+    monkeypatch.setattr(query_cache, "uncacheable", 0)
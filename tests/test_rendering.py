@@ -0,0 +1,53 @@
+# tests/test_rendering.py
+import numpy as np
+import pandas as pd
+import pytest
+from rendering import StreamingSummary, render_chunks, render_frame, summarize_frame
+
+
+def _prices(rows=600, seed=3):
+    """Rows of several tickers in no particular order, with a few missing closes and dates."""
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "ticker": rng.choice(["D05.SI", "C6L.SI", "Z74.SI"], rows),
+        "record_date": (pd.Timestamp("2022-01-03") + pd.to_timedelta(rng.integers(0, 700, rows), unit="D"))
+        .strftime("%Y-%m-%d %H:%M:%S"),
+        "close_price": rng.uniform(1, 40, rows).round(3),
+        "volume": rng.integers(1_000, 90_000, rows),
+    })
+    frame.loc[rng.choice(rows, 20, replace=False), "close_price"] = np.nan
+    frame.loc[rng.choice(rows, 5, replace=False), "record_date"] = None
+    return frame
+
+
+def _chunks(frame, size):
+    return [frame.iloc[start:start + size] for start in range(0, len(frame), size)]
+
+
+@pytest.mark.parametrize("frame", [_prices(), _prices().drop(columns="ticker")], ids=["per-ticker", "no-key"])
+def test_streaming_summary_equals_the_eager_one(frame):
+    summary = StreamingSummary(frame.iloc[:97])
+    for chunk in _chunks(frame, 97):
+        summary.add(chunk)
+
+    streamed, eager = summary.sections(), summarize_frame(frame)
+    assert summary.rows == len(frame)
+    assert [title for title, _ in streamed] == [title for title, _ in eager]
+    for (_, got), (_, expected) in zip(streamed, eager):
+        pd.testing.assert_frame_equal(got.reset_index(drop=True), expected.reset_index(drop=True),
+                                      check_dtype=False, check_names=False)
+
+
+def test_render_chunks_matches_render_frame():
+    frame = _prices()
+    # Over the row budget: summarized chunk by chunk
+    assert render_chunks(_chunks(frame, 50), max_rows=100, max_chars=100_000) == \
+        render_frame(frame, max_rows=100, max_chars=100_000)
+    # Within it: rendered in full
+    small = frame.head(40)
+    assert render_chunks(_chunks(small, 15), max_rows=100) == render_frame(small, max_rows=100)
+    assert render_chunks([], max_rows=100) == "Query returned no rows."
+    # Cut to the character budget, with the notice that rows are missing
+    text = render_chunks(_chunks(frame, 50), max_rows=100, max_chars=400)
+    assert len(text) < 700 and "[Truncated: not every row is shown." in text
+
@@ -0,0 +1,90 @@
+# tests/test_telemetry.py
+import contextvars
+import threading
+import pandas as pd
+import pytest
+import telemetry
+from db import execute, query_one
+from telemetry import breakdown, count, list_runs, load_run, record, run, span
+
+
+def _spans(run_id):
+    return load_run(run_id).set_index("name")
+
+
+def test_spans_nest_under_one_stored_run(database, monkeypatch):
+    monkeypatch.setattr(telemetry, "TELEMETRY_MAX_ATTRIBUTE_CHARS", 10)
+    with run("ingestion", source="test") as current:
+        with span("fetch", "ingestion", series="CPI") as attributes:
+            with span("parse", "ingestion", query="SELECT * FROM a_rather_long_table"):
+                pass
+            attributes["rows"] = 12
+        record("worker.fit", 0.5, "forecast", indicator="GDP")
+        count("retries", category="ingestion")
+        count("retries", 2, category="ingestion")
+        # No row is written until the run ends
+        assert query_one("SELECT COUNT(*) FROM run_metrics")[0] == 0
+
+    spans = _spans(current.run_id)
+    assert list(list_runs()["run_id"]) == [current.run_id]
+    assert spans.loc["ingestion", "category"] == "run" and spans.loc["ingestion", "source"] == "test"
+    assert pd.isna(spans.loc["fetch", "parent"]) and spans.loc["fetch", "rows"] == 12
+    assert spans.loc["parse", "parent"] == "fetch" and spans.loc["parse", "query"] == "SELECT * F..."
+    assert spans.loc["parse", "seconds"] <= spans.loc["fetch", "seconds"] <= spans.loc["ingestion", "seconds"]
+    assert spans.loc["worker.fit", "seconds"] == pytest.approx(0.5)
+    assert spans.loc["retries", "value"] == 3 and spans.loc["retries", "events"] == 2
+    assert (spans["status"] == "ok").all()
+
+
+def test_errors_mark_the_span_and_the_run(database):
+    with pytest.raises(ValueError):
+        with run("forecasts") as current:
+            with span("fit"):
+                raise ValueError("no data")
+
+    spans = _spans(current.run_id)
+    assert spans.loc["fit", "status"] == spans.loc["forecasts", "status"] == "error"
+    assert spans.loc["fit", "error"] == "ValueError: no data"
+
+
+def test_inner_runs_and_threads_join_the_outer_run(database):
+    @telemetry.run("forecasts")
+    def forecasts():
+        with span("fit"):
+            pass
+
+    with run("job") as current:
+        forecasts()
+        context = contextvars.copy_context()
+        worker = threading.Thread(target=context.run, args=(lambda: record("thread.work", 0.1, "stage"),))
+        worker.start()
+        worker.join()
+
+    assert list(list_runs()["run_kind"]) == ["job"]
+    assert {"fit", "thread.work"} <= set(_spans(current.run_id).index)
+    assert breakdown("job").columns.tolist() == ["stage"]
+    assert breakdown("job", category="stage").columns.tolist() == ["fit", "thread.work"]
+
+
+def test_nothing_is_recorded_outside_a_run_or_when_disabled(database, monkeypatch):
+    with span("orphan") as attributes:
+        attributes["rows"] = 1
+    record("orphan", 1.0, "stage")
+    count("orphan")
+    monkeypatch.setattr(telemetry, "TELEMETRY_ENABLED", False)
+    with run("ingestion") as current:
+        with span("fetch"):
+            pass
+
+    assert current is None
+    assert query_one("SELECT COUNT(*) FROM run_metrics")[0] == 0
+
+
+def test_old_runs_are_dropped_when_a_run_is_stored(database):
+    with run("ingestion"):
+        pass
+    execute("UPDATE run_metrics SET run_started_at = '2000-01-01 00:00:00'")
+    with run("ingestion") as current:
+        pass
+
+    assert list(list_runs()["run_id"]) == [current.run_id]
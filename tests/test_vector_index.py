@@ -0,0 +1,83 @@
+# tests/test_vector_index.py
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+from vector_index import VectorIndex, embed
+
+WORDS = ("bank earnings rose airline demand fell property prices climbed inflation eased Singapore exports "
+         "shipping rates dividend guidance margins deposits tourism retail sales wages rents loans funding China "
+         "outlook growth policy currency oil refinery telecom subscribers REIT occupancy").split()
+
+
+def _articles(count, first_id=1, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = list(range(first_id, first_id + count))
+    # Published out of id order, as backfilled news is
+    days = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 120, count), unit="D")
+    texts = [" ".join(rng.choice(WORDS, 8)) for _ in ids]
+    return ids, days.strftime("%Y-%m-%d").tolist(), texts
+
+
+def _scores(articles, query, start, end):
+    """{news_id: score} of every article inside the date window, by brute force."""
+    ids, days, texts = articles
+    scores = embed(texts) @ embed([query])[0]
+    return {ids[i]: float(scores[i]) for i, day in enumerate(days)
+            if (not start or day >= start) and (not end or day <= end)}
+
+
+@pytest.mark.parametrize("start, end", [(None, None), ("2024-02-01", None), (None, "2024-02-15"),
+                                        ("2024-02-01", "2024-02-29"), ("2024-03-05", "2024-03-05")])
+def test_date_ranges_return_the_exact_top_rows(tmp_path, start, end):
+    articles = _articles(400)
+    index = VectorIndex(str(tmp_path / "index"))
+    index.add(*articles)
+
+    hits = index.search("bank earnings", top_k=7, start_date=start, end_date=end)
+
+    # Rows tied on score may come in any order, so compare scores and membership of the window
+    expected = _scores(articles, "bank earnings", start, end)
+    assert [score for _, score in hits] == pytest.approx(sorted(expected.values(), reverse=True)[:len(hits)])
+    assert len(hits) == min(7, sum(score > 0 for score in expected.values()))
+    assert all(expected[news_id] == pytest.approx(score) for news_id, score in hits)
+    assert index.search("bank earnings", start_date="2025-01-01") == []
+
+
+def test_appends_are_searchable_and_survive_reopening(tmp_path):
+    index = VectorIndex(str(tmp_path / "index"))
+    index.add(*_articles(50))
+    index.search("airline demand", start_date="2024-01-01")
+    later = _articles(20, first_id=51, seed=1)
+    index.add(*later)
+
+    # The day partition is rebuilt after the append
+    hits = index.search("airline demand", top_k=100, start_date="2024-01-01")
+    assert {news_id for news_id, _ in hits} & set(later[0])
+    assert VectorIndex(str(tmp_path / "index")).search("airline demand", top_k=100, start_date="2024-01-01") == hits
+
+
+def test_searches_run_while_rows_are_appended(tmp_path):
+    index = VectorIndex(str(tmp_path / "index"))
+    index.add(*_articles(100))
+    errors, done = [], threading.Event()
+
+    def search():
+        while not done.is_set():
+            try:
+                for news_id, _ in index.search("property prices", top_k=10, end_date="2024-03-31"):
+                    assert 1 <= news_id <= index.max_id
+            except Exception as e:
+                errors.append(e)
+                return
+
+    searchers = [threading.Thread(target=search) for _ in range(3)]
+    for thread in searchers:
+        thread.start()
+    for batch in range(20):
+        index.add(*_articles(25, first_id=101 + 25 * batch, seed=batch))
+    done.set()
+    for thread in searchers:
+        thread.join()
+
+    assert errors == [] and index.count == 600
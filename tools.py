@@ -1,42 +1,113 @@
 # tools.py
-import sqlite3
-import pandas as pd
 from crewai.tools import BaseTool
-from config import DATABASE_NAME
+import telemetry
+from db import get_table_versions, query_chunks, query_df, snapshot_date
+from memory import recall
+from query_cache import query_cache
+from rendering import render_chunks, render_frame
+from config import TOOL_NEWS_SNIPPET_CHARS, TOOL_QUERY_CHUNK_ROWS
+from vector_index import get_index, sync_news_index
 
 class DatabaseTool(BaseTool):
     name: str = "SQL Database Query Tool"
-    description: str = "Executes a SQL query against the local SQLite database. Use this to get all structured data, including economic indicators, stock prices, and past briefings."
+    description: str = (
+        "Executes a SQL query against the local SQLite database. Use this to get all structured data, including "
+        "economic indicators and stock prices (for past briefings, use the Briefing Memory Tool). Precomputed analytics are cheaper than raw history: "
+        "stock_latest_metrics (one row per ticker: close, return_1m/3m/1y, volatility_20d, ma_20/50/200, drawdown, "
+        "max_drawdown), stock_features_daily, stock_returns_periodic (period W/M/Q/Y) and "
+        "stock_indicator_correlations (ticker vs. SingStat indicator). Small results come back as CSV; large ones are "
+        "summarized per ticker/indicator (count, min/max, last value, % change, resampled series), so filter and "
+        "aggregate in SQL when you need exact rows."
+    )
 
     def _run(self, query: str) -> str:
         try:
-            conn = sqlite3.connect(DATABASE_NAME)
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df.to_string()
+            with telemetry.span("database_query", "tool", query=query) as attributes:
+                # Versions are read before the query runs, so a write that lands
+                # in between leaves the entry stale rather than wrongly fresh.
+                versions = get_table_versions()
+                # A point-in-time snapshot answers the same SQL differently, so it bypasses the cache
+                as_of = snapshot_date()
+                result = query_cache.get(query, versions) if as_of is None else None
+                attributes["cache_hit"] = result is not None
+                if result is None:
+                    # Read in chunks, so a query over the whole history is
+                    # summarized without holding every row in memory
+                    attributes["rows"] = 0
+
+                    def counted(chunks):
+                        for chunk in chunks:
+                            attributes["rows"] += len(chunk)
+                            yield chunk
+
+                    result = render_chunks(counted(query_chunks(query, chunksize=TOOL_QUERY_CHUNK_ROWS)))
+                    if as_of is None:
+                        query_cache.put(query, result, versions)
+                attributes["output_bytes"] = len(result.encode("utf-8"))
+                return result
         except Exception as e:
             return f"Error executing query: {e}"
 
 class SemanticSearchTool(BaseTool):
     name: str = "Semantic News Search Tool"
-    description: str = "Searches for unstructured news and reports based on a topic. Use this to find qualitative context about a company or economic event."
+    description: str = (
+        "Searches for unstructured news and reports based on a topic. Use this to find qualitative context about a "
+        "company or economic event. Returns the most relevant articles with a similarity score; optionally pass "
+        "top_k (number of results) and start_date/end_date (YYYY-MM-DD) to restrict the publication window."
+    )
 
-    def _run(self, topic: str) -> str:
-        # NOTE: This is a simplified simulation of semantic search for local testing.
-        # In production, this would query a real vector database like Vertex AI Vector Search.
+    def _run(self, topic: str, top_k: int = 5, start_date: str = None, end_date: str = None) -> str:
         try:
-            conn = sqlite3.connect(DATABASE_NAME)
-            df = pd.read_sql_query("SELECT source, published_date, content FROM unstructured_news", conn)
-            conn.close()
-            
-            # Simple keyword matching for simulation
-            results = df[df['content'].str.contains(topic, case=False)]
-            if results.empty:
-                return f"No news found on the topic: {topic}"
-            return results.to_string()
+            with telemetry.span("news_search", "tool", topic=topic, top_k=top_k, start_date=start_date,
+                                end_date=end_date) as attributes:
+                as_of = snapshot_date()
+                if as_of and (end_date is None or end_date > as_of):
+                    # Nothing published after the snapshot's date
+                    end_date = as_of
+                index = get_index()
+                if index.count == 0 and as_of is None:
+                    sync_news_index()
+                hits = index.search(topic, top_k=top_k, start_date=start_date, end_date=end_date)
+                attributes["rows"] = len(hits)
+                if not hits:
+                    return f"No news found on the topic: {topic}"
+
+                scores = dict(hits)
+                placeholders = ", ".join("?" * len(scores))
+                df = query_df(
+                    f"SELECT id, source, published_date, content FROM unstructured_news WHERE id IN ({placeholders})",
+                    params=list(scores)
+                )
+
+                df['score'] = df['id'].map(scores).round(3)
+                df['content'] = df['content'].str.slice(0, TOOL_NEWS_SNIPPET_CHARS)
+                results = df.sort_values('score', ascending=False)[['score', 'source', 'published_date', 'content']]
+                result = render_frame(results, narrowing_hint="lower top_k or pass start_date/end_date")
+                attributes["output_bytes"] = len(result.encode("utf-8"))
+                return result
         except Exception as e:
             return f"Error searching news: {e}"
 
+class MemoryTool(BaseTool):
+    name: str = "Briefing Memory Tool"
+    description: str = (
+        "Recalls the conclusions of past briefings, newest first: each date's outlook direction (acceleration, "
+        "deceleration or continuation), Top Opportunity picks and key risk, one line per briefing. Optionally pass "
+        "ticker (e.g. D05.SI) to keep the briefings that picked it or named a risk for it, outlook to keep one "
+        "direction, last_n (number of briefings) and max_tokens (size of the answer)."
+    )
+
+    def _run(self, ticker: str = None, outlook: str = None, last_n: int = None, max_tokens: int = None,
+             before: str = None) -> str:
+        try:
+            with telemetry.span("memory_recall", "tool", ticker=ticker, outlook=outlook, last_n=last_n) as attributes:
+                result = recall(ticker=ticker, outlook=outlook, last_n=last_n, max_tokens=max_tokens, before=before)
+                attributes["output_bytes"] = len(result.encode("utf-8"))
+                return result
+        except Exception as e:
+            return f"Error recalling past briefings: {e}"
+
 # Instantiate tools for agents
 db_tool = DatabaseTool()
 news_search_tool = SemanticSearchTool()
+memory_tool = MemoryTool()
@@ -0,0 +1,223 @@
+# vector_index.py
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from datetime import date, datetime
+import numpy as np
+from config import VECTOR_INDEX_DIR, VECTOR_INDEX_DIM
+from db import connection
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_EPOCH = date(1970, 1, 1)
+
+
+def embed(texts, dim=VECTOR_INDEX_DIM):
+    """
+    Embeds texts locally with signed feature hashing of unigrams and bigrams.
+
+    Term counts are log-scaled and every row is L2-normalised, so a dot product
+    between two embeddings is their cosine similarity. Nothing is downloaded:
+    the same text always maps to the same vector on any machine.
+    """
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = _TOKEN_RE.findall((text or "").lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        counts = {}
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            bucket = h % dim
+            sign = 1.0 if (h >> 31) & 1 else -1.0
+            counts[bucket] = counts.get(bucket, 0.0) + sign
+        for bucket, count in counts.items():
+            vectors[row, bucket] = math.copysign(1.0 + math.log(abs(count)), count) if count else 0.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def _to_day(value):
+    """Days since 1970-01-01 for a date, datetime or 'YYYY-MM-DD...' string."""
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], "%Y-%m-%d").date()
+    elif isinstance(value, datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+class VectorIndex:
+    """
+    A flat, append-only on-disk index of news embeddings.
+
+    Vectors, news ids and publication days live in three raw binary files that
+    are memory-mapped for search, so opening the index is instant and the OS
+    page cache keeps hot pages in memory. New rows are appended in place;
+    `meta.json` records how many rows are complete, so a crash mid-append
+    never exposes a partial row.
+
+    Rows are partitioned by publication day through an in-memory ordering of
+    the days, rebuilt on the first search after an append, so a search with
+    a date range only reads and scores the vectors inside it.
+    """
+
+    def __init__(self, directory=VECTOR_INDEX_DIR, dim=VECTOR_INDEX_DIM):
+        self.directory = directory
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._paths = {
+            "vectors": os.path.join(directory, "vectors.f32"),
+            "ids": os.path.join(directory, "ids.i64"),
+            "days": os.path.join(directory, "days.i32"),
+        }
+        self._meta_path = os.path.join(directory, "meta.json")
+        os.makedirs(directory, exist_ok=True)
+        meta = self._read_meta()
+        if meta.get("dim", dim) != dim:
+            # Embeddings of a different width are not comparable; start over
+            self.reset()
+            meta = {}
+        self.count = meta.get("count", 0)
+        self.max_id = meta.get("max_id", 0)
+        self._map()
+
+    def _read_meta(self):
+        try:
+            with open(self._meta_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_meta(self):
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": self.dim, "count": self.count, "max_id": self.max_id}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _map(self):
+        self._by_day = None
+        if self.count == 0:
+            self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self.ids = np.zeros(0, dtype=np.int64)
+            self.days = np.zeros(0, dtype=np.int32)
+            return
+        self.vectors = np.memmap(self._paths["vectors"], dtype=np.float32, mode="r", shape=(self.count, self.dim))
+        self.ids = np.memmap(self._paths["ids"], dtype=np.int64, mode="r", shape=(self.count,))
+        self.days = np.memmap(self._paths["days"], dtype=np.int32, mode="r", shape=(self.count,))
+
+    def reset(self):
+        with self._lock:
+            for path in self._paths.values():
+                if os.path.exists(path):
+                    os.remove(path)
+            self.count = 0
+            self.max_id = 0
+            self._write_meta()
+            self._map()
+
+    def add(self, ids, published_dates, texts):
+        """Appends news rows to the index. `ids` must be larger than any already indexed."""
+        if not len(ids):
+            return 0
+        vectors = embed(texts, self.dim)
+        with self._lock:
+            columns = {
+                "vectors": vectors,
+                "ids": np.asarray(ids, dtype=np.int64),
+                "days": np.array([_to_day(d) for d in published_dates], dtype=np.int32),
+            }
+            for name, values in columns.items():
+                itemsize = values.dtype.itemsize * (self.dim if name == "vectors" else 1)
+                with open(self._paths[name], "r+b" if os.path.exists(self._paths[name]) else "wb") as f:
+                    # Drop any tail left behind by an interrupted append
+                    f.truncate(self.count * itemsize)
+                    f.seek(0, os.SEEK_END)
+                    f.write(np.ascontiguousarray(values).tobytes())
+            self.count += len(ids)
+            self.max_id = max(self.max_id, int(max(ids)))
+            self._write_meta()
+            self._map()
+        return len(ids)
+
+    def _snapshot(self):
+        """
+        (vectors, ids, (row order by day, sorted days)) as of now. add() maps
+        new arrays rather than growing these, so a search keeps a consistent
+        view while rows are appended.
+        """
+        with self._lock:
+            if self._by_day is None:
+                order = np.argsort(self.days, kind="stable")
+                self._by_day = (order, np.asarray(self.days)[order])
+            return self.vectors, self.ids, self._by_day
+
+    def search(self, query, top_k=5, start_date=None, end_date=None):
+        """Returns [(news_id, score)] for the `top_k` most similar rows within the date range."""
+        vectors, ids, (order, sorted_days) = self._snapshot()
+        if not len(ids):
+            return []
+        query_vector = embed([query], self.dim)[0]
+        candidates = None
+        if start_date or end_date:
+            lo = np.searchsorted(sorted_days, _to_day(start_date), side="left") if start_date else 0
+            hi = np.searchsorted(sorted_days, _to_day(end_date), side="right") if end_date else len(ids)
+            # Back in row order, so the memory-mapped vectors are read front to back
+            candidates = np.sort(order[lo:hi])
+            if not len(candidates):
+                return []
+            scores = vectors[candidates] @ query_vector
+        else:
+            scores = vectors @ query_vector
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = top if candidates is None else candidates[top]
+        return [(int(ids[row]), float(scores[i])) for row, i in zip(rows, top) if scores[i] > 0]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Returns the process-wide index, opening (memory-mapping) it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = VectorIndex()
+        return _index
+
+
+def sync_news_index(conn=None, batch_size=5000):
+    """
+    Brings the index up to date with unstructured_news.
+
+    Rows with an id above the highest indexed id are embedded and appended in
+    batches. If the table was cleared or rows were deleted from under the
+    index, it is rebuilt from scratch.
+    """
+    if conn is None:
+        with connection() as conn:
+            return sync_news_index(conn, batch_size)
+
+    index = get_index()
+    max_id, total = conn.execute("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM unstructured_news").fetchone()
+    if max_id < index.max_id or total < index.count:
+        print("News index is out of sync with unstructured_news; rebuilding it.")
+        index.reset()
+    added = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, published_date, content FROM unstructured_news WHERE id > ? ORDER BY id LIMIT ?",
+            (index.max_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        ids, dates, texts = zip(*rows)
+        added += index.add(ids, dates, texts)
+    if added:
+        print(f"Indexed {added} news articles ({index.count} total).")
+    return added